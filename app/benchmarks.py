@@ -0,0 +1,910 @@
+"""
+Benchmarks for the chatbot hot paths, run against local stand-ins so no Groq or
+Google credentials are needed.
+
+Usage: python -m app.benchmarks <name> [<name> ...]
+"""
+import asyncio
+import sys
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+STUB_REPLY = """Extracted:
+name: empty
+age: empty
+doctor: empty
+date: empty
+time: empty
+missing: name, age, doctor, date, time
+
+Hello! How can I help you today?"""
+
+
+class SlowFakeLLM(SimpleChatModel):
+    """
+    Chat model stand-in that takes `delay` seconds per completion, plus
+    `per_token_delay` for every (approximate) prompt token
+    """
+    delay: float = 0.2
+    per_token_delay: float = 0.0
+    reply: str = STUB_REPLY
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _latency(self, messages: List[BaseMessage]) -> float:
+        prompt_chars = sum(len(message.content) for message in messages)
+        return self.delay + self.per_token_delay * prompt_chars / 4
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self.calls += 1
+        time.sleep(self._latency(messages))
+        return self.reply
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self._latency(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any):
+        self.calls += 1
+        # Spread the same total delay over word-sized tokens
+        tokens = self.reply.split(" ")
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.delay / len(tokens))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token if i == 0 else " " + token))
+
+
+# Greetings and clinic questions are answered locally, this one needs the chat chain
+CHAIN_MESSAGE = "I need to see a doctor"
+
+
+def _stub_summary_chain(delay: float):
+    """Summary chain on SlowFakeLLM, for benchmarks whose sessions run long enough to be summarized"""
+    from .chains import create_summary_chain
+
+    chain = create_summary_chain()
+    chain.llm = SlowFakeLLM(delay=delay, reply="The patient asked about the clinic and its doctors.")
+    return chain
+
+
+def _report(label: str, count: int, elapsed: float, unit: str = "calls"):
+    print(f"{label:<28} {count:>6} {unit:<8} {elapsed:8.3f}s  {count / elapsed:12.1f} /s")
+
+
+async def _fire_chat_requests(app, sessions: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client.post("/chat", json={"message": CHAIN_MESSAGE, "session_id": f"bench-{i}"})
+            for i in range(sessions)
+        ])
+        return time.perf_counter() - start
+
+
+def bench_concurrency(sessions: int = 50, delay: float = 0.2):
+    """Concurrent /chat throughput against a stubbed slow LLM, blocking vs async path"""
+    from . import main
+    from .chains import create_chat_chain
+
+    clinic_data = main.clinic_registry.default.current
+    stub_chain = create_chat_chain(clinic_data)
+    stub_chain.llm = SlowFakeLLM(delay=delay)
+
+    def stub_chat_chain(clinic_data):
+        return stub_chain
+
+    async def blocking_run(chain, inputs):
+        return chain.run(inputs)
+
+    original_factory, original_runner = main.get_chat_chain, main.arun_chain
+    main.get_chat_chain = stub_chat_chain
+    try:
+        print(f"/chat with {sessions} concurrent sessions, LLM delay {delay}s")
+        main.arun_chain = blocking_run
+        main.conversation_states.clear()
+        _report("blocking chain.run", sessions, asyncio.run(_fire_chat_requests(main.app, sessions)), "requests")
+        assert stub_chain.llm.calls == sessions, "turns did not reach the stubbed LLM"
+
+        main.arun_chain = original_runner
+        main.conversation_states.clear()
+        _report("async arun_chain", sessions, asyncio.run(_fire_chat_requests(main.app, sessions)), "requests")
+        assert stub_chain.llm.calls == 2 * sessions, "turns did not reach the stubbed LLM"
+    finally:
+        main.get_chat_chain, main.arun_chain = original_factory, original_runner
+        main.conversation_states.clear()
+
+
+def bench_chain_registry(iterations: int = 200):
+    """Per-request chain construction vs the cached chain registry"""
+    from .chains import clear_chain_cache, create_chat_chain, get_chat_chain
+    from .utils import load_clinic_data
+
+    clinic_data = load_clinic_data("app/data/clinic_data.json")
+
+    # Clearing the registry each time reproduces building a fresh ChatGroq per call
+    start = time.perf_counter()
+    for _ in range(iterations):
+        clear_chain_cache()
+        create_chat_chain(clinic_data)
+    _report("uncached build", iterations, time.perf_counter() - start)
+
+    get_chat_chain(clinic_data)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        get_chat_chain(clinic_data)
+    _report("get_chat_chain (cached)", iterations, time.perf_counter() - start)
+
+
+def bench_streaming(requests: int = 20, delay: float = 0.5):
+    """Time to first token on /chat/stream vs full-reply latency on /chat"""
+    from . import main
+    from .chains import create_chat_chain
+
+    clinic_data = main.clinic_registry.default.current
+    stub_chain = create_chat_chain(clinic_data)
+    stub_chain.llm = SlowFakeLLM(delay=delay)
+    original_factory = main.get_chat_chain
+    main.get_chat_chain = lambda clinic_data: stub_chain
+
+    # httpx's ASGI transport buffers whole bodies, so the stream is read
+    # straight from the endpoint's body iterator
+    async def run():
+        full, first = [], []
+        for i in range(requests):
+            start = time.perf_counter()
+            await main.chat(main.ChatRequest(message=CHAIN_MESSAGE, session_id=f"full-{i}"), clinic_data)
+            full.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            response = await main.chat_stream(main.ChatRequest(message=CHAIN_MESSAGE, session_id=f"stream-{i}"), clinic_data)
+            async for event in response.body_iterator:
+                if event.startswith("event: token") and len(first) <= i:
+                    first.append(time.perf_counter() - start)
+        return full, first
+
+    try:
+        full, first = asyncio.run(run())
+        assert stub_chain.llm.calls == 2 * requests, "turns did not reach the stubbed LLM"
+    finally:
+        main.get_chat_chain = original_factory
+        main.conversation_states.clear()
+    print(f"LLM delay {delay}s over {len(STUB_REPLY.split(' '))} tokens, {requests} requests")
+    print(f"/chat full reply            mean {sum(full) / len(full) * 1000:8.1f} ms")
+    print(f"/chat/stream first token    mean {sum(first) / len(first) * 1000:8.1f} ms")
+
+
+PATIENT_MESSAGES = [
+    "hi",
+    "what are your hours?",
+    "where are you located",
+    "which doctors do you have",
+    "When is Dr. Raza available?",
+    "who is the cardiologist?",
+    "what is your phone number",
+    "I want to book an appointment",
+    "My name is Fatima and I am 23",
+    "I'd like to see Dr. Ayesha Ali on 22 sep at 11am",
+    "do you accept insurance?",
+    "thanks!",
+]
+
+
+def bench_info_fast_path(rounds: int = 5, delay: float = 0.3):
+    """Share of turns served locally and latency of local vs LLM-served turns"""
+    from . import chains, main
+    from .chains import create_chat_chain
+    from .semantic_cache import SemanticCache, hashing_encoder
+
+    clinic_data = main.clinic_registry.default.current
+    stub_chain = create_chat_chain(clinic_data)
+    stub_chain.llm = SlowFakeLLM(delay=delay)
+    summary_chain = _stub_summary_chain(delay)
+    original_factory, original_summary, original_cache = main.get_chat_chain, chains.get_summary_chain, main.semantic_cache
+    main.get_chat_chain = lambda clinic_data: stub_chain
+    chains.get_summary_chain = lambda: summary_chain
+    main.semantic_cache = SemanticCache(encoder=hashing_encoder(), threshold=0.8)
+    # Loaded by the startup hook in the server
+    main.get_intent_classifier()
+    for route in main.turn_stats.values():
+        route.update(turns=0, total_ms=0.0)
+
+    async def run():
+        for i in range(rounds):
+            for message in PATIENT_MESSAGES:
+                await main.chat(main.ChatRequest(message=message, session_id=f"info-{i}"), clinic_data)
+        return await main.get_stats()
+
+    try:
+        stats = asyncio.run(run())
+    finally:
+        main.get_chat_chain, chains.get_summary_chain, main.semantic_cache = original_factory, original_summary, original_cache
+        main.conversation_states.clear()
+    print(f"{stats['total_turns']} turns, {stats['local_fraction']:.0%} served locally (LLM delay {delay}s)")
+    for name, route in stats["routes"].items():
+        print(f"{name:<6} {route['turns']:>5} turns  mean {route['mean_latency_ms']:9.3f} ms")
+
+
+FAQ_MESSAGES = [
+    "do you accept insurance?",
+    "Do you accept insurance",
+    "do you take insurance?",
+    "is parking available at the clinic?",
+    "is there parking available at the clinic",
+    "how much does a consultation cost?",
+    "how much does a consultation cost",
+    "can I bring my child along?",
+]
+
+
+def bench_semantic_cache(rounds: int = 10, delay: float = 0.3):
+    """Repeated FAQ traffic with and without the semantic cache in front of the chat chain"""
+    from . import chains, main
+    from .chains import create_chat_chain
+    from .semantic_cache import SemanticCache, hashing_encoder
+
+    clinic_data = main.clinic_registry.default.current
+    stub_chain = create_chat_chain(clinic_data)
+    stub_chain.llm = SlowFakeLLM(delay=delay)
+    summary_chain = _stub_summary_chain(delay)
+    original_factory, original_summary, original_cache = main.get_chat_chain, chains.get_summary_chain, main.semantic_cache
+    main.get_chat_chain = lambda clinic_data: stub_chain
+    chains.get_summary_chain = lambda: summary_chain
+
+    async def run():
+        start = time.perf_counter()
+        for i in range(rounds):
+            for j, message in enumerate(FAQ_MESSAGES):
+                await main.chat(main.ChatRequest(message=message, session_id=f"faq-{i}-{j}"), clinic_data)
+        return time.perf_counter() - start
+
+    try:
+        print(f"{rounds * len(FAQ_MESSAGES)} FAQ turns, LLM delay {delay}s")
+        main.semantic_cache = SemanticCache(encoder=hashing_encoder(), threshold=2.0)
+        _report("no cache", rounds * len(FAQ_MESSAGES), asyncio.run(run()), "turns")
+
+        # The hashing encoder stands in for the sentence-transformers model, which
+        # needs a download; its similarity scores run lower, hence the threshold
+        main.conversation_states.clear()
+        main.semantic_cache = SemanticCache(encoder=hashing_encoder(), threshold=0.8)
+        _report("semantic cache", rounds * len(FAQ_MESSAGES), asyncio.run(run()), "turns")
+        print(f"hits {main.semantic_cache.hits}  misses {main.semantic_cache.misses}  entries {len(main.semantic_cache)}")
+    finally:
+        main.get_chat_chain, chains.get_summary_chain, main.semantic_cache = original_factory, original_summary, original_cache
+        main.conversation_states.clear()
+
+
+def bench_memory(turns: int = 50, delay: float = 0.05, per_token_delay: float = 0.0002):
+    """Per-turn prompt history size and latency over a long session, buffer vs summary memory"""
+    from . import main
+    from .chains import create_chat_chain
+    from .memory_utils import SummarizingMemory, Transcript, estimate_tokens
+    from .semantic_cache import SemanticCache, hashing_encoder
+
+    clinic_data = main.clinic_registry.default.current
+    stub_chain = create_chat_chain(clinic_data)
+    stub_chain.llm = SlowFakeLLM(delay=delay, per_token_delay=per_token_delay)
+
+    async def stub_summarizer(summary, new_turns):
+        await asyncio.sleep(0.2)
+        return (summary + f" Patient asked {len(new_turns)} more general questions.")[-400:]
+
+    memories = {
+        "buffer": Transcript,
+        "summary": lambda: SummarizingMemory(summarizer=stub_summarizer),
+    }
+
+    original = main.get_chat_chain, main.create_memory, main.semantic_cache
+    main.get_chat_chain = lambda clinic_data: stub_chain
+    main.semantic_cache = SemanticCache(encoder=hashing_encoder(), threshold=2.0)
+
+    async def run(session_id):
+        rows = []
+        for i in range(1, turns + 1):
+            message = f"Also, my last visit went fine, note {i}"
+            state = main.get_conversation_state(session_id, clinic_data)
+            history_tokens = estimate_tokens(main.build_chat_inputs(state, message, clinic_data)["conversation_history"])
+            start = time.perf_counter()
+            await main.chat(main.ChatRequest(message=message, session_id=session_id), clinic_data)
+            rows.append((i, history_tokens, (time.perf_counter() - start) * 1000))
+            # Leave room for the background summary, as real think time between turns would
+            await asyncio.sleep(0.01)
+        return rows
+
+    try:
+        print(f"{turns}-turn session, LLM {delay}s + {per_token_delay * 1000:.2f}ms per prompt token")
+        for mode, factory in memories.items():
+            main.create_memory = factory
+            rows = asyncio.run(run(f"memory-{mode}"))
+            for i, history_tokens, latency in rows:
+                if i == 1 or i % 10 == 0:
+                    print(f"{mode:<8} turn {i:>3}  history ~{history_tokens:>6} tokens  {latency:8.1f} ms")
+    finally:
+        main.get_chat_chain, main.create_memory, main.semantic_cache = original
+        main.conversation_states.clear()
+
+
+def bench_transcript(turns: int = 1000):
+    """Append a turn and render the prompt history every turn: LangChain buffer vs Transcript"""
+    from langchain.memory import ConversationBufferMemory
+    from langchain.schema import AIMessage, HumanMessage
+    from .memory_utils import Transcript, get_memory_as_string
+
+    def legacy_render(memory):
+        history_str = ""
+        for message in memory.chat_memory.messages:
+            if isinstance(message, HumanMessage):
+                history_str += f"Human: {message.content}\n"
+            elif isinstance(message, AIMessage):
+                history_str += f"Assistant: {message.content}\n"
+        return history_str
+
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True, output_key="output")
+    start = time.perf_counter()
+    for i in range(turns):
+        memory.save_context({"input": f"message {i} from the patient"}, {"output": STUB_REPLY})
+        legacy_render(memory)
+    _report("ConversationBufferMemory", turns, time.perf_counter() - start, "turns")
+
+    transcript = Transcript()
+    start = time.perf_counter()
+    for i in range(turns):
+        transcript.append(f"message {i} from the patient", STUB_REPLY)
+        get_memory_as_string(transcript)
+    _report("Transcript", turns, time.perf_counter() - start, "turns")
+
+
+def bench_session_store(sessions: int = 20000, max_sessions: int = 5000, turns: int = 4):
+    """Session lookup overhead and bounded footprint under a stream of abandoned sessions"""
+    from .memory_utils import Transcript
+    from .models import ConversationState
+    from .session_store import SessionStore, state_size_bytes
+
+    def fill(store):
+        start = time.perf_counter()
+        for i in range(sessions):
+            session_id = f"tab-{i}"
+            if session_id not in store:
+                store[session_id] = ConversationState(memory=Transcript())
+            state = store[session_id]
+            for _ in range(turns):
+                state.memory.append("what are your hours?", STUB_REPLY)
+        return time.perf_counter() - start
+
+    plain = {}
+    _report("dict", sessions, fill(plain), "sessions")
+    print(f"{'':<28} live {len(plain):>6}  ~{sum(state_size_bytes(s) for s in plain.values()) / 2 ** 20:.1f} MiB")
+
+    store = SessionStore(max_sessions=max_sessions)
+    _report("SessionStore", sessions, fill(store), "sessions")
+    stats = store.stats()
+    print(f"{'':<28} live {stats['live_sessions']:>6}  ~{stats['approx_bytes'] / 2 ** 20:.1f} MiB  evicted {stats['evicted']}")
+
+
+def bench_session_backend(turns: int = 2000, history_turns: int = 6):
+    """Per-turn load + save overhead: plain dict vs SessionStore vs SQLite (WAL)"""
+    import os
+    import tempfile
+    from .memory_utils import SummarizingMemory
+    from .models import ConversationState
+    from .session_store import SessionStore, SQLiteSessionStore, state_to_json
+
+    def make_state():
+        memory = SummarizingMemory()
+        memory.summary = "Patient Fatima, 23, asked about cardiologists and clinic hours."
+        for i in range(history_turns):
+            memory.turns.append(f"question {i} about the clinic", STUB_REPLY)
+        return ConversationState(
+            current_step="greeting",
+            collected_data={"name": "Fatima", "age": "23", "doctor": "Dr. Muhammad Raza"},
+            memory=memory
+        )
+
+    class DictStore(dict):
+        def load(self, session_id):
+            return self.get(session_id)
+
+        def save(self, session_id, state):
+            self[session_id] = state
+
+    def run(store):
+        store.save("bench", make_state())
+        start = time.perf_counter()
+        for i in range(turns):
+            state = store.load("bench")
+            state.collected_data["time"] = f"{i % 12 + 1}:00 PM"
+            store.save("bench", state)
+        return time.perf_counter() - start
+
+    print(f"state with {history_turns} turns of history serializes to {len(state_to_json(make_state()))} bytes")
+    _report("dict", turns, run(DictStore()), "turns")
+    _report("SessionStore", turns, run(SessionStore()), "turns")
+    with tempfile.TemporaryDirectory() as directory:
+        _report("SQLiteSessionStore (WAL)", turns, run(SQLiteSessionStore(os.path.join(directory, "sessions.db"))), "turns")
+
+
+def bench_ledger(bookings: int = 200, sheet_latency: float = 0.3):
+    """Confirm latency: synchronous Sheets save vs local ledger with write-behind replication"""
+    import os
+    import tempfile
+    from datetime import date, timedelta
+    from .ledger import AppointmentLedger, SheetReplicator
+    from .models import Appointment
+    from .utils import load_clinic_data
+
+    clinic_data = load_clinic_data("app/data/clinic_data.json")
+    doctors = clinic_data.doctors
+
+    def make_appointment(i):
+        # Each doctor's slots in turn, one day after another, so no booking conflicts
+        doctor = doctors[i % len(doctors)]
+        day, slot = divmod(i // len(doctors), len(doctor.slots))
+        return Appointment(
+            patient_name=f"Patient {i}", patient_age=30, doctor_id=doctor.id, doctor_name=doctor.name,
+            date=(date(2026, 1, 1) + timedelta(days=day)).strftime("%Y-%m-%d"),
+            time=doctor.slots[slot]
+        )
+
+    # A Sheets save is ~3 round-trips (duplicate check, ID scan, append)
+    start = time.perf_counter()
+    for _ in range(min(bookings, 10)):
+        time.sleep(3 * sheet_latency)
+    _report("save_appointment_to_sheet*", min(bookings, 10), time.perf_counter() - start, "bookings")
+
+    pushed = []
+    appends = []
+    def push_rows(clinic_code, rows, check_existing_ids):
+        time.sleep(sheet_latency)
+        appends.append(len(rows))
+        pushed.extend(row[0] for row in rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = AppointmentLedger(os.path.join(directory, "appointments.db"))
+        replicator = SheetReplicator(ledger, push_rows, poll_interval=0.1)
+        replicator.start()
+        start = time.perf_counter()
+        results = [ledger.book(make_appointment(i), clinic_data.clinic.code, clinic_data) for i in range(bookings)]
+        _report("AppointmentLedger.book", bookings, time.perf_counter() - start, "bookings")
+        print(f"{'':<28} booked {sum(r['success'] for r in results)}  outbox {ledger.outbox_size()} right after")
+        replicator.stop(timeout=bookings * sheet_latency + 5)
+        print(f"{'':<28} replicated {len(pushed)} rows in the background in {len(appends)} appends")
+    print("* simulated: 3 sheet round-trips per booking")
+
+
+def bench_slot_index(rows: int = 100_000, checks: int = 200):
+    """Booking conflict checks: full-sheet scan vs BookedSlotIndex, on a stand-in sheet"""
+    import os
+    import random
+    import tempfile
+    from .id_allocator import IdAllocator
+    from .slot_index import BookedSlotIndex
+    from .utils import normalize_time
+
+    header = ["appointment_id", "patient_name", "patient_age", "doctor_id", "doctor_name",
+              "date", "time", "status", "created_at"]
+    doctors = ["MR", "AA", "HS", "SA", "KA"]
+    times = ["9:00 AM", "10:00 AM", "11:00 AM", "12:00 PM", "1:00 PM", "2:00 PM", "3:00 PM", "4:00 PM", "5:00 PM"]
+
+    class StandInSheet:
+        def __init__(self):
+            self.values = [header] + [
+                [f"CH{doctors[i % 5]}{i}", f"Patient {i}", "30", doctors[i % 5], "Dr. X",
+                 f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}", times[i % 9], "pending", "2026-01-01 09:00:00"]
+                for i in range(rows)
+            ]
+            self.rows_read = 0
+
+        def get_all_records(self):
+            self.rows_read += len(self.values)
+            return [dict(zip(header, row)) for row in self.values[1:]]
+
+        def get_all_values(self):
+            self.rows_read += len(self.values)
+            return [list(row) for row in self.values]
+
+        def rows_after(self, row_count):
+            new_rows = self.values[row_count:]
+            self.rows_read += len(new_rows)
+            return [list(row) for row in new_rows]
+
+    def scan_check(sheet, doctor_id, date, time_slot):
+        # What check_existing_appointment did before the index
+        normalized_time = normalize_time(time_slot)
+        for record in sheet.get_all_records():
+            if (record.get('doctor_id') == doctor_id and record.get('date') == date and
+                    normalize_time(record.get('time', '')) == normalized_time and
+                    record.get('status', 'pending') != 'cancelled'):
+                return True
+        return False
+
+    rng = random.Random(0)
+    queries = [(rng.choice(doctors), f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.choice(times))
+               for _ in range(checks)]
+
+    sheet = StandInSheet()
+    scan_checks = min(checks, 10)
+    start = time.perf_counter()
+    expected = [scan_check(sheet, *query) for query in queries[:scan_checks]]
+    _report("full-sheet scan", scan_checks, time.perf_counter() - start, "checks")
+    print(f"{'':<28} {sheet.rows_read // scan_checks} rows downloaded per check")
+
+    sheet = StandInSheet()
+    directory = tempfile.mkdtemp()
+    id_allocator = IdAllocator(os.path.join(directory, "id_counters.db"))
+    for doctor_id in doctors:
+        id_allocator.register(f"CH{doctor_id}")
+    index = BookedSlotIndex(sheet.get_all_values, sheet.rows_after, id_allocator)
+    start = time.perf_counter()
+    index.rebuild()
+    _report("BookedSlotIndex build", 1, time.perf_counter() - start, "snapshots")
+    sheet.rows_read = 0
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        # Another process appends a row between checks
+        sheet.values.append([f"CHMR{rows + i}", "New", "30", "MR", "Dr. X", "2027-01-01", "9:00 AM", "pending", ""])
+        index.is_booked(*query, max_age=0)
+    _report("BookedSlotIndex check", checks, time.perf_counter() - start, "checks")
+    print(f"{'':<28} {sheet.rows_read / checks:.0f} rows downloaded per check")
+    assert [index.is_booked(*query) for query in queries[:scan_checks]] == expected
+
+    start = time.perf_counter()
+    for i in range(checks):
+        id_allocator.next_sequence(f"CH{doctors[i % 5]}")
+    _report("IdAllocator.next_sequence", checks, time.perf_counter() - start, "IDs")
+    print(f"{'':<28} next CHMR ID: CHMR{id_allocator.last_sequence('CHMR') + 1}")
+
+
+def bench_availability(bookings: int = 20000, rounds: int = 200):
+    """Week calendar for all doctors: 35 per-day lookups vs one grid query, on the ledger"""
+    import os
+    import tempfile
+    from datetime import date, timedelta
+    from .clinic_store import load_snapshot
+    from .ledger import AppointmentLedger
+    from .utils import availability_grid, date_range, normalized_doctor_slots
+
+    clinic_data = load_snapshot("app/data/clinic_data.json")
+    doctors = clinic_data.doctors
+    records = []
+    for i in range(bookings):
+        doctor = doctors[i % len(doctors)]
+        day, slot = divmod(i // len(doctors), len(doctor.slots))
+        records.append({
+            "appointment_id": f"{clinic_data.clinic.code}{doctor.id}{i + 1}", "doctor_id": doctor.id,
+            "date": (date(2026, 1, 1) + timedelta(days=day)).strftime("%Y-%m-%d"), "time": doctor.slots[slot]
+        })
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = AppointmentLedger(os.path.join(directory, "appointments.db"))
+        ledger.seed_from_records(records, clinic_data.clinic.code)
+        dates = date_range("2026-03-02", "2026-03-08")
+        doctor_ids = [doctor.id for doctor in doctors]
+        doctor_slots = normalized_doctor_slots(doctors)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            per_day = {(d, day): ledger.available_slots(d, day, clinic_data) for d in doctor_ids for day in dates}
+        _report("35 per-day lookups", rounds, time.perf_counter() - start, "calendars")
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            grid = availability_grid(doctors, dates, ledger.booked_slots_grid(doctor_ids, dates[0], dates[-1], clinic_data.clinic.code), doctor_slots)
+        _report("one grid query", rounds, time.perf_counter() - start, "calendars")
+
+    assert all(grid[i]["availability"][day] == per_day[(d, day)] for i, d in enumerate(doctor_ids) for day in dates)
+
+
+def bench_slot_bitmap(days: int = 90, rounds: int = 2000):
+    """Ranked alternatives over 90 days for every doctor: bitmap search vs a Python loop"""
+    import random
+    from datetime import datetime, timedelta
+    from .slot_bitmap import SlotBitmap
+    from .utils import date_range, load_clinic_data, normalize_time
+
+    clinic_data = load_clinic_data("app/data/clinic_data.json")
+    doctors = clinic_data.doctors
+    bitmap = SlotBitmap(doctors)
+    dates = date_range("2026-01-01", (datetime.strptime("2026-01-01", "%Y-%m-%d") + timedelta(days=days - 1)).strftime("%Y-%m-%d"))
+    rng = random.Random(0)
+    booked = {(doctor.id, date): {normalize_time(slot) for slot in doctor.slots if rng.random() < 0.8}
+              for doctor in doctors for date in dates}
+    doctor_ids = [doctor.id for doctor in doctors]
+    slot_times = {doctor.id: [(slot, normalize_time(slot)) for slot in doctor.slots] for doctor in doctors}
+
+    def minutes(slot_time):
+        hours, mins = slot_time.split(":")
+        return int(hours) * 60 + int(mins)
+
+    def python_search(requested):
+        candidates = []
+        for d, doctor in enumerate(doctors):
+            for day, date in enumerate(dates):
+                for slot, slot_time in slot_times[doctor.id]:
+                    if slot_time not in booked[(doctor.id, date)]:
+                        cost = day * 1440 + abs(minutes(slot_time) - requested) + (0 if d == 0 else 120)
+                        candidates.append((cost, doctor.id, date, slot))
+        return sorted(candidates)[:3]
+
+    start = time.perf_counter()
+    for _ in range(rounds // 20):
+        occupied = bitmap.occupancy(doctor_ids, dates, booked)
+    _report("occupancy build", rounds // 20, time.perf_counter() - start, "grids")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        alternatives = bitmap.nearest_free(doctors, dates, occupied, "10:00")
+    _report("SlotBitmap.nearest_free", rounds, time.perf_counter() - start, "searches")
+
+    start = time.perf_counter()
+    for _ in range(rounds // 20):
+        expected = python_search(600)
+    _report("Python loop", rounds // 20, time.perf_counter() - start, "searches")
+    assert [(a["doctor_id"], a["date"], a["time"]) for a in alternatives] == [e[1:] for e in expected]
+
+
+EXTRACTION_MESSAGES = [
+    "Hi, I'd like to book an appointment",
+    "My name is Fatima Ahmed and I am 23 years old",
+    "I'm 45",
+    "Can I see Dr. Raza tomorrow at 10am?",
+    "I want to book with doctor Ayesha Khan on 22 September at 3pm",
+    "What are your clinic hours?",
+    "call me Omar, age 31, I need a cardiologist",
+    "Is Dr. Hina available on Monday around 11 am?",
+    "book with Muhammad Raza for next week at 9 o'clock",
+    "yes please confirm",
+    "Actually can we move it to 4 pm",
+    "My son is named Bilal, he is 7, we want to see the child specialist",
+    "I have chest pain since yesterday, which doctor should I see?",
+    "date 25/09 time 2pm with dr. khan",
+    "ok book it for the day after tomorrow at 10:30am",
+    "Where is the clinic located and what is the contact number?",
+    "I am Sara and I'm 29, I'd like an appointment with the dermatologist on 3 October",
+    "Do you accept walk-ins or do I need to schedule?",
+    "Please book me with Dr. Ahmed at 5pm on Friday",
+    "thanks, that's all",
+]
+
+def bench_extractor(rounds: int = 2000):
+    """extract_appointment_info on realistic patient messages: patterns rebuilt per call vs precompiled"""
+    import re
+    from datetime import datetime, timedelta
+    from .extractor import FIELD_PATTERNS, extract_appointment_info
+
+    def per_field_search(text):
+        # What extract_appointment_info did before: one re.search per field, patterns rebuilt per call
+        extracted = {}
+        text_lower = text.lower()
+        today = datetime.now()
+        if 'tomorrow' in text_lower:
+            extracted['date'] = (today + timedelta(days=1)).strftime('%Y-%m-%d')
+        patterns = dict(FIELD_PATTERNS)
+        for key, pattern in patterns.items():
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                extracted[key] = match.group(1).strip()
+        if 'name' in extracted and ' and ' in extracted['name']:
+            extracted['name'] = extracted['name'].split(' and ')[0].strip()
+        return extracted
+
+    messages = EXTRACTION_MESSAGES * (rounds // len(EXTRACTION_MESSAGES))
+    state = {"name": "Fatima", "age": "23"}
+
+    start = time.perf_counter()
+    for message in messages:
+        per_field_search(message)
+    _report("per-field re.search", len(messages), time.perf_counter() - start, "messages")
+
+    start = time.perf_counter()
+    for message in messages:
+        extract_appointment_info(message)
+    _report("precompiled patterns", len(messages), time.perf_counter() - start, "messages")
+
+    start = time.perf_counter()
+    for message in messages:
+        extract_appointment_info(message, state, only_missing=True)
+    _report("  only missing fields", len(messages), time.perf_counter() - start, "messages")
+
+
+def bench_normalize(calls: int = 100_000):
+    """normalize_date / normalize_time calls per second: strptime chain vs fast path vs memoized"""
+    from datetime import date
+    from .utils import _fast_date, _fast_time, _normalize_date, _normalize_time, _parse_date, _parse_time, normalize_date, normalize_time
+
+    # What an availability check and the chat turns feed them
+    times = ["9:00 AM", "10:00 AM", "11:00 AM", "3:00 PM", "1:00 PM", "12:00 PM", "14:00", "9am", "4 pm", "10:30am"]
+    dates = ["2026-11-02", "2026-11-03", "22 sep", "3 October", "2025-12-01", "25 Dec 2026", "22/09/2026", "tomorrow"]
+    today = date.today()
+
+    for name, values, legacy, fast, memoized, cache in (
+        ("normalize_time", times, _parse_time, lambda t: _fast_time(t.lower().replace(".", "").replace(" ", "")) or _parse_time(t),
+         normalize_time, _normalize_time),
+        ("normalize_date", dates, _parse_date, lambda d: _fast_date(d, today) or _parse_date(d), normalize_date, _normalize_date),
+    ):
+        inputs = values * (calls // len(values))
+        cache.cache_clear()
+        for label, function in (("strptime chain", legacy), ("fast path", fast), ("memoized", memoized)):
+            start = time.perf_counter()
+            for value in inputs:
+                function(value)
+            _report(f"{name} {label}", len(inputs), time.perf_counter() - start, "calls")
+
+
+FIRST_NAMES = ["Muhammad", "Ayesha", "Hamza", "Sara", "Kamran", "Fatima", "Omar", "Hina", "Bilal", "Zainab", "Usman", "Mariam",
+               "Imran", "Sana", "Faisal", "Nadia", "Tariq", "Amna", "Asad", "Rabia", "Junaid", "Saima", "Adeel", "Hira", "Shahid"]
+SURNAMES = ["Raza", "Ali", "Sheikh", "Ahmad", "Khan", "Malik", "Qureshi", "Siddiqui", "Butt", "Chaudhry", "Hussain", "Iqbal",
+            "Javed", "Mirza", "Nawaz", "Rehman", "Saleem", "Tahir", "Zafar", "Aslam"]
+
+def bench_doctor_lookup(doctors: int = 500, rounds: int = 20):
+    """Doctor lookup by name: two scans of the doctor list vs the precomputed alias index"""
+    import re
+    from .doctor_index import DoctorIndex
+    from .models import Doctor
+
+    names = [f"{first} {last}" for last in SURNAMES for first in FIRST_NAMES][:doctors]
+    roster = [Doctor(id=f"D{i}", name=f"Dr. {name}", specialization="GP", slots=["9:00 AM"]) for i, name in enumerate(names)]
+
+    def scan(name):
+        # What find_doctor_by_name did before: exact pass, then first prefix/substring match
+        name_lower = re.sub(r'(dr\.|doctor|dr)\s*', '', name.lower().strip())
+        for doctor in roster:
+            if name_lower == doctor.name.lower():
+                return doctor
+        for doctor in roster:
+            if doctor.name.lower().startswith(name_lower) or name_lower in doctor.name.lower():
+                return doctor
+        return None
+
+    sample = names[::17]
+    query_sets = {
+        "full name": [f"Dr. {name}" for name in sample],
+        "surname": [name.split()[1] for name in sample],
+        "misspelled": [name[:-2] + name[-1] + name[-2] for name in sample],
+    }
+
+    start = time.perf_counter()
+    index = DoctorIndex(roster)
+    print(f"index built in {(time.perf_counter() - start) * 1000:.1f} ms for {len(roster)} doctors")
+    for kind, queries in query_sets.items():
+        for label, lookup in (("list scans", scan), ("alias index", index.match)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for name in queries:
+                    lookup(name)
+            _report(f"{kind}, {label}", rounds * len(queries), time.perf_counter() - start, "lookups")
+
+
+def _write_clinic_files(directory: str, clinics: int, doctors: int):
+    """Clinic data files with `doctors` doctors each; every clinic reuses doctor IDs D0, D1, ..."""
+    import json
+    import os
+
+    times = ["9:00 AM", "10:00 AM", "11:00 AM", "2:00 PM", "3:00 PM", "4:00 PM"]
+    specializations = ["Cardiologist", "Dermatologist", "Orthopedic", "Pediatrician", "Neurologist"]
+    for i in range(clinics):
+        names = [f"{FIRST_NAMES[(i + j) % len(FIRST_NAMES)]} {SURNAMES[(i * 7 + j) % len(SURNAMES)]}" for j in range(doctors)]
+        data = {
+            "clinic": {"name": f"Clinic {i}", "code": f"C{i:03d}", "address": f"{i} Main Street", "hours": "Mon-Fri 9AM - 6PM",
+                       "contact": f"+92-000-{i:06d}"},
+            "doctors": [{"id": f"D{j}", "name": f"Dr. {name}", "specialization": specializations[j % len(specializations)],
+                         "slots": times[j % 3:j % 3 + 4]} for j, name in enumerate(names)]
+        }
+        with open(os.path.join(directory, f"clinic_{i:03d}.json"), "w") as f:
+            json.dump(data, f)
+
+
+def _multi_clinic_worker(requests: int):
+    """Run in a fresh process by bench_multi_clinic: serve every clinic in CLINIC_DATA_DIR, report JSON"""
+    import json
+    import resource
+    import httpx
+    from . import chains, main, sheets
+    from .models import Appointment
+
+    clinics = [provider.current for provider in main.clinic_registry]
+    main.get_intent_classifier()
+    for clinic_data in clinics:
+        # What a clinic holds once it has served a chat turn and a booking
+        chains.get_chat_chain(clinic_data)
+        sheets.get_clinic_sheet(clinic_data.clinic)
+        doctor = clinic_data.doctors[0]
+        main.appointment_ledger.book(Appointment(patient_name="Ali", patient_age=30, doctor_id=doctor.id, doctor_name=doctor.name,
+                                                 date="2026-03-02", time=doctor.slots[0]), clinic_data.clinic.code, clinic_data)
+
+    calls = [
+        ("POST", "/chat", {"json": {"message": "what are your hours?", "session_id": "bench"}}),
+        ("GET", "/availability", {"params": {"start_date": "2026-03-02", "end_date": "2026-03-08"}}),
+        ("GET", "/doctors", {}),
+    ]
+
+    async def run():
+        latencies = []
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i in range(requests):
+                clinic_code = clinics[i % len(clinics)].clinic.code
+                method, path, kwargs = calls[i // len(clinics) % len(calls)]
+                start = time.perf_counter()
+                response = await client.request(method, f"/clinics/{clinic_code}{path}", **kwargs)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+        return sorted(latencies)
+
+    latencies = asyncio.run(run())
+    print(json.dumps({
+        "clinics": len(clinics),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "llm_clients": len(chains._llms),
+        "sheet_handles": len(sheets._handles),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "requests_per_s": len(latencies) / sum(latencies),
+    }))
+
+
+def bench_multi_clinic(clinics: int = 100, doctors: int = 20, requests: int = 3000):
+    """Memory and latency serving 100 clinics from one process vs one process per clinic"""
+    import json
+    import os
+    import subprocess
+    import tempfile
+
+    def serve(clinic_count: int) -> dict:
+        with tempfile.TemporaryDirectory() as directory:
+            data_dir = os.path.join(directory, "clinics")
+            os.mkdir(data_dir)
+            _write_clinic_files(data_dir, clinic_count, doctors)
+            env = dict(os.environ, CLINIC_DATA_DIR=data_dir, GROQ_API_KEY=os.getenv("GROQ_API_KEY") or "dummy",
+                       LEDGER_DB_PATH=os.path.join(directory, "appointments.db"),
+                       ID_COUNTER_DB_PATH=os.path.join(directory, "id_counters.db"), SESSION_BACKEND="memory")
+            result = subprocess.run(
+                [sys.executable, "-c", f"from app.benchmarks import _multi_clinic_worker; _multi_clinic_worker({requests})"],
+                env=env, capture_output=True, text=True, check=True
+            )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    one, many = serve(1), serve(clinics)
+    print(f"{requests} requests (/chat info question, week /availability, /doctors), {doctors} doctors per clinic")
+    for label, result in (("1 clinic per process", one), (f"{clinics} clinics, one process", many)):
+        print(f"{label:<28} peak RSS {result['peak_rss_mb']:7.1f} MB  p50 {result['p50_ms']:6.2f} ms  "
+              f"p99 {result['p99_ms']:6.2f} ms  {result['requests_per_s']:8.1f} req/s  "
+              f"LLM clients {result['llm_clients']}  sheet handles {result['sheet_handles']}")
+    per_clinic = (many["peak_rss_mb"] - one["peak_rss_mb"]) / (clinics - 1)
+    print(f"{f'{clinics} processes, 1 clinic each':<28} peak RSS ~{one['peak_rss_mb'] * clinics:6.0f} MB in total")
+    print(f"{'':<28} ~{per_clinic:.2f} MB per extra clinic in one process")
+
+
+BENCHMARKS = {
+    "concurrency": bench_concurrency,
+    "chain_registry": bench_chain_registry,
+    "streaming": bench_streaming,
+    "info_fast_path": bench_info_fast_path,
+    "semantic_cache": bench_semantic_cache,
+    "memory": bench_memory,
+    "transcript": bench_transcript,
+    "session_store": bench_session_store,
+    "session_backend": bench_session_backend,
+    "ledger": bench_ledger,
+    "slot_index": bench_slot_index,
+    "availability": bench_availability,
+    "slot_bitmap": bench_slot_bitmap,
+    "extractor": bench_extractor,
+    "normalize": bench_normalize,
+    "doctor_lookup": bench_doctor_lookup,
+    "multi_clinic": bench_multi_clinic,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
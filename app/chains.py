@@ -2,12 +2,74 @@ from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
 from langchain.schema import BaseOutputParser
+from langchain_core.runnables import Runnable
 
 from langchain_groq.chat_models import ChatGroq
+import asyncio
+import hashlib
 import os
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, AsyncIterator, Tuple
 from .models import ClinicData
 
+# Maximum number of LLM calls a single worker keeps in flight at once
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+LLM_MODEL_NAME = "llama-3.3-70b-versatile"
+# Smaller model for rolling conversation summaries, which run in the background
+SUMMARY_MODEL_NAME = os.getenv("SUMMARY_MODEL_NAME", "llama-3.1-8b-instant")
+
+# Process-wide Groq clients, one per model, so every chain shares the same
+# keep-alive connection pool to the provider whatever its temperature
+_llms: Dict[str, ChatGroq] = {}
+
+# Built chains keyed by (kind, clinic code) -> (clinic data version, chain)
+_chains: Dict[Tuple[str, str], Tuple[str, LLMChain]] = {}
+_registry_lock = threading.RLock()
+
+def get_llm(temperature: float, model_name: str = LLM_MODEL_NAME) -> Runnable:
+    """
+    Return the shared Groq client for this model, creating it on first use, with
+    the temperature bound to each call rather than baked into a client of its own
+    """
+    llm = _llms.get(model_name)
+    if llm is None:
+        with _registry_lock:
+            llm = _llms.get(model_name)
+            if llm is None:
+                llm = ChatGroq(
+                    model_name=model_name,
+                    groq_api_key=os.getenv("GROQ_API_KEY")
+                )
+                _llms[model_name] = llm
+    return llm.bind(temperature=temperature)
+
+def clinic_data_version(clinic_data: ClinicData) -> str:
+    """Fingerprint of the clinic data; cached chains are rebuilt when it changes"""
+    # Snapshots from the clinic data provider carry theirs
+    version = getattr(clinic_data, "version", None)
+    if version:
+        return version
+    return hashlib.sha1(clinic_data.model_dump_json().encode()).hexdigest()
+
+def _get_cached_chain(kind: str, clinic_data, factory) -> LLMChain:
+    clinic_code = clinic_data.clinic.code if clinic_data else ""
+    version = clinic_data_version(clinic_data) if clinic_data else ""
+    key = (kind, clinic_code)
+    
+    cached = _chains.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    with _registry_lock:
+        cached = _chains.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        chain = factory()
+        _chains[key] = (version, chain)
+        return chain
+
 # Since you're using Groq, we'll need to set up the appropriate model
 # For now, I'll use OpenAI as an example. You'll need to adjust for Groq.
 
@@ -69,11 +131,7 @@ def create_chat_chain(clinic_data):
         """
     )
     
-    llm = ChatGroq(
-        model_name="llama-3.3-70b-versatile",
-        temperature=0.3,
-        groq_api_key=os.getenv("GROQ_API_KEY")
-    )
+    llm = get_llm(temperature=0.3)
     
     return LLMChain(llm=llm, prompt=prompt_template)
 
@@ -159,11 +217,7 @@ def create_extraction_chain(clinic_data: ClinicData):
     )
     
     # Use Groq instead of OpenAI
-    llm = ChatGroq(
-        model_name="llama-3.3-70b-versatile",  # Or another Groq model
-        temperature=0.7,
-        groq_api_key=os.getenv("GROQ_API_KEY")
-    )
+    llm = get_llm(temperature=0.7)
     
     return LLMChain(llm=llm, prompt=prompt_template, output_parser=InfoExtractor())
 
@@ -187,11 +241,78 @@ def create_confirmation_chain():
     # )
 
     # Use Groq instead of OpenAI
-    llm = ChatGroq(
-        model_name="llama-3.3-70b-versatile",  # Or another Groq model
-        temperature=0.3,
-        groq_api_key=os.getenv("GROQ_API_KEY")
-    )
+    llm = get_llm(temperature=0.3)
 
     
-    return LLMChain(llm=llm, prompt=prompt_template)
\ No newline at end of file
+    return LLMChain(llm=llm, prompt=prompt_template)
+
+def create_summary_chain():
+    prompt_template = PromptTemplate(
+        input_variables=["summary", "new_lines"],
+        template="""
+        Progressively summarize the conversation between a clinic assistant and a patient,
+        adding onto the previous summary and returning a new summary.
+        Always keep any appointment details the patient gave (name, age, doctor, date, time)
+        and whether a booking was confirmed.
+        
+        Current summary:
+        {summary}
+        
+        New lines of conversation:
+        {new_lines}
+        
+        New summary:
+        """
+    )
+    
+    llm = get_llm(temperature=0.0, model_name=SUMMARY_MODEL_NAME)
+    
+    return LLMChain(llm=llm, prompt=prompt_template)
+
+async def arun_chain(chain: LLMChain, inputs: Dict[str, Any]) -> str:
+    """
+    Run a chain through its async path so the event loop keeps serving other sessions
+    while the provider round-trip is in flight
+    """
+    async with _llm_semaphore:
+        result = await chain.ainvoke(inputs)
+
+    # ainvoke returns the inputs alongside the generated text
+    result = result[chain.output_key]
+    # Ensure response is a string
+    if isinstance(result, dict):
+        result = str(result)
+    return result
+
+
+async def astream_chain(chain: LLMChain, inputs: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Stream a chain's reply token by token as the provider generates it
+    """
+    prompt_value = chain.prompt.format_prompt(**{key: inputs[key] for key in chain.prompt.input_variables})
+    async with _llm_semaphore:
+        async for chunk in chain.llm.astream(prompt_value):
+            if chunk.content:
+                yield chunk.content
+
+def get_chat_chain(clinic_data: ClinicData) -> LLMChain:
+    """Cached chat chain for this clinic, rebuilt only when the clinic data changes"""
+    return _get_cached_chain("chat", clinic_data, lambda: create_chat_chain(clinic_data))
+
+def get_extraction_chain(clinic_data: ClinicData) -> LLMChain:
+    """Cached extraction chain for this clinic, rebuilt only when the clinic data changes"""
+    return _get_cached_chain("extraction", clinic_data, lambda: create_extraction_chain(clinic_data))
+
+def get_confirmation_chain() -> LLMChain:
+    """Cached confirmation chain; it does not depend on clinic data"""
+    return _get_cached_chain("confirmation", None, create_confirmation_chain)
+
+def get_summary_chain() -> LLMChain:
+    """Cached conversation summary chain; it does not depend on clinic data"""
+    return _get_cached_chain("summary", None, create_summary_chain)
+
+def clear_chain_cache():
+    """Drop all cached chains and clients, e.g. after rotating the API key"""
+    with _registry_lock:
+        _chains.clear()
+        _llms.clear()
@@ -0,0 +1,202 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .doctor_index import DoctorIndex
+from .models import ClinicData, Doctor
+from .utils import normalized_doctor_slots
+
+CLINIC_DATA_PATH = os.getenv("CLINIC_DATA_PATH", os.path.join(os.path.dirname(__file__), "data", "clinic_data.json"))
+# Directory of clinic data files, one clinic per *.json file, served by one process.
+# When unset only CLINIC_DATA_PATH is loaded.
+CLINIC_DATA_DIR = os.getenv("CLINIC_DATA_DIR", "")
+# Clinic code used by requests that name none; defaults to the first clinic loaded
+DEFAULT_CLINIC_CODE = os.getenv("DEFAULT_CLINIC_CODE", "")
+# How often the files are checked for changes
+CLINIC_DATA_POLL_INTERVAL = float(os.getenv("CLINIC_DATA_POLL_INTERVAL", "2"))
+
+def doctors_list(doctors: List[Doctor]) -> str:
+    """The doctors block of the chat prompt"""
+    return "\n".join(f"- {doc.name} ({doc.specialization}): Available at {', '.join(doc.slots)}" for doc in doctors)
+
+class ClinicSnapshot:
+    """
+    One version of the clinic data and the views derived from it, computed once.
+    Exposes `clinic` and `doctors` like ClinicData, so it can be passed wherever
+    clinic data is read. Never modified after creation.
+    """
+
+    def __init__(self, data: ClinicData, version: Optional[str] = None):
+        self.data = data
+        self.clinic = data.clinic
+        self.doctors = data.doctors
+        self.version = version or hashlib.sha1(data.model_dump_json().encode()).hexdigest()
+        self.loaded_at = time.time()
+        self.doctors_list = doctors_list(data.doctors)
+        self.doctors_by_id: Dict[str, Doctor] = {doctor.id: doctor for doctor in data.doctors}
+        # Each doctor's slots paired with their normalized times
+        self.doctor_slots = normalized_doctor_slots(data.doctors)
+        # Built here rather than taken from get_doctor_index, whose cache only holds a few clinics
+        self.doctor_index = DoctorIndex(data.doctors)
+        # The sheet a clinic books into is configuration, not something to publish
+        self.as_dict: Dict[str, Any] = data.model_dump(exclude={"clinic": {"sheet_key", "sheet_title"}})
+
+def _stat_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def load_snapshot(path: str) -> ClinicSnapshot:
+    with open(path, "r") as f:
+        return ClinicSnapshot(ClinicData(**json.load(f)))
+
+class ClinicDataProvider:
+    """
+    The current clinic data snapshot, reloaded when the file changes. A reload
+    builds the new snapshot completely before swapping it in, so readers see the
+    old version or the new one, never a mix; a file that fails to load or
+    validate, or now names another clinic, is reported and the current snapshot kept.
+    """
+
+    def __init__(self, path: str = CLINIC_DATA_PATH):
+        self.path = path
+        self.reloads = 0
+        self.errors = 0
+        self._signature = _stat_signature(path)
+        self._current = load_snapshot(path)
+        self._watcher: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> ClinicSnapshot:
+        return self._current
+
+    def reload(self, force: bool = False) -> bool:
+        """Swap in the file's contents if it changed; returns whether the version changed"""
+        signature = _stat_signature(self.path)
+        if signature is None or (signature == self._signature and not force):
+            return False
+        self._signature = signature
+        try:
+            snapshot = load_snapshot(self.path)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error reloading clinic data from {self.path}, keeping version {self._current.version[:8]}: {e}")
+            return False
+        if snapshot.clinic.code != self._current.clinic.code:
+            # Requests and bookings are routed by code, so a file keeps its clinic
+            self.errors += 1
+            print(f"Not reloading {self.path}: clinic code changed from {self._current.clinic.code} to {snapshot.clinic.code}")
+            return False
+        if snapshot.version == self._current.version:
+            return False
+        self._current = snapshot
+        self.reloads += 1
+        print(f"Loaded clinic data version {snapshot.version[:8]} from {self.path}")
+        return True
+
+    async def _watch_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.get_running_loop().run_in_executor(None, self.reload)
+
+    def start_watcher(self, interval: float = CLINIC_DATA_POLL_INTERVAL):
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch_forever(interval))
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+def clinic_data_paths(directory: str = CLINIC_DATA_DIR, path: str = CLINIC_DATA_PATH) -> List[str]:
+    if directory:
+        return sorted(glob.glob(os.path.join(directory, "*.json")))
+    return [path]
+
+class ClinicRegistry:
+    """
+    Every clinic served by this process, by clinic code, each with its own
+    ClinicDataProvider. Files added to CLINIC_DATA_DIR later are picked up by
+    reload(); a file whose clinic code is already taken is skipped. Requests that
+    name no clinic go to default_code.
+    """
+
+    def __init__(self, paths: Optional[List[str]] = None, directory: str = CLINIC_DATA_DIR,
+                 default_code: str = DEFAULT_CLINIC_CODE):
+        self.directory = directory
+        self.errors = 0
+        self._providers: Dict[str, ClinicDataProvider] = {}
+        self._paths: Dict[str, str] = {}  # path -> clinic code
+        # Files that failed to load, by stat signature, retried once they change
+        self._rejected: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        for path in paths if paths is not None else clinic_data_paths(directory):
+            self._add(path)
+        if not self._providers:
+            raise ValueError(f"No clinic data could be loaded from {directory or paths}")
+        self.default_code = default_code or next(iter(self._providers))
+        if self.default_code not in self._providers:
+            raise ValueError(f"Default clinic {self.default_code} is not among the clinics loaded")
+
+    def _add(self, path: str) -> bool:
+        try:
+            provider = ClinicDataProvider(path)
+        except Exception as e:
+            print(f"Error loading clinic data from {path}: {e}")
+            provider = None
+        code = provider.current.clinic.code if provider else None
+        if provider and code in self._providers:
+            print(f"Skipping {path}: clinic code {code} is already loaded from {self._providers[code].path}")
+            provider = None
+        if provider is None:
+            self.errors += 1
+            self._rejected[path] = _stat_signature(path)
+            return False
+        self._providers[code] = provider
+        self._paths[path] = code
+        self._rejected.pop(path, None)
+        return True
+
+    def get(self, code: str) -> Optional[ClinicDataProvider]:
+        return self._providers.get(code)
+
+    @property
+    def default(self) -> ClinicDataProvider:
+        return self._providers[self.default_code]
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def __iter__(self) -> Iterator[ClinicDataProvider]:
+        return iter(list(self._providers.values()))
+
+    def reload(self) -> int:
+        """Reload changed files and load new ones; returns how many clinics changed or were added"""
+        changed = sum(provider.reload() for provider in self)
+        if self.directory:
+            for path in clinic_data_paths(self.directory):
+                if path in self._paths or (path in self._rejected and self._rejected[path] == _stat_signature(path)):
+                    continue
+                if self._add(path):
+                    changed += 1
+        return changed
+
+    async def _watch_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.get_running_loop().run_in_executor(None, self.reload)
+
+    def start_watcher(self, interval: float = CLINIC_DATA_POLL_INTERVAL):
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch_forever(interval))
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
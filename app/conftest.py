@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app import sheets
+from app.id_allocator import IdAllocator
+from app.clinic_store import load_snapshot
+
+HEADER = ["appointment_id", "patient_name", "patient_age", "doctor_id", "doctor_name",
+          "date", "time", "status", "created_at"]
+
+class FakeWorksheet:
+    """Worksheet stand-in that counts read and write requests and can fail appends"""
+
+    col_count = len(HEADER)
+
+    def __init__(self, rows, latency: float = 0.0):
+        self.values = [HEADER] + rows
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        # The next this many appends raise; with land_failed_appends the rows are
+        # written first, like a request that timed out after reaching the sheet
+        self.failing_appends = 0
+        self.land_failed_appends = False
+
+    def get_all_values(self):
+        self.reads += 1
+        return [list(row) for row in self.values]
+
+    def get_values(self, range_name):
+        self.reads += 1
+        time.sleep(self.latency)
+        start_row = int(range_name.split(":")[0][1:])
+        return [list(row) for row in self.values[start_row - 1:]]
+
+    def get_all_records(self):
+        self.reads += 1
+        return [dict(zip(HEADER, row)) for row in self.values[1:]]
+
+    def col_values(self, col):
+        self.reads += 1
+        return [row[col - 1] for row in self.values]
+
+    def append_row(self, row):
+        self.append_rows([row])
+
+    def append_rows(self, rows):
+        self.writes += 1
+        time.sleep(self.latency)
+        if self.failing_appends:
+            self.failing_appends -= 1
+            if self.land_failed_appends:
+                self.values.extend(list(row) for row in rows)
+            raise ConnectionError("Sheets API timed out")
+        self.values.extend(list(row) for row in rows)
+
+@pytest.fixture
+def worksheet(monkeypatch, tmp_path):
+    sheet = FakeWorksheet([
+        ["CHMR1", "Ali", "30", "MR", "Dr. Muhammad Raza", "2026-11-02", "9:00 AM", "pending", ""],
+        ["CHMR4", "Sara", "25", "MR", "Dr. Muhammad Raza", "2026-11-03", "10:00 AM", "pending", ""],
+    ])
+    # Every clinic's handle opens this sheet; clinic sheets are created afresh against it
+    monkeypatch.setattr(sheets.SheetHandle, "worksheet", lambda self: sheet)
+    id_allocator = IdAllocator(str(tmp_path / "id_counters.db"))
+    monkeypatch.setattr(sheets, "id_allocator", id_allocator)
+    monkeypatch.setattr(sheets, "default_sheet", sheets.ClinicSheet(sheets.sheet_handle, id_allocator))
+    monkeypatch.setattr(sheets, "_clinic_sheets", {})
+    return sheet
+
+
+@pytest.fixture
+def clinic_data():
+    return load_snapshot("app/data/clinic_data.json")
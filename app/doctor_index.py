@@ -0,0 +1,128 @@
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .models import Doctor
+
+# Trigram (Dice) similarity a misspelled name needs to match a doctor
+DOCTOR_FUZZY_MIN_SIMILARITY = float(os.getenv("DOCTOR_FUZZY_MIN_SIMILARITY", "0.5"))
+
+TITLES = {"dr", "doctor", "dctor"}
+
+def name_tokens(name: str) -> List[str]:
+    """Lower-case words of a name, without punctuation or titles like "Dr." """
+    return [token for token in re.findall(r"[a-z0-9]+", name.lower()) if token not in TITLES]
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class DoctorIndex:
+    """
+    Doctors by normalized full name, ID and name words (first names, surnames),
+    plus a trigram index over the distinct name words for misspellings, built once
+    per clinic. match() tries those in that order and returns every doctor the
+    first matching kind of key points to, so "Ali" with two Dr. Alis comes back
+    as both rather than whichever is listed first.
+    """
+
+    def __init__(self, doctors: List[Doctor]):
+        self.doctors = doctors
+        self.by_full_name: Dict[str, List[int]] = defaultdict(list)
+        self.by_id: Dict[str, List[int]] = defaultdict(list)
+        self.by_token: Dict[str, Set[int]] = defaultdict(set)
+        self.by_specialization: Dict[str, List[int]] = defaultdict(list)
+
+        for i, doctor in enumerate(doctors):
+            tokens = name_tokens(doctor.name)
+            self.by_full_name[" ".join(tokens)].append(i)
+            self.by_id[doctor.id.lower()].append(i)
+            for token in tokens:
+                self.by_token[token].add(i)
+            specialization = doctor.specialization.lower()
+            for key in {specialization, specialization.rstrip("s") + "s"}:
+                self.by_specialization[key].append(i)
+
+        # Name words are shared between doctors, so this stays small as the roster grows
+        self.token_trigrams = {token: trigrams(token) for token in self.by_token}
+        self.by_trigram: Dict[str, List[str]] = defaultdict(list)
+        for token, token_trigrams in self.token_trigrams.items():
+            for trigram in token_trigrams:
+                self.by_trigram[trigram].append(token)
+
+    def _doctors(self, indexes) -> List[Doctor]:
+        return [self.doctors[i] for i in sorted(set(indexes))]
+
+    def closest_tokens(self, word: str, min_similarity: float = DOCTOR_FUZZY_MIN_SIMILARITY) -> List[str]:
+        """Name words most similar to word by trigram Dice coefficient, all of them on a tie"""
+        word_trigrams = trigrams(word)
+        shared = Counter(token for trigram in word_trigrams for token in self.by_trigram.get(trigram, ()))
+        best, closest = min_similarity, []
+        for token, count in shared.items():
+            similarity = 2 * count / (len(word_trigrams) + len(self.token_trigrams[token]))
+            if similarity > best + 1e-9:
+                best, closest = similarity, [token]
+            elif similarity >= best - 1e-9:
+                closest.append(token)
+        return closest
+
+    def match(self, name: str, min_similarity: float = DOCTOR_FUZZY_MIN_SIMILARITY) -> List[Doctor]:
+        """
+        Doctors the name refers to: one on a clear match, several when it is
+        ambiguous, none when nothing is close enough
+        """
+        if not name:
+            return []
+        tokens = name_tokens(name)
+        if not tokens:
+            return []
+        query = " ".join(tokens)
+
+        exact = self.by_full_name.get(query) or self.by_id.get(query)
+        if exact:
+            return self._doctors(exact)
+
+        # Every word names the same doctor(s), in any order: "raza", "ali kamran"
+        candidates = self._token_doctors(tokens, lambda token: [token] if token in self.by_token else [])
+        if candidates:
+            return self._doctors(candidates)
+
+        # The same with misspelled words replaced by the closest name words: "razza"
+        return self._doctors(self._token_doctors(
+            tokens, lambda token: [token] if token in self.by_token else self.closest_tokens(token, min_similarity)
+        ))
+
+    def _token_doctors(self, tokens: List[str], resolve: Callable[[str], List[str]]) -> Set[int]:
+        candidates = None
+        for token in tokens:
+            doctors = {i for name_token in resolve(token) for i in self.by_token[name_token]}
+            candidates = doctors if candidates is None else candidates & doctors
+            if not candidates:
+                return set()
+        return candidates
+
+    def find(self, name: str) -> Optional[Doctor]:
+        """The doctor the name refers to, or None if there is no match or more than one"""
+        matches = self.match(name)
+        return matches[0] if len(matches) == 1 else None
+
+    def mentioned(self, text: str) -> List[Doctor]:
+        """Doctors named or whose specialization is mentioned in free text"""
+        words = set(re.findall(r"[a-z]+", text.lower()))
+        indexes = [i for word in words for i in self.by_token.get(word, ())]
+        indexes += [i for word in words for i in self.by_specialization.get(word, ())]
+        return self._doctors(indexes)
+
+# Index per doctor list; clinic data is replaced, not edited in place
+_indexes: Dict[int, Tuple[List[Doctor], DoctorIndex]] = {}
+
+MAX_CACHED_INDEXES = 8
+
+def get_doctor_index(doctors: List[Doctor]) -> DoctorIndex:
+    cached = _indexes.get(id(doctors))
+    if cached is None or cached[0] is not doctors:
+        if len(_indexes) >= MAX_CACHED_INDEXES:
+            _indexes.clear()
+        cached = _indexes[id(doctors)] = (doctors, DoctorIndex(doctors))
+    return cached[1]
@@ -2,9 +2,24 @@ import re
 from typing import Dict, Any
 from datetime import datetime, timedelta
 
-def extract_appointment_info(text: str, current_state: Dict[str, Any] = None) -> Dict[str, Any]:
+from .intent import asks_to_book, classify_intent
+
+# Improved patterns to extract information
+FIELD_PATTERNS = {
+    'name': r'(?:name is|I am|call me|my name is|I\'m|named)\s+([A-Za-z]+(?:\s+[A-Za-z]+){0,2})',
+    'age': r'(?:age|I am|I\'m)\s+(\d+)',
+    'doctor': r'(?:doctor|dr\.|dctor|with|book with)\s+([A-Za-z]+(?:\s+[A-Za-z]+){0,2})',
+    'date': r'(?:on|for|date)\s+([A-Za-z0-9\s,]+)',
+    'time': r'(?:at|around|time)\s+([0-9:]+[ap]m|[0-9]+\s*[ap]m|[0-9]+\s*o\'clock)'
+}
+
+# Compiled once at import rather than on every call
+COMPILED_FIELD_PATTERNS = {field: re.compile(pattern, re.IGNORECASE) for field, pattern in FIELD_PATTERNS.items()}
+
+def extract_appointment_info(text: str, current_state: Dict[str, Any] = None, only_missing: bool = False) -> Dict[str, Any]:
     """
-    Enhanced regex-based extraction of appointment information with context awareness
+    Enhanced regex-based extraction of appointment information with context awareness.
+    With only_missing, fields already filled in current_state are not looked for.
     """
     if current_state is None:
         current_state = {}
@@ -12,15 +27,6 @@ def extract_appointment_info(text: str, current_state: Dict[str, Any] = None) ->
     extracted = current_state.copy()
     text_lower = text.lower()
     
-    # Improved patterns to extract information
-    patterns = {
-        'name': r'(?:name is|I am|call me|my name is|I\'m|named)\s+([A-Za-z]+(?:\s+[A-Za-z]+){0,2})',
-        'age': r'(?:age|I am|I\'m)\s+(\d+)',
-        'doctor': r'(?:doctor|dr\.|dctor|with|book with)\s+([A-Za-z]+(?:\s+[A-Za-z]+){0,2})',
-        'date': r'(?:on|for|date)\s+([A-Za-z0-9\s,]+)',
-        'time': r'(?:at|around|time)\s+([0-9:]+[ap]m|[0-9]+\s*[ap]m|[0-9]+\s*o\'clock)'
-    }
-    
     # Handle relative dates
     today = datetime.now()
     
@@ -31,9 +37,11 @@ def extract_appointment_info(text: str, current_state: Dict[str, Any] = None) ->
     elif 'next week' in text_lower:
         extracted['date'] = (today + timedelta(days=7)).strftime('%Y-%m-%d')
     
-    # Extract information using patterns
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
+    # Extract information using the precompiled patterns
+    for key, pattern in COMPILED_FIELD_PATTERNS.items():
+        if only_missing and current_state.get(key) and current_state[key] != "empty":
+            continue
+        match = pattern.search(text)
         if match:
             extracted[key] = match.group(1).strip()
     
@@ -59,27 +67,46 @@ def extract_appointment_info(text: str, current_state: Dict[str, Any] = None) ->
     
     return extracted
 
-def has_booking_intent(text: str) -> bool:
+def parse_extracted_block(response_text: str) -> Dict[str, Any]:
     """
-    Check if the user wants to book an appointment
+    Parse the "Extracted:" block the chat prompt asks the model to emit
     """
-    booking_keywords = [
-        'book', 'appointment', 'schedule', 'reserve', 
-        'see a doctor', 'meet with', 'visit doctor', 'confirm',
-        'yes', 'yeah', 'sure', 'ok', 'okay', 'please'
-    ]
+    extracted = {}
+    block = re.search(r'Extracted:\s*\n(.*)', response_text, re.IGNORECASE | re.DOTALL)
+    if not block:
+        return extracted
     
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in booking_keywords)
+    for line in block.group(1).split('\n'):
+        match = re.match(r'\s*[-*]?\s*(name|age|doctor|date|time)\s*:\s*(.*)', line, re.IGNORECASE)
+        if not match:
+            continue
+        key = match.group(1).lower()
+        value = match.group(2).strip().strip('[]').strip()
+        if value.lower() in ('', 'empty', 'none', 'n/a', 'unknown'):
+            continue
+        if key == 'age':
+            # Keep just the number, e.g. "23 years" -> "23"
+            digits = re.search(r'\d+', value)
+            if not digits:
+                continue
+            value = digits.group(0)
+        extracted.setdefault(key, value)
+    
+    return extracted
+
+def has_booking_intent(text: str) -> bool:
+    """
+    Check if the user wants to book an appointment, or is agreeing to one
+    """
+    intent = classify_intent(text)
+    if intent in ("booking", "confirm"):
+        return True
+    # All-in-one requests ("Fatima, 23, Dr. Raza, 20 nov, 10am, book it") can read as
+    # "other" to the classifier; asking to book and giving details settles it
+    return intent != "deny" and asks_to_book(text) and bool(extract_appointment_info(text))
 
 def has_info_intent(text: str) -> bool:
     """
     Check if the user wants information
     """
-    info_keywords = [
-        'info', 'information', 'tell me', 'what is', 'who is',
-        'details', 'about', 'explain', 'describe', 'know'
-    ]
-    
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in info_keywords)
\ No newline at end of file
+    return classify_intent(text) == "info"
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable
+
+# Per-prefix counters for the direct-to-sheet path; the ledger keeps its own in its database
+ID_COUNTER_DB_PATH = os.getenv("ID_COUNTER_DB_PATH", "app/data/id_counters.db")
+
+COUNTERS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS id_counters (
+        id_prefix TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL
+    )
+"""
+
+def sequence_number(appointment_id: str, id_prefix: str) -> int:
+    """The number after id_prefix in an ID like CHMR12, or 0 if the ID has another prefix"""
+    if not appointment_id.startswith(id_prefix):
+        return 0
+    try:
+        return int(appointment_id[len(id_prefix):])
+    except ValueError:
+        return 0
+
+def allocate_sequence(conn: sqlite3.Connection, id_prefix: str) -> int:
+    """Atomically take the next sequence number for id_prefix"""
+    return conn.execute(
+        "INSERT INTO id_counters (id_prefix, last_seq) VALUES (?, 1) "
+        "ON CONFLICT (id_prefix) DO UPDATE SET last_seq = last_seq + 1 RETURNING last_seq",
+        (id_prefix,)
+    ).fetchone()[0]
+
+def observe_sequences(conn: sqlite3.Connection, high_water: Dict[str, int]):
+    """Raise counters to numbers already in use; counters never go down"""
+    conn.executemany(
+        "INSERT INTO id_counters (id_prefix, last_seq) VALUES (?, ?) "
+        "ON CONFLICT (id_prefix) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)",
+        list(high_water.items())
+    )
+
+class IdAllocator:
+    """
+    High-water mark per clinic/doctor ID prefix, persisted in SQLite so numbers
+    are never reused across restarts or between worker processes. Counters are
+    raised to IDs seen in the sheet through observe_ids.
+    """
+
+    def __init__(self, path: str = ID_COUNTER_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(COUNTERS_SCHEMA)
+        # Last known counter per prefix; may lag other processes, which only costs a redundant write
+        self._last: Dict[str, int] = dict(self._conn.execute("SELECT id_prefix, last_seq FROM id_counters").fetchall())
+
+    def knows(self, id_prefix: str) -> bool:
+        return id_prefix in self._last
+
+    def register(self, id_prefix: str):
+        """Start counting a prefix; IDs observed after this count toward it"""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO id_counters VALUES (?, 0)", (id_prefix,))
+            self._last.setdefault(id_prefix, 0)
+
+    def next_sequence(self, id_prefix: str) -> int:
+        with self._lock:
+            seq_num = allocate_sequence(self._conn, id_prefix)
+            self._last[id_prefix] = seq_num
+            return seq_num
+
+    def observe_ids(self, appointment_ids: Iterable[str]):
+        """Raise the counters of known prefixes to the highest of these IDs"""
+        high_water: Dict[str, int] = defaultdict(int)
+        prefixes = set(self._last)
+        for appointment_id in appointment_ids:
+            # Look up each split before the trailing digits rather than trying every
+            # known prefix, which grows with the number of clinics and doctors
+            digits = len(appointment_id) - len(appointment_id.rstrip("0123456789"))
+            for split in range(len(appointment_id) - digits, len(appointment_id)):
+                prefix = appointment_id[:split]
+                if prefix in prefixes:
+                    seq_num = int(appointment_id[split:])
+                    if seq_num > high_water[prefix]:
+                        high_water[prefix] = seq_num
+        with self._lock:
+            raised = {prefix: seq_num for prefix, seq_num in high_water.items() if seq_num > self._last.get(prefix, 0)}
+            if raised:
+                observe_sequences(self._conn, raised)
+                self._last.update(raised)
+
+    def last_sequence(self, id_prefix: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT last_seq FROM id_counters WHERE id_prefix = ?", (id_prefix,)).fetchone()
+        return row[0] if row else 0
@@ -0,0 +1,342 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .id_allocator import COUNTERS_SCHEMA, allocate_sequence, observe_sequences
+from .models import Appointment
+from .slot_bitmap import slot_taken_result
+from .utils import normalize_time
+
+# With the ledger enabled, bookings are committed to a local SQLite database and
+# replicated to Google Sheets in the background; otherwise they go straight to the sheet
+LEDGER_ENABLED = os.getenv("LEDGER_ENABLED", "true").lower() == "true"
+LEDGER_DB_PATH = os.getenv("LEDGER_DB_PATH", "app/data/appointments.db")
+REPLICATION_BATCH_SIZE = int(os.getenv("REPLICATION_BATCH_SIZE", "50"))
+# After a booking wakes the replicator, it waits this long for more rows to batch with it
+REPLICATION_FLUSH_WINDOW = float(os.getenv("REPLICATION_FLUSH_WINDOW", "0.5"))
+REPLICATION_MAX_BACKOFF = float(os.getenv("REPLICATION_MAX_BACKOFF", "300"))
+# A claimed outbox row not pushed within this long (e.g. its worker died) is retried
+REPLICATION_LEASE_SECONDS = float(os.getenv("REPLICATION_LEASE_SECONDS", "120"))
+
+class AppointmentLedger:
+    """
+    Durable local record of appointments for every clinic, which slots are
+    scoped to. A booking is checked for conflicts, given the next ID from its
+    prefix's counter and queued in the replication outbox in one SQLite
+    transaction, so it is safe across threads and worker processes.
+    """
+
+    def __init__(self, path: str = LEDGER_DB_PATH):
+        self.path = path
+        # Called after each committed booking, e.g. to wake the replicator
+        self.on_booked: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS appointments (
+                appointment_id TEXT PRIMARY KEY,
+                id_prefix TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                patient_name TEXT,
+                patient_age INTEGER,
+                doctor_id TEXT NOT NULL,
+                doctor_name TEXT,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                slot_time TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT,
+                clinic_code TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS appointments_prefix ON appointments (id_prefix, seq);
+            CREATE INDEX IF NOT EXISTS appointments_date ON appointments (date);
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                appointment_id TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            );
+        """)
+        self._migrate_clinic_code()
+        self._conn.execute(COUNTERS_SCHEMA)
+        # Counters start at the highest number already booked (e.g. a ledger created before they existed)
+        observe_sequences(self._conn, dict(self._conn.execute(
+            "SELECT id_prefix, MAX(seq) FROM appointments GROUP BY id_prefix"
+        ).fetchall()))
+
+    def _migrate_clinic_code(self):
+        """Scope slots to clinics in ledgers created when they belonged to one clinic"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked inside the transaction, as another worker may be migrating too
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(appointments)")]
+            if "clinic_code" not in columns:
+                self._conn.execute("ALTER TABLE appointments ADD COLUMN clinic_code TEXT NOT NULL DEFAULT ''")
+                # IDs are clinic code + doctor ID + number, so the prefix minus the doctor ID is the clinic
+                self._conn.execute(
+                    "UPDATE appointments SET clinic_code = substr(id_prefix, 1, length(id_prefix) - length(doctor_id)) "
+                    "WHERE substr(id_prefix, length(id_prefix) - length(doctor_id) + 1) = doctor_id"
+                )
+                self._conn.execute("DROP INDEX IF EXISTS appointments_slot")
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS appointments_clinic_slot "
+                "ON appointments (clinic_code, doctor_id, date, slot_time) WHERE status != 'cancelled'"
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def booked_slots(self, doctor_id: str, date: str, clinic_code: str) -> List[str]:
+        rows = self._execute(
+            "SELECT slot_time FROM appointments WHERE clinic_code = ? AND doctor_id = ? AND date = ? AND status != 'cancelled'",
+            (clinic_code, doctor_id, date)
+        )
+        return [row[0] for row in rows]
+
+    def booked_slots_grid(self, doctor_ids: List[str], start_date: str, end_date: str,
+                          clinic_code: str) -> Dict[Tuple[str, str], Set[str]]:
+        """Booked normalized times per (doctor_id, date) in a date range, from one query"""
+        rows = self._execute(
+            f"SELECT doctor_id, date, slot_time FROM appointments WHERE clinic_code = ? AND date BETWEEN ? AND ? "
+            f"AND doctor_id IN ({', '.join('?' * len(doctor_ids))}) AND status != 'cancelled'",
+            (clinic_code, start_date, end_date, *doctor_ids)
+        )
+        booked: Dict[Tuple[str, str], Set[str]] = {}
+        for doctor_id, date, slot_time in rows:
+            booked.setdefault((doctor_id, date), set()).add(slot_time)
+        return booked
+
+    def available_slots(self, doctor_id: str, date: str, clinic_data) -> List[str]:
+        """
+        Get available time slots for a doctor on a specific date, from a clinic data snapshot
+        """
+        slots = clinic_data.doctor_slots.get(doctor_id)
+        if not slots:
+            return []
+        booked_slots = set(self.booked_slots(doctor_id, date, clinic_data.clinic.code))
+        return [slot for slot, slot_time in slots if slot_time not in booked_slots]
+
+    def book(self, appointment: Appointment, clinic_code: str, clinic_data) -> Dict:
+        """
+        Commit the appointment locally and queue it for the sheet. Returns the same
+        result as save_appointment_to_sheet.
+        """
+        prefix = f"{clinic_code}{appointment.doctor_id}"
+        slot_time = normalize_time(appointment.time)
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        taken = False
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    taken = self._conn.execute(
+                        "SELECT 1 FROM appointments WHERE clinic_code = ? AND doctor_id = ? AND date = ? AND slot_time = ? "
+                        "AND status != 'cancelled'",
+                        (clinic_code, appointment.doctor_id, appointment.date, slot_time)
+                    ).fetchone() is not None
+                    if taken:
+                        self._conn.execute("ROLLBACK")
+                    else:
+                        appointment_id = self._insert_booking(appointment, clinic_code, prefix, slot_time, created_at)
+                        self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            if taken:
+                return self._conflict_result(appointment, clinic_code, clinic_data)
+        except Exception as e:
+            print(f"Error saving appointment to ledger: {e}")
+            return {
+                "success": False,
+                "message": "Failed to save appointment. Please try again."
+            }
+
+        appointment.appointment_id = appointment_id
+        appointment.created_at = created_at
+        if self.on_booked:
+            self.on_booked()
+
+        return {
+            "success": True,
+            "message": f"Appointment confirmed! Your appointment ID is: {appointment.appointment_id}",
+            "appointment_id": appointment.appointment_id
+        }
+
+    def _insert_booking(self, appointment: Appointment, clinic_code: str, prefix: str, slot_time: str, created_at: str) -> str:
+        # Runs inside the booking transaction
+        seq_num = allocate_sequence(self._conn, prefix)
+        appointment_id = f"{prefix}{seq_num}"
+        self._conn.execute(
+            "INSERT INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (appointment_id, prefix, seq_num, appointment.patient_name, appointment.patient_age,
+             appointment.doctor_id, appointment.doctor_name, appointment.date, appointment.time,
+             slot_time, appointment.status, created_at, clinic_code)
+        )
+        self._conn.execute("INSERT INTO outbox (appointment_id) VALUES (?)", (appointment_id,))
+        return appointment_id
+
+    def _conflict_result(self, appointment: Appointment, clinic_code: str, clinic_data) -> Dict:
+        return slot_taken_result(
+            appointment, clinic_data,
+            lambda doctor_ids, dates: self.booked_slots_grid(doctor_ids, dates[0], dates[-1], clinic_code)
+        )
+
+    def seed_from_records(self, records: List[Dict], clinic_code: str) -> int:
+        """Import appointments already in the sheet; they are not queued for replication"""
+        imported = 0
+        high_water: Dict[str, int] = {}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for record in records:
+                    appointment_id = str(record.get('appointment_id', ''))
+                    doctor_id = str(record.get('doctor_id', ''))
+                    prefix = f"{clinic_code}{doctor_id}"
+                    if not appointment_id or not appointment_id.startswith(prefix):
+                        continue
+                    try:
+                        seq_num = int(appointment_id[len(prefix):])
+                    except ValueError:
+                        continue
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (appointment_id, prefix, seq_num, record.get('patient_name'), record.get('patient_age'),
+                         doctor_id, record.get('doctor_name'), str(record.get('date', '')), str(record.get('time', '')),
+                         normalize_time(str(record.get('time', ''))), record.get('status') or 'pending',
+                         record.get('created_at'), clinic_code)
+                    )
+                    imported += cursor.rowcount
+                    high_water[prefix] = max(high_water.get(prefix, 0), seq_num)
+                observe_sequences(self._conn, high_water)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return imported
+
+    def claim_outbox(self, limit: int = REPLICATION_BATCH_SIZE) -> List[Tuple[int, int, str, List[str]]]:
+        """
+        (outbox id, earlier attempts, clinic code, sheet row) for entries ready to be pushed,
+        oldest first. Claimed entries are leased so another worker's replicator skips them.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT o.id, o.attempts, a.clinic_code, a.appointment_id, a.patient_name, a.patient_age, a.doctor_id, a.doctor_name, "
+                    "a.date, a.time, a.status, a.created_at FROM outbox o JOIN appointments a USING (appointment_id) "
+                    "WHERE o.next_attempt_at <= ? ORDER BY o.id LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                    [(now + REPLICATION_LEASE_SECONDS, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(row[0], row[1], row[2], [str(value) for value in row[3:]]) for row in rows]
+
+    def outbox_size(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM outbox")[0][0]
+
+    def mark_replicated(self, outbox_ids: List[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(outbox_id,) for outbox_id in outbox_ids])
+
+    def mark_failed(self, outbox_id: int, attempts: int, error: str):
+        # Exponential backoff with jitter, capped; attempts counts the failed one
+        delay = min(2 ** attempts, REPLICATION_MAX_BACKOFF) * random.uniform(0.8, 1.2)
+        self._execute(
+            "UPDATE outbox SET next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, outbox_id)
+        )
+
+class SheetReplicator:
+    """
+    Background thread that pushes queued ledger rows to their clinic's sheet with
+    retry and backoff, one append per clinic for up to REPLICATION_BATCH_SIZE rows.
+    push_rows(clinic_code, rows, check_existing_ids) does the append. The outbox
+    lives in the ledger database, so rows queued before a restart are pushed after it.
+    """
+
+    def __init__(self, ledger: AppointmentLedger, push_rows: Callable[[str, List[List[str]], bool], None],
+                 poll_interval: float = 5.0, flush_window: float = REPLICATION_FLUSH_WINDOW):
+        self.ledger = ledger
+        self.push_rows = push_rows
+        self.poll_interval = poll_interval
+        self.flush_window = flush_window
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        ledger.on_booked = self.wake
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sheet-replicator", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def replicate_once(self) -> int:
+        """Push every due outbox row, a batch per append; returns how many reached the sheet"""
+        pushed = 0
+        while True:
+            batch = self.ledger.claim_outbox()
+            if not batch:
+                return pushed
+            by_clinic: Dict[str, List[Tuple[int, int, str, List[str]]]] = {}
+            for entry in batch:
+                by_clinic.setdefault(entry[2], []).append(entry)
+            # A clinic whose sheet fails doesn't hold back the others
+            for clinic_code, entries in by_clinic.items():
+                rows = [row for _, _, _, row in entries]
+                try:
+                    # Retried rows may have landed before the failure was seen
+                    self.push_rows(clinic_code, rows, any(attempts > 0 for _, attempts, _, _ in entries))
+                except Exception as e:
+                    print(f"Error replicating {len(rows)} appointments to Google Sheets for clinic {clinic_code}: {e}")
+                    for outbox_id, attempts, _, _ in entries:
+                        self.ledger.mark_failed(outbox_id, attempts + 1, str(e))
+                    continue
+                self.ledger.mark_replicated([outbox_id for outbox_id, _, _, _ in entries])
+                pushed += len(entries)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.replicate_once()
+            except Exception as e:
+                print(f"Error in sheet replicator: {e}")
+            if self._wake.wait(self.poll_interval) and not self._stop.is_set():
+                # Let bookings made right after this one join the same append
+                self._stop.wait(self.flush_window)
+            self._wake.clear()
+        # Last attempt to drain on shutdown
+        try:
+            self.replicate_once()
+        except Exception as e:
+            print(f"Error in sheet replicator: {e}")
@@ -1,17 +1,28 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
+import json
+import time
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 from .models import ClinicData, Appointment, ConversationState
-from .utils import load_clinic_data, normalize_date, normalize_time, find_doctor_by_name
-from .chains import create_chat_chain, create_confirmation_chain
+from .utils import normalize_date, normalize_time, date_range, availability_grid
+from .chains import get_chat_chain, get_confirmation_chain, arun_chain, astream_chain
 
-from .sheets import save_appointment_to_sheet , get_available_slots
-from .extractor import extract_appointment_info, has_booking_intent, has_info_intent
+from .sheets import get_clinic_sheet, clinic_sheets, stop_sheet_writers
+from .ledger import AppointmentLedger, SheetReplicator, LEDGER_ENABLED
+from .extractor import extract_appointment_info, parse_extracted_block, has_booking_intent, has_info_intent
 from .memory_utils import create_memory, add_to_memory, get_memory_as_string
+from .responder import answer_greeting, answer_info_question
+from .intent import classify_intent, get_intent_classifier
+from .clinic_store import ClinicRegistry, ClinicSnapshot
+from .session_store import create_session_store
+from .semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
 
 # Load environment variables
 load_dotenv()
@@ -27,11 +38,129 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load clinic data
-clinic_data = load_clinic_data("app/data/clinic_data.json")
+# Every clinic this process serves (the files in CLINIC_DATA_DIR, or CLINIC_DATA_PATH),
+# each reloaded when its file changes. A request gets its clinic's snapshot once,
+# from get_clinic, and uses that snapshot throughout.
+clinic_registry = ClinicRegistry()
 
-# In-memory storage for conversation states
-conversation_states: Dict[str, ConversationState] = {}
+# Endpoints for one clinic, served at /clinics/{clinic_code}/... and, for the clinic
+# named by the X-Clinic-Code header or the default clinic, at the root
+router = APIRouter()
+
+# Longest date range one /availability request may cover
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", "31"))
+
+# Conversation states, expired after SESSION_TTL_SECONDS idle and capped at
+# SESSION_MAX_COUNT sessions. SESSION_BACKEND=sqlite shares them between workers.
+conversation_states = create_session_store()
+
+# Local appointment ledger, replicated to Google Sheets in the background
+appointment_ledger = AppointmentLedger() if LEDGER_ENABLED else None
+
+def push_clinic_rows(clinic_code: str, rows: List[List[str]], check_existing_ids: bool):
+    provider = clinic_registry.get(clinic_code)
+    if provider is None:
+        raise LookupError(f"Clinic {clinic_code} is not loaded")
+    get_clinic_sheet(provider.current.clinic).append_rows(rows, check_existing_ids)
+
+sheet_replicator = SheetReplicator(appointment_ledger, push_clinic_rows) if appointment_ledger else None
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    conversation_states.start_sweeper()
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    conversation_states.stop_sweeper()
+
+@app.on_event("startup")
+async def start_clinic_data_watcher():
+    clinic_registry.start_watcher()
+
+@app.on_event("shutdown")
+async def stop_clinic_data_watcher():
+    clinic_registry.stop_watcher()
+
+@app.on_event("startup")
+async def load_intent_classifier():
+    # Train (or load) the intent model now rather than on the first chat turn
+    await run_in_threadpool(get_intent_classifier)
+
+@app.on_event("startup")
+async def load_semantic_cache_encoder():
+    # Load the embedding model now rather than on the first LLM-bound chat turn
+    if SEMANTIC_CACHE_ENABLED:
+        await run_in_threadpool(semantic_cache.load_encoder)
+
+@app.on_event("startup")
+async def start_sheet_replicator():
+    # Clinics sharing a spreadsheet read it once
+    records_by_sheet: Dict[Any, List[Dict]] = {}
+    for provider in clinic_registry:
+        clinic_data = provider.current
+        clinic_code = clinic_data.clinic.code
+        clinic_sheet = get_clinic_sheet(clinic_data.clinic)
+        if not appointment_ledger:
+            # Direct-to-sheet bookings: seed ID counters and the slot index from one snapshot
+            try:
+                await run_in_threadpool(clinic_sheet.warm_up, clinic_code, clinic_data)
+            except Exception as e:
+                print(f"Error building slot index for clinic {clinic_code} from Google Sheets: {e}")
+            continue
+        # Bring in appointments booked before the ledger existed or by other tools
+        try:
+            records = records_by_sheet.get(clinic_sheet.handle)
+            if records is None:
+                records = records_by_sheet[clinic_sheet.handle] = await run_in_threadpool(clinic_sheet.all_records)
+            imported = appointment_ledger.seed_from_records(records, clinic_code)
+            print(f"Seeded appointment ledger with {imported} rows from Google Sheets for clinic {clinic_code}")
+        except Exception as e:
+            print(f"Error seeding appointment ledger for clinic {clinic_code} from Google Sheets: {e}")
+    if sheet_replicator:
+        sheet_replicator.start()
+
+@app.on_event("shutdown")
+async def stop_sheet_replicator():
+    if sheet_replicator:
+        await run_in_threadpool(sheet_replicator.stop)
+    # Flush rows still waiting to be appended
+    await run_in_threadpool(stop_sheet_writers)
+
+def get_clinic(request: Request, x_clinic_code: Optional[str] = Header(None)) -> ClinicSnapshot:
+    """
+    The current snapshot of the clinic a request is for: the one in the path,
+    else the X-Clinic-Code header, else the default clinic
+    """
+    clinic_code = request.path_params.get("clinic_code") or x_clinic_code or clinic_registry.default_code
+    provider = clinic_registry.get(clinic_code)
+    if provider is None:
+        raise HTTPException(status_code=404, detail=f"Unknown clinic: {clinic_code}")
+    return provider.current
+
+def session_key(session_id: str, clinic_data: ClinicSnapshot) -> str:
+    """Where a session is stored; the default clinic's keep their bare IDs, as before clinics were routed"""
+    clinic_code = clinic_data.clinic.code
+    return session_id if clinic_code == clinic_registry.default_code else f"{clinic_code}:{session_id}"
+
+async def book_appointment(appointment: Appointment, clinic_data: ClinicSnapshot) -> Dict:
+    """Commit a confirmed appointment to the ledger, or straight to the clinic's sheet without one"""
+    # Both paths block, on SQLite's write lock or on the Sheets API; keep them off the event loop
+    if appointment_ledger:
+        return await run_in_threadpool(appointment_ledger.book, appointment, clinic_data.clinic.code, clinic_data)
+    clinic_sheet = get_clinic_sheet(clinic_data.clinic)
+    return await run_in_threadpool(clinic_sheet.save_appointment, appointment, clinic_data.clinic.code, clinic_data)
+
+# Turn counters per route: "local" turns are answered from clinic data, "cache" turns
+# reuse an earlier answer from the semantic cache, "llm" turns call the chat chain
+turn_stats: Dict[str, Dict[str, float]] = {
+    "local": {"turns": 0, "total_ms": 0.0},
+    "cache": {"turns": 0, "total_ms": 0.0},
+    "llm": {"turns": 0, "total_ms": 0.0},
+}
+
+def record_turn(route: str, started: float):
+    turn_stats[route]["turns"] += 1
+    turn_stats[route]["total_ms"] += (time.perf_counter() - started) * 1000
 
 class ChatRequest(BaseModel):
     message: str
@@ -42,99 +171,158 @@ class ChatResponse(BaseModel):
     session_id: str
     status: str
     appointment: Dict[str, Any] = None
+    alternatives: List[Dict[str, str]] = None
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    session_id = request.session_id
-
-
+def get_conversation_state(session_id: str, clinic_data: ClinicSnapshot) -> ConversationState:
     # Initialize or get conversation state
-    if session_id not in conversation_states:
-        conversation_states[session_id] = ConversationState(memory=create_memory())
-    
-    state = conversation_states[session_id]
+    state = conversation_states.load(session_key(session_id, clinic_data))
+    if state is None:
+        state = ConversationState(memory=create_memory())
     
+    return state
+
+async def handle_confirmation_reply(session_id: str, state: ConversationState, message: str, clinic_data: ClinicSnapshot):
+    """
+    Book the pending appointment if the user confirmed it, or set it aside if they
+    declined without giving new details - no LLM call is needed.
+    Returns None when this turn is not a reply to the confirmation prompt.
+    """
+    if not (state.current_step == "confirmation" and state.appointment):
+        return None
     
-    # Create chat chain with memory
-    chat_chain = create_chat_chain(clinic_data)
+    if classify_intent(message) == "deny" and not extract_appointment_info(message):
+        # Keep the collected details so the patient only has to give what changes
+        response_text = "No problem, I haven't booked anything. Tell me what you'd like to change, or ask me to book when you're ready."
+        state.appointment = None
+        state.current_step = "greeting"
+        add_to_memory(state.memory, message, response_text)
+        conversation_states.save(session_key(session_id, clinic_data), state)
+        
+        return ChatResponse(
+            response=response_text,
+            session_id=session_id,
+            status="chat"
+        )
     
-    # Get memory as string for the prompt
-    memory_string = get_memory_as_string(state.memory)
+    if not has_booking_intent(message):
+        return None
     
-    # Get response from the chatbot
-    response_text = chat_chain.run({
-        "user_input": request.message,
-        "conversation_history": memory_string,
-        "clinic_name": clinic_data.clinic.name,
-        "clinic_address": clinic_data.clinic.address,
-        "clinic_hours": clinic_data.clinic.hours,
-        "clinic_contact": clinic_data.clinic.contact,
-        "doctors_list": "\n".join([f"- {doc.name} ({doc.specialization}): Available at {', '.join(doc.slots)}" for doc in clinic_data.doctors])
-    })
+    # Save the appointment
+    result = await book_appointment(state.appointment, clinic_data)
     
-    # Ensure response is a string
-    if isinstance(response_text, dict):
-        response_text = str(response_text)
+    if result["success"]:
+        # Clear conversation state
+        appointment_id = state.appointment.appointment_id if hasattr(state.appointment, 'appointment_id') else "N/A"
+        response_text = f"Appointment confirmed! Your appointment ID is: {appointment_id}"
+        conversation_states[session_key(session_id, clinic_data)] = ConversationState(memory=create_memory())
+        
+        return ChatResponse(
+            response=response_text,
+            session_id=session_id,
+            status="confirmed"
+        )
+    elif "alternatives" in result:
+        # Slot was taken: offer the alternatives and let the patient pick a new time
+        state.current_step = "greeting"
+        state.collected_data.pop("time", None)
+        add_to_memory(state.memory, message, result["message"])
+        conversation_states.save(session_key(session_id, clinic_data), state)
+        
+        return ChatResponse(
+            response=result["message"],
+            session_id=session_id,
+            status="slot_taken",
+            alternatives=result["alternatives"]
+        )
+    else:
+        return ChatResponse(
+            response="Sorry, there was an error saving your appointment. Please try again.",
+            session_id=session_id,
+            status="error"
+        )
+
+def handle_info_question(session_id: str, state: ConversationState, message: str, clinic_data: ClinicSnapshot):
+    """
+    Answer greetings and clinic-information questions from the clinic data, skipping the LLM.
+    Returns None when the turn needs the chatbot.
+    """
+    # Mid-booking, every turn goes to the chatbot, which extracts the details and knows what is still missing
+    if state.collected_data:
+        return None
+    answer = answer_greeting(message, clinic_data) or answer_info_question(message, clinic_data)
+    if answer is None:
+        return None
     
     # Add to memory
-    add_to_memory(state.memory, request.message, response_text)
+    add_to_memory(state.memory, message, answer)
     
-    # Extract appointment information if provided
-    extracted_info = extract_appointment_info(request.message, state.collected_data)
+    return ChatResponse(
+        response=answer,
+        session_id=session_id,
+        status="chat"
+    )
 
+def is_cacheable_turn(state: ConversationState, message: str) -> bool:
+    """Only questions that don't depend on this session's booking details are cached"""
+    return (
+        SEMANTIC_CACHE_ENABLED
+        and not state.collected_data
+        and state.current_step != "confirmation"
+        and not has_booking_intent(message)
+    )
 
-    # Check if this is a confirmation response
-    if state.current_step == "confirmation" and has_booking_intent(request.message):
-        # User confirmed the appointment
-        if state.appointment:
-            # Save to Google Sheets
-            result = save_appointment_to_sheet(state.appointment, clinic_data.clinic.code, clinic_data)
-            
-            if result["success"]:
-                # Clear conversation state
-                appointment_id = state.appointment.appointment_id if hasattr(state.appointment, 'appointment_id') else "N/A"
-                response_text = f"Appointment confirmed! Your appointment ID is: {appointment_id}"
-                conversation_states[session_id] = ConversationState()
-                
-                return ChatResponse(
-                    response=response_text,
-                    session_id=session_id,
-                    status="confirmed"
-                )
-            else:
-                return ChatResponse(
-                    response="Sorry, there was an error saving your appointment. Please try again.",
-                    session_id=session_id,
-                    status="error"
-                )
+async def handle_cached_answer(session_id: str, state: ConversationState, message: str, clinic_data: ClinicSnapshot):
+    """
+    Reuse the answer to a semantically similar earlier question to the same clinic.
+    Returns None on a cache miss or when the turn is session-specific.
+    """
+    if not is_cacheable_turn(state, message):
+        return None
     
-        
-    # Create chat chain with memory
-    chat_chain = create_chat_chain(clinic_data)
+    semantic_cache.check_version(clinic_data.version, clinic_data.clinic.code)
+    # Embedding is CPU-bound, keep it off the event loop
+    answer = await run_in_threadpool(semantic_cache.lookup, message, clinic_data.clinic.code)
+    if answer is None:
+        return None
     
+    # Add to memory
+    add_to_memory(state.memory, message, answer)
+    
+    return ChatResponse(
+        response=answer,
+        session_id=session_id,
+        status="chat"
+    )
+
+async def cache_answer(message: str, response_text: str, response: ChatResponse, clinic_data: ClinicSnapshot):
+    # Answers that picked up booking details belong to one patient only
+    if response.status == "chat" and not parse_extracted_block(response_text):
+        await run_in_threadpool(semantic_cache.store, message, response_text, clinic_data.clinic.code)
+
+def build_chat_inputs(state: ConversationState, message: str, clinic_data: ClinicSnapshot) -> Dict[str, Any]:
     # Get memory as string for the prompt
     memory_string = get_memory_as_string(state.memory)
     
-    # Get response from the chatbot
-    response_text = chat_chain.run({
-        "user_input": request.message,
+    return {
+        "user_input": message,
         "conversation_history": memory_string,
         "clinic_name": clinic_data.clinic.name,
         "clinic_address": clinic_data.clinic.address,
         "clinic_hours": clinic_data.clinic.hours,
         "clinic_contact": clinic_data.clinic.contact,
-        "doctors_list": "\n".join([f"- {doc.name} ({doc.specialization}): Available at {', '.join(doc.slots)}" for doc in clinic_data.doctors])
-    })
-    
-    # Ensure response is a string
-    if isinstance(response_text, dict):
-        response_text = str(response_text)
-    
-    # Add to memory
-    add_to_memory(state.memory, request.message, response_text)
-    
-    # Extract appointment information if provided
-    extracted_info = extract_appointment_info(request.message, state.collected_data)
+        "doctors_list": clinic_data.doctors_list
+    }
+
+async def complete_turn(session_id: str, state: ConversationState, message: str, response_text: str,
+                        clinic_data: ClinicSnapshot) -> ChatResponse:
+    """
+    Apply the chatbot's reply to the conversation: slot extraction, the move to
+    the confirmation step and the memory write
+    """
+    # Extract appointment information from the message, then let the model's
+    # "Extracted:" block fill in what it resolved (relative dates, 24h times, context)
+    extracted_info = extract_appointment_info(message, state.collected_data)
+    extracted_info.update(parse_extracted_block(response_text))
     
     # Validate and clean extracted information
     if 'name' in extracted_info:
@@ -158,25 +346,37 @@ async def chat(request: ChatRequest):
     has_all_info = all(field in state.collected_data and state.collected_data[field] for field in required_fields)
     
     # Check if user wants to book an appointment
-    wants_to_book = has_booking_intent(request.message)
+    wants_to_book = has_booking_intent(message)
     
     if has_all_info and wants_to_book:
         # All information is collected, create appointment
         normalized_date = normalize_date(state.collected_data["date"])
         normalized_time = normalize_time(state.collected_data["time"])
-        doctor = find_doctor_by_name(clinic_data.doctors, state.collected_data["doctor"])
+        doctors = clinic_data.doctor_index.match(state.collected_data["doctor"])
+        doctor = doctors[0] if len(doctors) == 1 else None
+        
+        if len(doctors) > 1:
+            # Several doctors go by that name - ask rather than pick one
+            response_text = f"We have more than one doctor named '{state.collected_data['doctor']}'. Did you mean {' or '.join(doc.name for doc in doctors)}?"
+            state.collected_data.pop("doctor", None)
+            add_to_memory(state.memory, message, response_text)
+            
+            return ChatResponse(
+                response=response_text,
+                session_id=session_id,
+                status="chat"
+            )
         
         if not doctor:
             # Invalid doctor name
             doctor_names = [doc.name for doc in clinic_data.doctors]
             response_text = f"I couldn't find a doctor named '{state.collected_data['doctor']}'. Please choose from our available doctors: {', '.join(doctor_names)}"
-
             
             # Remove the invalid doctor from collected data
             state.collected_data.pop("doctor", None)
 
             # Add to memory
-            add_to_memory(state.memory, request.message, response_text)
+            add_to_memory(state.memory, message, response_text)
             
             return ChatResponse(
                 response=response_text,
@@ -198,8 +398,8 @@ async def chat(request: ChatRequest):
         state.current_step = "confirmation"
         
         # Ask for confirmation
-        confirmation_chain = create_confirmation_chain()
-        confirmation_text = confirmation_chain.run({
+        confirmation_chain = get_confirmation_chain()
+        confirmation_text = await arun_chain(confirmation_chain, {
             "appointment_details": f"""
             Patient: {appointment.patient_name}
             Age: {appointment.patient_age}
@@ -209,13 +409,8 @@ async def chat(request: ChatRequest):
             """
         })
         
-        # Ensure confirmation text is a string
-        if isinstance(confirmation_text, dict):
-            confirmation_text = str(confirmation_text)
-        
-        
         # Add to memory
-        add_to_memory(state.memory, request.message, confirmation_text)
+        add_to_memory(state.memory, message, confirmation_text)
         
         return ChatResponse(
             response=confirmation_text,
@@ -224,6 +419,9 @@ async def chat(request: ChatRequest):
             appointment=appointment.dict()
         )
     else:
+        # Add to memory
+        add_to_memory(state.memory, message, response_text)
+        
         # Just return the chatbot's response
         return ChatResponse(
             response=response_text,
@@ -231,22 +429,135 @@ async def chat(request: ChatRequest):
             status="chat"
         )
 
-@app.post("/confirm/{session_id}")
-async def confirm_appointment(session_id: str):
-    if session_id not in conversation_states:
-        raise HTTPException(status_code=404, detail="Session not found")
+async def answer_turn(session_id: str, state: ConversationState, message: str, started: float,
+                      clinic_data: ClinicSnapshot) -> ChatResponse:
+    # Answer clinic-information questions locally
+    info_response = handle_info_question(session_id, state, message, clinic_data)
+    if info_response:
+        record_turn("local", started)
+        return info_response
+    
+    # Reuse the answer to a similar FAQ-style question
+    cacheable = is_cacheable_turn(state, message)
+    cached_response = await handle_cached_answer(session_id, state, message, clinic_data)
+    if cached_response:
+        record_turn("cache", started)
+        return cached_response
     
-    state = conversation_states[session_id]
+    # Get response from the chatbot - the single chat completion for this turn
+    chat_chain = get_chat_chain(clinic_data)
+    response_text = await arun_chain(chat_chain, build_chat_inputs(state, message, clinic_data))
+    
+    response = await complete_turn(session_id, state, message, response_text, clinic_data)
+    if cacheable:
+        await cache_answer(message, response_text, response, clinic_data)
+    record_turn("llm", started)
+    return response
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, clinic_data: ClinicSnapshot = Depends(get_clinic)):
+    started = time.perf_counter()
+    session_id = request.session_id
+    state = get_conversation_state(session_id, clinic_data)
+
+    # Check if this is a confirmation response
+    confirmation_response = await handle_confirmation_reply(session_id, state, request.message, clinic_data)
+    if confirmation_response:
+        return confirmation_response
+    
+    response = await answer_turn(session_id, state, request.message, started, clinic_data)
+    conversation_states.save(session_key(session_id, clinic_data), state)
+    return response
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, clinic_data: ClinicSnapshot = Depends(get_clinic)):
+    """
+    Server-sent-events variant of /chat. Emits "token" events as the reply is
+    generated, then one "done" event carrying the same fields as ChatResponse.
+    The "done" response text is authoritative - it differs from the streamed
+    tokens when the turn moves to confirmation. If the turn fails, for example
+    when the LLM errors mid-reply, the stream ends with an "error" event instead.
+    """
+    started = time.perf_counter()
+    session_id = request.session_id
+    state = get_conversation_state(session_id, clinic_data)
+    key = session_key(session_id, clinic_data)
+
+    async def turn_events():
+        confirmation_response = await handle_confirmation_reply(session_id, state, request.message, clinic_data)
+        if confirmation_response:
+            yield sse_event("done", confirmation_response.dict())
+            return
+        
+        info_response = handle_info_question(session_id, state, request.message, clinic_data)
+        if info_response:
+            record_turn("local", started)
+            conversation_states.save(key, state)
+            yield sse_event("token", {"token": info_response.response})
+            yield sse_event("done", info_response.dict())
+            return
+        
+        cacheable = is_cacheable_turn(state, request.message)
+        cached_response = await handle_cached_answer(session_id, state, request.message, clinic_data)
+        if cached_response:
+            record_turn("cache", started)
+            conversation_states.save(key, state)
+            yield sse_event("token", {"token": cached_response.response})
+            yield sse_event("done", cached_response.dict())
+            return
+        
+        chat_chain = get_chat_chain(clinic_data)
+        chunks = []
+        async for token in astream_chain(chat_chain, build_chat_inputs(state, request.message, clinic_data)):
+            chunks.append(token)
+            yield sse_event("token", {"token": token})
+        
+        # Slot extraction and the confirmation step need the full reply
+        response_text = "".join(chunks)
+        response = await complete_turn(session_id, state, request.message, response_text, clinic_data)
+        if cacheable:
+            await cache_answer(request.message, response_text, response, clinic_data)
+        record_turn("llm", started)
+        conversation_states.save(key, state)
+        yield sse_event("done", response.dict())
+
+    async def event_stream():
+        # Headers are already sent, so a failure can only be reported in the stream
+        try:
+            async for event in turn_events():
+                yield event
+        except Exception as e:
+            print(f"Error streaming chat reply: {e}")
+            yield sse_event("error", ChatResponse(
+                response="Sorry, something went wrong while answering. Please try again.",
+                session_id=session_id,
+                status="error"
+            ).dict())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/confirm/{session_id}")
+async def confirm_appointment(session_id: str, clinic_data: ClinicSnapshot = Depends(get_clinic)):
+    state = conversation_states.load(session_key(session_id, clinic_data))
+    if state is None:
+        raise HTTPException(status_code=404, detail="Session not found")
     
     if not state.appointment:
         raise HTTPException(status_code=400, detail="No appointment to confirm")
     
-    # Save to Google Sheets
-    result = save_appointment_to_sheet(state.appointment, clinic_data.clinic.code, clinic_data)
+    # Save the appointment
+    result = await book_appointment(state.appointment, clinic_data)
 
     if result["success"]:
         # Clear conversation state
-        conversation_states[session_id] = ConversationState()
+        conversation_states[session_key(session_id, clinic_data)] = ConversationState(memory=create_memory())
         
         return {
             "message": result["message"],
@@ -257,13 +568,17 @@ async def confirm_appointment(session_id: str):
         raise HTTPException(status_code=400, detail=result["message"])
 
 # Add a new endpoint to check availability
-@app.get("/availability/{doctor_id}/{date}")
-async def check_availability(doctor_id: str, date: str):
+@router.get("/availability/{doctor_id}/{date}")
+async def check_availability(doctor_id: str, date: str, clinic_data: ClinicSnapshot = Depends(get_clinic)):
     # Normalize the date
     from .utils import normalize_date
     normalized_date = normalize_date(date)
     
-    available_slots = get_available_slots(doctor_id, normalized_date, clinic_data)
+    if appointment_ledger:
+        available_slots = appointment_ledger.available_slots(doctor_id, normalized_date, clinic_data)
+    else:
+        clinic_sheet = get_clinic_sheet(clinic_data.clinic)
+        available_slots = await run_in_threadpool(clinic_sheet.available_slots, doctor_id, normalized_date, clinic_data)
     
     return {
         "doctor_id": doctor_id,
@@ -271,11 +586,89 @@ async def check_availability(doctor_id: str, date: str):
         "available_slots": available_slots
     }
 
-@app.get("/doctors")
-async def get_doctors():
+@router.get("/availability")
+async def check_availability_range(doctor_id: Optional[str] = None, specialization: Optional[str] = None,
+                                   start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                   clinic_data: ClinicSnapshot = Depends(get_clinic)):
+    """Free slots for every matching doctor on every date in the range (default: the next 7 days)"""
+    start = normalize_date(start_date) if start_date else datetime.now().strftime("%Y-%m-%d")
+    try:
+        if end_date:
+            end = normalize_date(end_date)
+        else:
+            end = (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=6)).strftime("%Y-%m-%d")
+        dates = date_range(start, end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be valid, e.g. 2025-09-22 or 22 sep")
+    if not dates or len(dates) > AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {AVAILABILITY_MAX_DAYS} days")
+    
+    doctors = [
+        doctor for doctor in clinic_data.doctors
+        if (not doctor_id or doctor.id == doctor_id)
+        and (not specialization or doctor.specialization.lower() == specialization.lower())
+    ]
+    doctor_ids = [doctor.id for doctor in doctors]
+    
+    if appointment_ledger:
+        booked = appointment_ledger.booked_slots_grid(doctor_ids, start, end, clinic_data.clinic.code)
+    else:
+        booked = await run_in_threadpool(get_clinic_sheet(clinic_data.clinic).booked_grid, doctor_ids, dates)
+    
+    return {
+        "start_date": start,
+        "end_date": end,
+        "doctors": availability_grid(doctors, dates, booked, clinic_data.doctor_slots)
+    }
+
+@router.get("/doctors")
+async def get_doctors(clinic_data: ClinicSnapshot = Depends(get_clinic)):
+    return {
+        "clinic": clinic_data.as_dict["clinic"],
+        "doctors": clinic_data.as_dict["doctors"],
+        "version": clinic_data.version
+    }
+
+app.include_router(router)
+app.include_router(router, prefix="/clinics/{clinic_code}")
+
+@app.get("/clinics")
+async def get_clinics():
+    """Every clinic served, with the data version each is on"""
+    return {
+        "default": clinic_registry.default_code,
+        "clinics": [
+            {"code": provider.current.clinic.code, "name": provider.current.clinic.name, "version": provider.current.version}
+            for provider in clinic_registry
+        ]
+    }
+
+@app.get("/stats")
+async def get_stats():
+    """Share of chat turns answered locally and mean latency per route"""
+    total_turns = sum(route["turns"] for route in turn_stats.values())
     return {
-        "clinic": clinic_data.clinic.dict(),
-        "doctors": [doctor.dict() for doctor in clinic_data.doctors]
+        "total_turns": total_turns,
+        "local_fraction": turn_stats["local"]["turns"] / total_turns if total_turns else 0.0,
+        "routes": {
+            name: {
+                "turns": route["turns"],
+                "mean_latency_ms": route["total_ms"] / route["turns"] if route["turns"] else 0.0
+            }
+            for name, route in turn_stats.items()
+        },
+        "semantic_cache": {
+            "entries": len(semantic_cache),
+            "hits": semantic_cache.hits,
+            "misses": semantic_cache.misses
+        },
+        "sessions": conversation_states.stats(),
+        "replication_backlog": appointment_ledger.outbox_size() if appointment_ledger else 0,
+        "sheet_appends": {
+            "batches": sum(clinic_sheet.writer.batches for clinic_sheet in clinic_sheets()),
+            "rows": sum(clinic_sheet.writer.rows for clinic_sheet in clinic_sheets())
+        },
+        "clinics": len(clinic_registry)
     }
 
 @app.get("/")
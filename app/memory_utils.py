@@ -1,44 +1,230 @@
-from langchain.memory import ConversationBufferMemory, ConversationSummaryMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Deque, Tuple, Callable, Awaitable, Optional
+import asyncio
 import json
+import os
+
+# "summary" keeps the last MEMORY_RECENT_TURNS turns verbatim and folds older ones
+# into a running summary; "buffer" keeps the whole transcript
+MEMORY_MODE = os.getenv("MEMORY_MODE", "summary")
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "6"))
+# Upper bound on the conversation_history prompt variable, in (approximate) tokens
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1000"))
+
+# Rough characters-per-token ratio for English text, avoids a tokenizer on the hot path
+CHARS_PER_TOKEN = 4
+
+Turn = Tuple[str, str]
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+def render_turns(turns) -> str:
+    return "".join(f"Human: {human}\nAssistant: {ai}\n" for human, ai in turns)
+
+async def summarize_turns(summary: str, turns: List[Turn]) -> str:
+    """Fold turns into the running summary with the summary chain"""
+    from .chains import get_summary_chain, arun_chain
+    return await arun_chain(get_summary_chain(), {"summary": summary, "new_lines": render_turns(turns)})
+
+class Transcript:
+    """
+    Compact per-session transcript. Each turn is rendered once when it is appended
+    and the list-of-dicts view is kept up to date incrementally, so appending costs
+    only the new turn. The prompt string is joined from the rendered turns when it
+    is read and kept until the transcript changes.
+    """
+    __slots__ = ("_turns", "_rendered", "_text", "_text_length", "_messages")
+
+    def __init__(self):
+        self._turns: Deque[Turn] = deque()
+        self._rendered: Deque[str] = deque()
+        self._text: Optional[str] = ""
+        self._text_length = 0
+        self._messages: List[Dict[str, str]] = []
+
+    def append(self, human_input: str, ai_response: str):
+        line = render_turns([(human_input, ai_response)])
+        self._turns.append((human_input, ai_response))
+        self._rendered.append(line)
+        self._text = None
+        self._text_length += len(line)
+        self._messages.append({"role": "user", "content": human_input})
+        self._messages.append({"role": "assistant", "content": ai_response})
+
+    def popleft(self) -> Turn:
+        turn = self._turns.popleft()
+        line = self._rendered.popleft()
+        self._text = None
+        self._text_length -= len(line)
+        del self._messages[:2]
+        return turn
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self):
+        return iter(self._turns)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._rendered)
+        return self._text
+
+    @property
+    def text_length(self) -> int:
+        return self._text_length
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        return self._messages
+
+    def rendered_turns(self):
+        return iter(self._rendered)
+
+class SummarizingMemory:
+    """
+    Conversation memory that keeps the most recent turns verbatim and rolls older
+    turns into a running summary. Summaries are produced in a background task so
+    they never add to a turn's latency; until one lands, the evicted turns are
+    still rendered verbatim, within the token budget.
+    """
+
+    def __init__(self, recent_turns: int = MEMORY_RECENT_TURNS, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 summarizer: Optional[Summarizer] = None):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self.turns = Transcript()
+        self.pending = Transcript()  # evicted from turns, not yet in the summary
+        self._summarizer = summarizer or summarize_turns
+        self._task: Optional[asyncio.Task] = None
+        # Called with (summarized turns, new summary) so a shared session backend
+        # can persist summaries that land after the turn was saved
+        self.on_summarized: Optional[Callable[[List[Turn], str], None]] = None
+
+    def save_turn(self, human_input: str, ai_response: str):
+        self.turns.append(human_input, ai_response)
+        while len(self.turns) > self.recent_turns:
+            self.pending.append(*self.turns.popleft())
+        if len(self.pending):
+            self._schedule_summary()
+
+    def _schedule_summary(self):
+        if self._task and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. a script); the next turn saved inside one picks it up
+            return
+        self._task = loop.create_task(self._summarize_pending())
+
+    async def _summarize_pending(self):
+        while len(self.pending):
+            batch = list(self.pending)
+            try:
+                self.summary = await self._summarizer(self.summary, batch)
+            except Exception as e:
+                print(f"Error summarizing conversation: {e}")
+                return
+            for _ in batch:
+                self.pending.popleft()
+            if self.on_summarized:
+                self.on_summarized(batch, self.summary)
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        return self.pending.messages + self.turns.messages
+
+    def render(self) -> str:
+        """Prompt history within the token budget: summary first, newest turns kept"""
+        budget = self.token_budget * CHARS_PER_TOKEN
+        history = self.pending.text + self.turns.text
+        if len(history) > budget:
+            # Over budget: keep the newest turns that fit
+            kept = []
+            used = 0
+            lines = list(self.pending.rendered_turns()) + list(self.turns.rendered_turns())
+            for line in reversed(lines):
+                if used + len(line) > budget:
+                    if not kept:
+                        # The latest turn alone is over budget, keep its tail
+                        kept.append(line[-budget:])
+                    break
+                kept.append(line)
+                used += len(line)
+            history = "".join(reversed(kept))
+
+        header = "Summary of earlier conversation: "
+        # What is left of the budget once the header and its newline are counted
+        keep = budget - len(history) - len(header) - 1
+        if self.summary and keep > 0:
+            history = f"{header}{self.summary[-keep:]}\n{history}"
+        return history
+
+def memory_size_bytes(memory) -> int:
+    """Approximate bytes held by a conversation memory"""
+    if memory is None:
+        return 0
+    if isinstance(memory, SummarizingMemory):
+        return len(memory.summary) + memory_size_bytes(memory.pending) + memory_size_bytes(memory.turns)
+    # The raw strings, the rendered line and the joined text each hold the turn's
+    # characters, plus tuple and message dict overhead per turn
+    return 3 * memory.text_length + 600 * len(memory)
+
+def memory_to_dict(memory) -> Optional[Dict[str, Any]]:
+    """Compact, JSON-ready form of a memory for shared session backends"""
+    if memory is None:
+        return None
+    if isinstance(memory, SummarizingMemory):
+        return {
+            "y": memory.summary,
+            "p": [list(turn) for turn in memory.pending],
+            "t": [list(turn) for turn in memory.turns],
+        }
+    return {"t": [list(turn) for turn in memory]}
+
+def memory_from_dict(data: Optional[Dict[str, Any]]):
+    if data is None:
+        return None
+    if "y" in data:
+        memory = SummarizingMemory()
+        memory.summary = data["y"]
+        for human_input, ai_response in data["p"]:
+            memory.pending.append(human_input, ai_response)
+    else:
+        memory = Transcript()
+    target = memory.turns if isinstance(memory, SummarizingMemory) else memory
+    for human_input, ai_response in data["t"]:
+        target.append(human_input, ai_response)
+    return memory
 
 def create_memory():
     """Create a new conversation memory"""
-    return ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="output"
-    )
+    if MEMORY_MODE == "summary":
+        return SummarizingMemory()
+    return Transcript()
 
 def add_to_memory(memory, human_input, ai_response):
     """Add a conversation turn to memory"""
-    memory.save_context({"input": human_input}, {"output": ai_response})
+    if isinstance(memory, SummarizingMemory):
+        memory.save_turn(human_input, ai_response)
+    else:
+        memory.append(human_input, ai_response)
 
 def get_chat_history(memory) -> List[Dict[str, str]]:
     """Get chat history as a list of message dictionaries"""
-    if not memory or not memory.chat_memory:
+    if memory is None:
         return []
-    
-    messages = []
-    for message in memory.chat_memory.messages:
-        if isinstance(message, HumanMessage):
-            messages.append({"role": "user", "content": message.content})
-        elif isinstance(message, AIMessage):
-            messages.append({"role": "assistant", "content": message.content})
-    
-    return messages
+    return memory.messages
 
 def get_memory_as_string(memory) -> str:
     """Get the conversation history as a string"""
-    if not memory or not memory.chat_memory:
+    if memory is None:
         return ""
-    
-    history_str = ""
-    for message in memory.chat_memory.messages:
-        if isinstance(message, HumanMessage):
-            history_str += f"Human: {message.content}\n"
-        elif isinstance(message, AIMessage):
-            history_str += f"Assistant: {message.content}\n"
-    
-    return history_str
\ No newline at end of file
+    if isinstance(memory, SummarizingMemory):
+        return memory.render()
+    return memory.text
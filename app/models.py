@@ -2,7 +2,6 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 from datetime import datetime
-from langchain.memory import ConversationBufferMemory
 class Doctor(BaseModel):
     id: str
     name: str
@@ -15,6 +14,9 @@ class Clinic(BaseModel):
     address: str
     hours: str
     contact: str
+    # Spreadsheet this clinic's appointments go to; SHEET_KEY / SHEET_TITLE when unset
+    sheet_key: Optional[str] = None
+    sheet_title: Optional[str] = None
 
 class ClinicData(BaseModel):
     clinic: Clinic
@@ -44,7 +46,7 @@ class ConversationState(BaseModel):
     collected_data: Dict[str, Any] = {}
     missing_info: List[str] = []
     appointment: Optional[Appointment] = None
-    memory: Optional[ConversationBufferMemory] = None
+    memory: Optional[Any] = None  # Transcript or SummarizingMemory
     
     class Config:
         arbitrary_types_allowed = True
\ No newline at end of file
@@ -0,0 +1,139 @@
+import re
+from typing import List, Optional
+from .models import ClinicData, Doctor
+from .extractor import extract_appointment_info, has_booking_intent
+from .doctor_index import TITLES, get_doctor_index
+
+# Longer messages usually carry more than one request, leave those to the LLM
+MAX_FAST_PATH_WORDS = 12
+
+# Question forms each clinic-information topic is answered for. A clause has to
+# match one of these as a whole; anything else goes to the LLM
+TOPIC_PATTERNS = {
+    'hours': re.compile(
+        r"(what are|what're|what's|whats|what is) (your|the) (clinic |opening |working |office )?(hours|timings?)"
+        r"|(when|what time) (are you|is the clinic|do you) (open|close)( today| on \w+)?"
+        r"|(are you|is the clinic) open( today| on \w+)?"
+        r"|(your |clinic |opening |working )?(hours|timings)"
+    ),
+    'location': re.compile(
+        r"where (are you|is the clinic|is your clinic)( located)?"
+        r"|(what is|what's|whats) (your|the clinic's|the clinic) (address|location)"
+        r"|(your |clinic |the clinic's )?address|(your|clinic) location"
+    ),
+    'contact': re.compile(
+        r"(what is|what's|whats) (your|the|the clinic's) (phone|contact|telephone) number"
+        r"|how (can|do) i (contact|call) (you|the clinic)"
+        r"|(your |the clinic's )?(phone|contact) number"
+    ),
+    'doctors': re.compile(
+        r"(which|what) doctors (do you have|are (there|available))"
+        r"|who are (your|the) doctors"
+        r"|(list|show me)( of)? (your |the |all )?doctors"
+    ),
+}
+
+# Questions about particular doctors; the subject must name doctors and nothing else
+DOCTOR_PATTERNS = [
+    re.compile(r"(when|what time) is (?P<subject>.+) available"),
+    re.compile(r"(is|are) (?P<subject>.+) available( today)?"),
+    re.compile(r"what are (?P<subject>.+?)('s)? (timings|slots|hours)"),
+    re.compile(r"(who is|(tell me )?about) (?P<subject>.+)"),
+]
+
+# Not the dot in "Dr."
+CLAUSE_SEPARATOR = re.compile(r"\s*(?:[?!,;]|(?<!\bdr)\.|\band\b)\s*")
+FILLER_WORDS = re.compile(r"^(please|also|so|ok|okay) |^(can|could) you tell me | please$")
+GREETING_PATTERN = re.compile(
+    r"((hi|hello|hey|hiya|salam|salaam|assalam o alaikum|assalamualaikum|aoa|good (morning|afternoon|evening))"
+    r"( there| everyone)? ?)+"
+)
+
+def _clauses(text: str) -> List[str]:
+    """Lower-cased clauses of a message, split on punctuation and "and" """
+    clauses = []
+    for clause in CLAUSE_SEPARATOR.split(text.lower().strip()):
+        clause = FILLER_WORDS.sub("", " ".join(clause.split()))
+        if clause:
+            clauses.append(clause)
+    return clauses
+
+def _subject_doctors(subject: str, index) -> List[Doctor]:
+    """Doctors a subject like "dr raza" or "the cardiologist" names, or [] if it is anything else"""
+    words = re.findall(r"[a-z]+", re.sub(r"^(the|your|a|an) ", "", subject))
+    if len(words) == 1 and words[0] in index.by_specialization:
+        return index.mentioned(words[0])
+    tokens = [word for word in words if word not in TITLES]
+    if not tokens or any(token not in index.by_token for token in tokens):
+        return []
+    return index.match(" ".join(tokens))
+
+def _doctors_asked_about(clause: str, index) -> List[Doctor]:
+    for pattern in DOCTOR_PATTERNS:
+        match = pattern.fullmatch(clause)
+        doctors = match and _subject_doctors(match.group("subject"), index)
+        if doctors:
+            return doctors
+    return []
+
+def _doctor_line(doctor: Doctor) -> str:
+    return f"- {doctor.name} ({doctor.specialization}): available at {', '.join(doctor.slots)}"
+
+def answer_greeting(text: str, clinic_data: ClinicData) -> Optional[str]:
+    """
+    Reply to a plain greeting without calling the LLM.
+    Returns None when the message carries anything besides the greeting.
+    """
+    if len(text.split()) > MAX_FAST_PATH_WORDS:
+        return None
+    if not all(GREETING_PATTERN.fullmatch(clause) for clause in _clauses(text) or ["?"]):
+        return None
+    return (f"Hello! Welcome to {clinic_data.clinic.name}. I can tell you about our doctors, hours and location, "
+            "or help you book an appointment. How can I help you today?")
+
+def answer_info_question(text: str, clinic_data: ClinicData) -> Optional[str]:
+    """
+    Answer simple clinic-information questions (hours, location, contact, doctors
+    and their slots) from the clinic data without calling the LLM.
+    Returns None unless every clause of the message is one of those questions, so
+    "how do I reach you by bus?" or "what about dr ayesha at 4pm tomorrow?" go
+    to the LLM.
+    """
+    if len(text.split()) > MAX_FAST_PATH_WORDS or has_booking_intent(text):
+        return None
+    # A doctor named in a question is what it is about, anything else is a booking detail
+    if set(extract_appointment_info(text)) - {"doctor"}:
+        return None
+    clauses = _clauses(text)
+    if not clauses:
+        return None
+
+    # Snapshots carry their clinic's index
+    index = getattr(clinic_data, "doctor_index", None) or get_doctor_index(clinic_data.doctors)
+    topics, doctors = set(), []
+    for clause in clauses:
+        topic = next((topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.fullmatch(clause)), None)
+        if topic:
+            topics.add(topic)
+            continue
+        named = _doctors_asked_about(clause, index)
+        if not named:
+            return None
+        doctors += [doctor for doctor in named if doctor not in doctors]
+
+    clinic = clinic_data.clinic
+    answers = []
+
+    if 'hours' in topics:
+        answers.append(f"{clinic.name} is open {clinic.hours}.")
+    if 'location' in topics:
+        answers.append(f"We're located at {clinic.address}.")
+    if 'contact' in topics:
+        answers.append(f"You can reach us at {clinic.contact}.")
+    if doctors:
+        answers.append("Here are the details:\n" + "\n".join(_doctor_line(doctor) for doctor in doctors))
+    if 'doctors' in topics:
+        answers.append("Our doctors are:\n" + "\n".join(_doctor_line(doctor) for doctor in clinic_data.doctors))
+
+    answers.append("Would you like to book an appointment?")
+    return "\n\n".join(answers)
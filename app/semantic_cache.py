@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Cosine similarity a new question needs with a cached one to reuse its answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+def sentence_transformer_encoder(model_name: str = SEMANTIC_CACHE_MODEL) -> Encoder:
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, normalize_embeddings=True)
+
+def hashing_encoder(n_features: int = 2 ** 12) -> Encoder:
+    """Character n-gram encoder from scikit-learn, used when no sentence-transformers model can be loaded"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4), n_features=n_features, alternate_sign=False, norm="l2")
+    return lambda texts: vectorizer.transform([text.lower() for text in texts]).toarray().astype(np.float32)
+
+def default_encoder() -> Encoder:
+    try:
+        return sentence_transformer_encoder()
+    except Exception as e:
+        print(f"Semantic cache falling back to hashing encoder: {e}")
+        return hashing_encoder()
+
+class SemanticCache:
+    """
+    Answers keyed by the embedding of the question. A lookup returns the answer of
+    the most similar cached question if it clears the threshold. Entries are evicted
+    least-recently-used beyond max_entries and expire after ttl_seconds.
+    Entries belong to a namespace (a clinic code), so one model and one
+    max_entries budget serve every clinic: lookups only match questions from
+    the same namespace, whose entries are dropped when its clinic data version changes.
+    """
+
+    def __init__(self, encoder: Optional[Encoder] = None, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_SIZE, ttl_seconds: float = SEMANTIC_CACHE_TTL):
+        self._encoder = encoder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Clinic data version per namespace
+        self.versions: Dict[str, str] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Held only while the encoder loads, so lookups don't wait on each other's encoding
+        self._encoder_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._vectors = None  # (max_entries, dim) matrix, allocated on first insert
+        self._answers: List[Optional[str]] = [None] * self.max_entries
+        self._stored_at = np.zeros(self.max_entries)
+        self._live = np.zeros(self.max_entries, dtype=bool)
+        self._row_namespace = np.full(self.max_entries, -1, dtype=np.int32)
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # row -> None, oldest first
+
+    def load_encoder(self) -> Encoder:
+        """The encoder, loaded once on first use; concurrent first callers wait for the same load"""
+        if self._encoder is None:
+            with self._encoder_lock:
+                if self._encoder is None:
+                    self._encoder = default_encoder()
+        return self._encoder
+
+    def _encode(self, text: str) -> np.ndarray:
+        return np.asarray(self.load_encoder()([text]), dtype=np.float32)[0]
+
+    def _namespace_id(self, namespace: str) -> int:
+        namespace_id = self._namespace_ids.get(namespace)
+        if namespace_id is None:
+            namespace_id = self._namespace_ids[namespace] = len(self._namespace_ids)
+        return namespace_id
+
+    def check_version(self, version: str, namespace: str = ""):
+        """Invalidate the namespace's entries when its clinic data changes"""
+        with self._lock:
+            if version != self.versions.get(namespace):
+                for row in np.flatnonzero(self._live & (self._row_namespace == self._namespace_id(namespace))):
+                    self._evict(int(row))
+                self.versions[namespace] = version
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def lookup(self, question: str, namespace: str = "") -> Optional[str]:
+        vector = self._encode(question)
+        with self._lock:
+            if not self._lru:
+                self.misses += 1
+                return None
+
+            # Expire stale rows before scoring
+            expired = self._live & (self._stored_at < time.time() - self.ttl_seconds)
+            for row in np.flatnonzero(expired):
+                self._evict(int(row))
+
+            scores = self._vectors @ vector
+            scores[~(self._live & (self._row_namespace == self._namespace_id(namespace)))] = -1.0
+            row = int(np.argmax(scores))
+            if scores[row] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._lru.move_to_end(row)
+            self.hits += 1
+            return self._answers[row]
+
+    def store(self, question: str, answer: str, namespace: str = ""):
+        vector = self._encode(question)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            if len(self._lru) >= self.max_entries:
+                self._evict(next(iter(self._lru)))
+            row = int(np.flatnonzero(~self._live)[0])
+
+            self._vectors[row] = vector
+            self._answers[row] = answer
+            self._stored_at[row] = time.time()
+            self._live[row] = True
+            self._row_namespace[row] = self._namespace_id(namespace)
+            self._lru[row] = None
+
+    def _evict(self, row: int):
+        self._live[row] = False
+        self._answers[row] = None
+        self._lru.pop(row, None)
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .models import Appointment, ConversationState
+from .memory_utils import SummarizingMemory, Turn, memory_from_dict, memory_size_bytes, memory_to_dict
+
+# "memory" keeps sessions in this process; "sqlite" shares them between worker
+# processes on one host through SESSION_DB_PATH
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "app/data/sessions.db")
+
+# Sessions idle longer than this are dropped
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+# Beyond this many live sessions the least recently used one is evicted
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+def state_size_bytes(state: ConversationState) -> int:
+    """Approximate memory held by one conversation state"""
+    size = sys.getsizeof(state.collected_data)
+    for key, value in state.collected_data.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    if state.appointment:
+        size += sum(sys.getsizeof(value) for value in state.appointment.__dict__.values())
+    return size + memory_size_bytes(state.memory)
+
+def state_to_json(state: ConversationState) -> str:
+    """Compact serialized form of a conversation state"""
+    return json.dumps({
+        "s": state.current_step,
+        "c": state.collected_data,
+        "i": state.missing_info,
+        "a": state.appointment.dict() if state.appointment else None,
+        "m": memory_to_dict(state.memory),
+    }, separators=(",", ":"))
+
+def state_from_json(data: str) -> ConversationState:
+    payload = json.loads(data)
+    return ConversationState(
+        current_step=payload["s"],
+        collected_data=payload["c"],
+        missing_info=payload["i"],
+        appointment=Appointment(**payload["a"]) if payload["a"] else None,
+        memory=memory_from_dict(payload["m"]),
+    )
+
+class SessionStore:
+    """
+    Conversation states by session id, with idle-TTL expiry and a cap on the number
+    of live sessions (least recently used evicted first). Supports the dict
+    operations the API uses, so it can stand in for a plain dict.
+    """
+
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS, max_sessions: int = SESSION_MAX_COUNT):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.expired = 0
+        self.evicted = 0
+        # session id -> (state, last access time), least recently used first
+        self._sessions: "OrderedDict[str, Tuple[ConversationState, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            if entry[1] < time.monotonic() - self.ttl_seconds:
+                del self._sessions[session_id]
+                self.expired += 1
+                return False
+            return True
+
+    def __getitem__(self, session_id: str) -> ConversationState:
+        with self._lock:
+            state, _ = self._sessions[session_id]
+            self._sessions[session_id] = (state, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def __setitem__(self, session_id: str, state: ConversationState):
+        with self._lock:
+            self._sessions[session_id] = (state, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+
+    def __delitem__(self, session_id: str):
+        with self._lock:
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def get(self, session_id: str, default: Optional[ConversationState] = None) -> Optional[ConversationState]:
+        return self[session_id] if session_id in self else default
+
+    def load(self, session_id: str) -> Optional[ConversationState]:
+        return self.get(session_id)
+
+    def save(self, session_id: str, state: ConversationState):
+        self[session_id] = state
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def sweep(self) -> int:
+        """Drop every session idle longer than the TTL; returns how many were dropped"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        dropped = 0
+        with self._lock:
+            # Oldest access first, so stop at the first live session
+            while self._sessions:
+                session_id, (_, last_access) = next(iter(self._sessions.items()))
+                if last_access >= cutoff:
+                    break
+                del self._sessions[session_id]
+                dropped += 1
+            self.expired += dropped
+        return dropped
+
+    def approximate_bytes(self) -> int:
+        with self._lock:
+            states = [state for state, _ in self._sessions.values()]
+        return sum(state_size_bytes(state) for state in states)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "live_sessions": len(self),
+            "approx_bytes": self.approximate_bytes(),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def start_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval))
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+class SQLiteSessionStore:
+    """
+    Conversation states in a local SQLite database (WAL mode), so several worker
+    processes on one host can serve the same session. States are loaded at the
+    start of a turn and saved at the end. Same TTL and capacity rules as
+    SessionStore; capacity is enforced by the sweeper.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl_seconds: float = SESSION_TTL_SECONDS,
+                 max_sessions: int = SESSION_MAX_COUNT):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _cutoff(self) -> float:
+        # Wall-clock time, shared between processes
+        return time.time() - self.ttl_seconds
+
+    def load(self, session_id: str) -> Optional[ConversationState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, self._cutoff())
+            ).fetchone()
+        if row is None:
+            return None
+        state = state_from_json(row[0])
+        if isinstance(state.memory, SummarizingMemory):
+            state.memory.on_summarized = partial(self._apply_summary, session_id)
+        return state
+
+    def save(self, session_id: str, state: ConversationState):
+        data = state_to_json(state)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, data, time.time())
+            )
+        if isinstance(state.memory, SummarizingMemory):
+            state.memory.on_summarized = partial(self._apply_summary, session_id)
+
+    def _apply_summary(self, session_id: str, batch: List[Turn], summary: str):
+        """Persist a background summary, unless a newer save already moved past those turns"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                if row is not None:
+                    payload = json.loads(row[0])
+                    memory = payload["m"]
+                    if memory and "y" in memory and memory["p"][:len(batch)] == [list(turn) for turn in batch]:
+                        memory["y"] = summary
+                        del memory["p"][:len(batch)]
+                        self._conn.execute(
+                            "UPDATE sessions SET data = ? WHERE session_id = ?",
+                            (json.dumps(payload, separators=(",", ":")), session_id)
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, self._cutoff())
+            ).fetchone()
+        return row is not None
+
+    def __getitem__(self, session_id: str) -> ConversationState:
+        state = self.load(session_id)
+        if state is None:
+            raise KeyError(session_id)
+        return state
+
+    def __setitem__(self, session_id: str, state: ConversationState):
+        self.save(session_id, state)
+
+    def __delitem__(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?", (self._cutoff(),)
+            ).fetchone()[0]
+
+    def get(self, session_id: str, default: Optional[ConversationState] = None) -> Optional[ConversationState]:
+        state = self.load(session_id)
+        return default if state is None else state
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions")
+
+    def sweep(self) -> int:
+        """Drop expired sessions and the least recently used ones beyond capacity"""
+        with self._lock:
+            expired = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (self._cutoff(),)).rowcount
+            evicted = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            ).rowcount
+        self.expired += expired
+        self.evicted += evicted
+        return expired + evicted
+
+    def approximate_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM sessions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "live_sessions": len(self),
+            "approx_bytes": self.approximate_bytes(),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.get_running_loop().run_in_executor(None, self.sweep)
+
+    def start_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval))
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+def create_session_store():
+    """Session store for the configured SESSION_BACKEND"""
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    return SessionStore()
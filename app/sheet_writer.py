@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Set, Tuple
+
+# Rows confirmed within this many seconds of each other go to the sheet in one append
+SHEET_APPEND_WINDOW = float(os.getenv("SHEET_APPEND_WINDOW", "0.1"))
+SHEET_APPEND_MAX_BATCH = int(os.getenv("SHEET_APPEND_MAX_BATCH", "50"))
+SHEET_APPEND_MAX_ATTEMPTS = int(os.getenv("SHEET_APPEND_MAX_ATTEMPTS", "3"))
+
+class AppendCoalescer:
+    """
+    Group commit for sheet appends. Callers submit a row and wait; a background
+    thread gathers the rows submitted within `window` seconds (up to `max_batch`)
+    and writes them with one append_rows(rows, check_existing_ids) call. A failed
+    batch is retried with check_existing_ids=True, so rows that did land are not
+    appended twice. When the last attempt fails too, `existing_ids` (the IDs in
+    the sheet) is asked which rows landed anyway; those are reported written.
+    stop() flushes whatever is still queued.
+    """
+
+    def __init__(self, append_rows: Callable[[List[List[str]], bool], None], window: float = SHEET_APPEND_WINDOW,
+                 max_batch: int = SHEET_APPEND_MAX_BATCH, max_attempts: int = SHEET_APPEND_MAX_ATTEMPTS,
+                 existing_ids: Optional[Callable[[], Set[str]]] = None):
+        self.append_rows = append_rows
+        self.existing_ids = existing_ids
+        self.window = window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.batches = 0
+        self.rows = 0
+        self._pending: List[Tuple[List[str], Future]] = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, row: List[str], timeout: Optional[float] = None):
+        """Queue a row and block until it is in the sheet; raises if it could not be written"""
+        future: Future = Future()
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+                self._thread.start()
+            self._pending.append((row, future))
+            self._cond.notify_all()
+        return future.result(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self) -> List[Tuple[List[str], Future]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._stopping)
+            # Give rows confirmed just after this one a chance to share the append
+            self._cond.wait_for(lambda: len(self._pending) >= self.max_batch or self._stopping, timeout=self.window)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _landed_ids(self) -> Set[str]:
+        if self.existing_ids is None:
+            return set()
+        try:
+            return self.existing_ids()
+        except Exception as e:
+            print(f"Error reading appointment IDs from Google Sheets: {e}")
+            return set()
+
+    def _flush(self, batch: List[Tuple[List[str], Future]]):
+        rows = [row for row, _ in batch]
+        error: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 5.0))
+            try:
+                self.append_rows(rows, attempt > 0)
+            except Exception as e:
+                print(f"Error appending {len(rows)} appointment rows to Google Sheets: {e}")
+                error = e
+                continue
+            self.batches += 1
+            self.rows += len(rows)
+            for _, future in batch:
+                future.set_result(None)
+            return
+        # The last attempt may have timed out after its rows reached the sheet
+        landed = self._landed_ids()
+        for row, future in batch:
+            if row[0] in landed:
+                self.rows += 1
+                future.set_result(None)
+            else:
+                future.set_exception(error)
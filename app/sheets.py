@@ -1,13 +1,21 @@
 import gspread
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from oauth2client.service_account import ServiceAccountCredentials
 import os
+import threading
 from pathlib import Path
-from typing import List, Dict
-from .models import Appointment
-from datetime import datetime
-from .utils import normalize_time
+from typing import List, Dict, Optional, Set, Tuple
+from .models import Appointment, Clinic
+from .id_allocator import IdAllocator
+from .sheet_writer import AppendCoalescer
+from .slot_bitmap import slot_taken_result
+from .slot_index import BookedSlotIndex
+from datetime import datetime, timedelta
 
-def get_google_sheets_client():
+# Credentials are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+def _authorize_client():
     scope = ["https://spreadsheets.google.com/feeds","https://www.googleapis.com/auth/drive"]
     # Get the absolute path to the credentials file
     # Get the project root directory
@@ -22,7 +30,7 @@ def get_google_sheets_client():
         # If it's just a filename, assume it's in the credentials directory
         creds_path = project_root / "app" / "credentials" / creds_file_name
     
-    print(f"Looking for credentials at: {creds_path}")  # Debug print
+    print(f"Authorizing Google Sheets client with credentials at: {creds_path}")
     
     if not creds_path.exists():
         raise FileNotFoundError(f"Credentials file not found at: {creds_path}")
@@ -31,146 +39,308 @@ def get_google_sheets_client():
     client = gspread.authorize(creds)
     return client
 
-def check_existing_appointment(doctor_id: str, date: str, time: str) -> bool:
+class SheetsClient:
     """
-    Check if an appointment already exists for the same doctor, date, and time
+    Process-wide Google Sheets client, shared across threads and by every
+    clinic's worksheet, so all of them go through one authorized HTTP session.
+    The client is authorized once and its token refreshed shortly before it expires.
     """
-    try:
-        client = get_google_sheets_client()
-        sheet_title = os.getenv("SHEET_TITLE")
-        sheet = client.open(sheet_title).sheet1
-        
-        # Get all records
-        records = sheet.get_all_records()
-        
-        # Normalize the time for comparison
-        normalized_time = normalize_time(time)
-        
-        for record in records:
-            record_time = normalize_time(record.get('time', ''))
-            
-            if (record.get('doctor_id') == doctor_id and 
-                record.get('date') == date and 
-                record_time == normalized_time and
-                record.get('status', 'pending') != 'cancelled'):
-                return True
-                
-        return False
-    except Exception as e:
-        print(f"Error checking existing appointments: {e}")
-        return False
 
-def get_available_slots(doctor_id: str, date: str, clinic_data) -> List[str]:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+
+    def _refresh_if_expiring(self):
+        # gspread 6 keeps google-auth credentials on its HTTP client
+        creds = self._client.http_client.auth
+        expiry = getattr(creds, "expiry", None)
+        if not creds.valid or (expiry and expiry - TOKEN_REFRESH_MARGIN <= datetime.utcnow()):
+            creds.refresh(GoogleAuthRequest())
+
+    def get(self):
+        with self._lock:
+            if self._client is None:
+                self._client = _authorize_client()
+            self._refresh_if_expiring()
+            return self._client
+
+    def reset(self):
+        """Drop the cached client; the next call authorizes again"""
+        with self._lock:
+            self._client = None
+
+sheets_client = SheetsClient()
+
+class SheetHandle:
     """
-    Get available time slots for a doctor on a specific date
+    An appointments worksheet, opened through the shared client. The spreadsheet
+    is opened by key, or looked up by title once and reopened by key after that.
+    Without either, SHEET_KEY or SHEET_TITLE is used.
     """
-    try:
-        # Get the doctor's available slots from clinic data
-        doctor = next((doc for doc in clinic_data.doctors if doc.id == doctor_id), None)
-        if not doctor:
-            return []
-        
-        # Check which slots are already booked
-        client = get_google_sheets_client()
-        sheet_title = os.getenv("SHEET_TITLE")
-        sheet = client.open(sheet_title).sheet1
-        
-        # Get all records for this doctor and date
-        records = sheet.get_all_records()
-        booked_slots = []
-        
-        for record in records:
-            if (record.get('doctor_id') == doctor_id and 
-                record.get('date') == date and
-                record.get('status', 'pending') != 'cancelled'):
-                booked_slots.append(normalize_time(record.get('time', '')))
-        
-        # Return available slots (doctor's slots minus booked slots)
-        available_slots = [slot for slot in doctor.slots if normalize_time(slot) not in booked_slots]
-        return available_slots
-        
-    except Exception as e:
-        print(f"Error getting available slots: {e}")
-        return []
 
-def save_appointment_to_sheet(appointment: Appointment, clinic_code: str, clinic_data) -> Dict:
+    def __init__(self, sheet_key: Optional[str] = None, sheet_title: Optional[str] = None,
+                 client: SheetsClient = sheets_client):
+        self._lock = threading.Lock()
+        self._client = client
+        self._worksheet = None
+        self._sheet_key = sheet_key
+        self._sheet_title = sheet_title
+
+    def client(self):
+        return self._client.get()
+
+    def worksheet(self):
+        client = self.client()
+        with self._lock:
+            if self._worksheet is None:
+                if not (self._sheet_key or self._sheet_title):
+                    # Read here rather than at import, which runs before load_dotenv
+                    self._sheet_key, self._sheet_title = os.getenv("SHEET_KEY"), os.getenv("SHEET_TITLE")
+                if self._sheet_key:
+                    spreadsheet = client.open_by_key(self._sheet_key)
+                else:
+                    spreadsheet = client.open(self._sheet_title)
+                    self._sheet_key = spreadsheet.id
+                self._worksheet = spreadsheet.sheet1
+            return self._worksheet
+
+    def reset(self):
+        """Drop the cached worksheet and client; the next call authorizes again"""
+        self._client.reset()
+        with self._lock:
+            self._worksheet = None
+
+sheet_handle = SheetHandle()
+
+def get_google_sheets_client():
+    return sheets_client.get()
+
+def get_appointments_sheet():
+    return sheet_handle.worksheet()
+
+# Counters for every clinic's ID prefixes, which start with the clinic code
+id_allocator = IdAllocator()
+
+class ClinicSheet:
     """
-    Save appointment to Google Sheets and return result with status message
+    A clinic's appointments worksheet with its booked-slot index, so checks don't
+    download the whole sheet, and its append coalescer. With id_prefix (the
+    clinic code) only rows whose appointment ID starts with it are indexed, so
+    clinics sharing a spreadsheet can use the same doctor IDs.
     """
-    try:
-        client = get_google_sheets_client()
-        sheet_title = os.getenv("SHEET_TITLE")
-        sheet = client.open(sheet_title).sheet1
-        
-        # Check if appointment already exists
-        if check_existing_appointment(appointment.doctor_id, appointment.date, appointment.time):
-            available_slots = get_available_slots(appointment.doctor_id, appointment.date, clinic_data)
+
+    def __init__(self, handle: SheetHandle, id_allocator: IdAllocator, id_prefix: str = ""):
+        self.handle = handle
+        self.slot_index = BookedSlotIndex(self._read_all_rows, self._read_rows_after, id_allocator, id_prefix=id_prefix)
+        # Confirmed rows from concurrent bookings share one append
+        self.writer = AppendCoalescer(self.append_rows, existing_ids=self.existing_ids)
+
+    def _reset_on_auth_error(self, error: Exception):
+        # Credentials revoked or sheet moved: start over on the next call
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if isinstance(error, gspread.exceptions.SpreadsheetNotFound) or status in (401, 403, 404):
+            self.handle.reset()
+            self.slot_index.invalidate()
+
+    def _read_all_rows(self) -> List[List[str]]:
+        return self.handle.worksheet().get_all_values()
+
+    def _read_rows_after(self, row_count: int) -> List[List[str]]:
+        sheet = self.handle.worksheet()
+        last_column = gspread.utils.rowcol_to_a1(1, sheet.col_count).rstrip("0123456789")
+        return sheet.get_values(f"A{row_count + 1}:{last_column}")
+
+    def warm_up(self, clinic_code: str, clinic_data):
+        """Count every doctor's ID prefix and build the slot index from one snapshot"""
+        for doctor in clinic_data.doctors:
+            self.slot_index.id_allocator.register(f"{clinic_code}{doctor.id}")
+        self.slot_index.rebuild()
+
+    def check_existing_appointment(self, doctor_id: str, date: str, time: str) -> bool:
+        """
+        Check if an appointment already exists for the same doctor, date, and time
+        """
+        try:
+            # Pick up rows appended by anyone else before deciding
+            return self.slot_index.is_booked(doctor_id, date, time, max_age=0)
+        except Exception as e:
+            print(f"Error checking existing appointments: {e}")
+            self._reset_on_auth_error(e)
+            return False
+
+    def available_slots(self, doctor_id: str, date: str, clinic_data) -> List[str]:
+        """
+        Get available time slots for a doctor on a specific date, from a clinic data snapshot
+        """
+        try:
+            # Get the doctor's available slots from clinic data
+            slots = clinic_data.doctor_slots.get(doctor_id)
+            if not slots:
+                return []
             
-            if available_slots:
-                return {
-                    "success": False,
-                    "message": f"This time slot is already booked. Available slots for Dr. {appointment.doctor_name} on {appointment.date}: {', '.join(available_slots)}"
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": f"This time slot is already booked. Dr. {appointment.doctor_name} has no available slots on {appointment.date}."
-                }
-        
-        
-        # Get next sequence number
-        seq_num = get_next_sequence_number(sheet, clinic_code, appointment.doctor_id)
-        
-        # Generate appointment ID
-        appointment.appointment_id = f"{clinic_code}{appointment.doctor_id}{seq_num}"
-        appointment.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Prepare row data
-        row = [
-            appointment.appointment_id,
-            appointment.patient_name,
-            str(appointment.patient_age),
-            appointment.doctor_id,
-            appointment.doctor_name,
-            appointment.date,
-            appointment.time,
-            appointment.status,
-            appointment.created_at
-        ]
-        
-        # Append to sheet
-        sheet.append_row(row)
-        
-        return {
-            "success": True,
-            "message": f"Appointment confirmed! Your appointment ID is: {appointment.appointment_id}",
-            "appointment_id": appointment.appointment_id
-        }
-    except Exception as e:
-        print(f"Error saving to Google Sheets: {e}")
-        return {
-            "success": False,
-            "message": "Failed to save appointment. Please try again."
-        }
-
-def get_next_sequence_number(sheet, clinic_code: str, doctor_id: str) -> int:
-    # Get all existing appointment IDs
-    existing_ids = sheet.col_values(1)  # Assuming appointment_id is in column 1
-    
-    # Filter IDs for this clinic and doctor
-    prefix = f"{clinic_code}{doctor_id}"
-    sequence_numbers = []
-    
-    for app_id in existing_ids[1:]:  # Skip header
-        if app_id and app_id.startswith(prefix):
+            # Check which slots are already booked
+            booked_slots = self.slot_index.booked_slots(doctor_id, date)
+            
+            # Return available slots (doctor's slots minus booked slots)
+            available_slots = [slot for slot, slot_time in slots if slot_time not in booked_slots]
+            return available_slots
+            
+        except Exception as e:
+            print(f"Error getting available slots: {e}")
+            self._reset_on_auth_error(e)
+            return []
+
+    def booked_grid(self, doctor_ids: List[str], dates: List[str]) -> Dict[Tuple[str, str], Set[str]]:
+        """Booked normalized times per (doctor_id, date), for availability calendars"""
+        return self.slot_index.booked_grid(doctor_ids, dates)
+
+    def save_appointment(self, appointment: Appointment, clinic_code: str, clinic_data) -> Dict:
+        """
+        Save appointment to Google Sheets and return result with status message.
+        Reads the sheet once (rows appended since the index last looked) and writes once,
+        in an append shared with concurrent confirmations.
+        The slot and ID are reserved before the write, so concurrent confirmations
+        in this process can't double-book a slot or share an ID.
+        """
+        try:
+            prefix = f"{clinic_code}{appointment.doctor_id}"
+            
+            # Conflict check, alternatives and next sequence number from one read
+            seq_num, booked_slots = self.slot_index.reserve(appointment.doctor_id, appointment.date, appointment.time, prefix)
+            
+            # Check if appointment already exists
+            if seq_num is None:
+                # Alternatives come from the index just refreshed, not another read
+                return slot_taken_result(appointment, clinic_data, self.slot_index.booked_grid)
+            
+            # Generate appointment ID
+            appointment.appointment_id = f"{prefix}{seq_num}"
+            appointment.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Prepare row data
+            row = [
+                appointment.appointment_id,
+                appointment.patient_name,
+                str(appointment.patient_age),
+                appointment.doctor_id,
+                appointment.doctor_name,
+                appointment.date,
+                appointment.time,
+                appointment.status,
+                appointment.created_at
+            ]
+            
+            # Append to sheet, batched with other confirmations
             try:
-                num = int(app_id[len(prefix):])
-                sequence_numbers.append(num)
-            except ValueError:
-                continue
-    
-    return max(sequence_numbers) + 1 if sequence_numbers else 1
+                self.writer.submit(row)
+            except Exception:
+                self.slot_index.release(appointment.doctor_id, appointment.date, appointment.time)
+                raise
+            self.slot_index.commit(appointment.doctor_id, appointment.date, appointment.time)
+            
+            return {
+                "success": True,
+                "message": f"Appointment confirmed! Your appointment ID is: {appointment.appointment_id}",
+                "appointment_id": appointment.appointment_id
+            }
+        except Exception as e:
+            print(f"Error saving to Google Sheets: {e}")
+            self._reset_on_auth_error(e)
+            return {
+                "success": False,
+                "message": "Failed to save appointment. Please try again."
+            }
+
+    def all_records(self) -> List[Dict]:
+        """
+        All appointment rows in the sheet, used to seed the local ledger
+        """
+        return self.handle.worksheet().get_all_records()
+
+    def existing_ids(self) -> Set[str]:
+        """Appointment IDs in the sheet, header included"""
+        try:
+            return set(self.handle.worksheet().col_values(1))
+        except Exception as e:
+            self._reset_on_auth_error(e)
+            raise
+
+    def append_rows(self, rows: List[List[str]], check_existing_ids: bool = False):
+        """
+        Append appointment rows with one request; raises on failure so the caller can retry.
+        With check_existing_ids, rows whose appointment ID is already in the sheet
+        (e.g. from an earlier attempt that timed out after landing) are not appended again.
+        """
+        try:
+            if check_existing_ids:
+                existing_ids = self.existing_ids()
+                rows = [row for row in rows if row[0] not in existing_ids]
+            sheet = self.handle.worksheet()
+            if rows:
+                sheet.append_rows(rows)
+            # Row layout: id, name, age, doctor_id, doctor_name, date, time, ...
+            for row in rows:
+                self.slot_index.add(row[3], row[5], row[6])
+        except Exception as e:
+            self._reset_on_auth_error(e)
+            raise
+
+# The SHEET_KEY / SHEET_TITLE sheet with every row indexed, behind the module-level functions below
+default_sheet = ClinicSheet(sheet_handle, id_allocator)
+
+# Per-clinic sheet state by clinic code, and worksheet handles by (sheet_key, sheet_title)
+_clinic_sheets: Dict[str, ClinicSheet] = {}
+_handles: Dict[Tuple[Optional[str], Optional[str]], SheetHandle] = {(None, None): sheet_handle}
+_clinic_sheets_lock = threading.Lock()
+
+def get_clinic_sheet(clinic: Clinic) -> ClinicSheet:
+    """
+    The clinic's sheet state, created on first use. Clinics naming the same
+    spreadsheet (or none) share one worksheet handle; each has its own slot
+    index and appends. A clinic's sheet settings are read only on first use.
+    """
+    clinic_sheet = _clinic_sheets.get(clinic.code)
+    if clinic_sheet is None:
+        with _clinic_sheets_lock:
+            clinic_sheet = _clinic_sheets.get(clinic.code)
+            if clinic_sheet is None:
+                key = (clinic.sheet_key, clinic.sheet_title)
+                handle = _handles.get(key)
+                if handle is None:
+                    handle = _handles[key] = SheetHandle(*key)
+                clinic_sheet = _clinic_sheets[clinic.code] = ClinicSheet(handle, id_allocator, clinic.code)
+    return clinic_sheet
+
+def clinic_sheets() -> List[ClinicSheet]:
+    """Every clinic sheet in use, plus the default one"""
+    with _clinic_sheets_lock:
+        return [default_sheet, *_clinic_sheets.values()]
+
+def stop_sheet_writers():
+    """Flush rows still waiting to be appended, for every clinic"""
+    for clinic_sheet in clinic_sheets():
+        clinic_sheet.writer.stop()
+
+def warm_up_sheet_index(clinic_code: str, clinic_data):
+    default_sheet.warm_up(clinic_code, clinic_data)
+
+def check_existing_appointment(doctor_id: str, date: str, time: str) -> bool:
+    return default_sheet.check_existing_appointment(doctor_id, date, time)
+
+def get_available_slots(doctor_id: str, date: str, clinic_data) -> List[str]:
+    return default_sheet.available_slots(doctor_id, date, clinic_data)
+
+def get_booked_slots_grid(doctor_ids: List[str], dates: List[str]) -> Dict[Tuple[str, str], Set[str]]:
+    return default_sheet.booked_grid(doctor_ids, dates)
+
+def save_appointment_to_sheet(appointment: Appointment, clinic_code: str, clinic_data) -> Dict:
+    return default_sheet.save_appointment(appointment, clinic_code, clinic_data)
+
+def get_all_appointment_records() -> List[Dict]:
+    return default_sheet.all_records()
 
+def append_appointment_rows(rows: List[List[str]], check_existing_ids: bool = False):
+    default_sheet.append_rows(rows, check_existing_ids)
 
 # def get_next_sequence_number(sheet, clinic_code: str, doctor_id: str) -> int:
 #     # Get all existing appointment IDs
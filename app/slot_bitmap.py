@@ -0,0 +1,185 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .models import Doctor
+from .utils import date_range, normalize_time
+
+# How many days ahead, and how many alternatives, to offer when a slot is taken
+ALTERNATIVE_SEARCH_DAYS = int(os.getenv("ALTERNATIVE_SEARCH_DAYS", "14"))
+ALTERNATIVE_COUNT = int(os.getenv("ALTERNATIVE_COUNT", "3"))
+# Ranking cost, in minutes, of offering another doctor of the same specialization
+OTHER_DOCTOR_PENALTY_MINUTES = int(os.getenv("OTHER_DOCTOR_PENALTY_MINUTES", "120"))
+# Bitmaps kept for distinct clinic schedules; one process can serve many clinics
+SLOT_BITMAP_CACHE_SIZE = int(os.getenv("SLOT_BITMAP_CACHE_SIZE", "256"))
+
+def _minutes(slot_time: str) -> int:
+    hours, minutes = slot_time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def _requested_minutes(time_str: str) -> Optional[int]:
+    # Appointments already carry HH:MM; anything else goes through normalize_time,
+    # which hands back what it can't parse (e.g. "noon") unchanged
+    for slot_time in (time_str, normalize_time(time_str)):
+        try:
+            return _minutes(slot_time)
+        except ValueError:
+            continue
+    return None
+
+class SlotBitmap:
+    """
+    Slot occupancy as one uint64 bitmap per doctor per day, with one bit per
+    distinct clinic slot time (up to 64). Free slots are the doctor's offered
+    bits minus the booked bits, so ranking alternatives over many days and
+    doctors is a handful of array operations.
+    """
+
+    def __init__(self, doctors: List[Doctor]):
+        self.doctors = doctors
+        self.doctor_index = {doctor.id: i for i, doctor in enumerate(doctors)}
+        labels: Dict[str, str] = {}
+        for doctor in doctors:
+            for slot in doctor.slots:
+                labels.setdefault(normalize_time(slot), slot)
+        self.slot_times = sorted(labels, key=_minutes)
+        if len(self.slot_times) > 64:
+            raise ValueError("SlotBitmap supports at most 64 distinct slot times")
+        self.slot_labels = [labels[slot_time] for slot_time in self.slot_times]
+        self.slot_bit = {slot_time: i for i, slot_time in enumerate(self.slot_times)}
+        self.slot_minutes = np.array([_minutes(slot_time) for slot_time in self.slot_times], dtype=np.int64)
+        self._bit_values = np.left_shift(np.uint64(1), np.arange(len(self.slot_times), dtype=np.uint64))
+        self.offered = np.array([self.mask(normalize_time(slot) for slot in doctor.slots) for doctor in doctors],
+                                dtype=np.uint64)
+
+    def mask(self, slot_times) -> int:
+        bits = 0
+        for slot_time in slot_times:
+            bit = self.slot_bit.get(slot_time)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+
+    def occupancy(self, doctor_ids: List[str], dates: List[str],
+                  booked: Dict[Tuple[str, str], Set[str]]) -> np.ndarray:
+        """(doctors, days) bitmap of booked slots, from booked normalized times per (doctor_id, date)"""
+        rows = {doctor_id: i for i, doctor_id in enumerate(doctor_ids)}
+        columns = {date: j for j, date in enumerate(dates)}
+        occupied = np.zeros((len(doctor_ids), len(dates)), dtype=np.uint64)
+        for (doctor_id, date), slot_times in booked.items():
+            i, j = rows.get(doctor_id), columns.get(date)
+            if i is not None and j is not None:
+                occupied[i, j] = self.mask(slot_times)
+        return occupied
+
+    def candidates(self, doctor: Doctor, same_specialization: bool = True) -> List[Doctor]:
+        """The requested doctor first, then others of the same specialization"""
+        others = [d for d in self.doctors if d.id != doctor.id and same_specialization
+                  and d.specialization.lower() == doctor.specialization.lower()]
+        return [doctor] + others
+
+    def nearest_free(self, doctors: List[Doctor], dates: List[str], occupied: np.ndarray, requested_time: str,
+                     limit: int = ALTERNATIVE_COUNT, other_doctor_penalty: int = OTHER_DOCTOR_PENALTY_MINUTES) -> List[Dict[str, str]]:
+        """
+        The `limit` free slots closest to requested_time on dates[0], ranked by
+        days away * 24h + minutes away, plus a penalty for any doctor but doctors[0].
+        None of them if requested_time can't be parsed.
+        """
+        requested_minutes = _requested_minutes(requested_time)
+        if requested_minutes is None:
+            return []
+        offered = self.offered[[self.doctor_index[doctor.id] for doctor in doctors]]
+        free_bits = offered[:, None] & ~occupied
+        # (doctors, days, slots) free flags
+        free = (free_bits[:, :, None] & self._bit_values) != 0
+
+        cost = (np.arange(len(dates), dtype=np.int64)[None, :, None] * 1440
+                + np.abs(self.slot_minutes - requested_minutes)[None, None, :])
+        cost = cost + np.where(np.arange(len(doctors)) == 0, 0, other_doctor_penalty)[:, None, None]
+        cost = np.where(free, cost, np.iinfo(np.int64).max)
+
+        flat = cost.ravel()
+        count = min(limit, int(free.sum()))
+        if count == 0:
+            return []
+        best = np.argpartition(flat, count - 1)[:count]
+        best = best[np.argsort(flat[best], kind="stable")]
+        alternatives = []
+        for doctor_i, day_i, slot_i in zip(*np.unravel_index(best, cost.shape)):
+            doctor = doctors[doctor_i]
+            alternatives.append({
+                "doctor_id": doctor.id,
+                "doctor_name": doctor.name,
+                "date": dates[day_i],
+                "time": self.slot_labels[slot_i]
+            })
+        return alternatives
+
+    def free_labels(self, doctor: Doctor, occupied_bits: int) -> List[str]:
+        """The doctor's slots not in occupied_bits, in the doctor's own order"""
+        return [slot for slot in doctor.slots if not occupied_bits >> self.slot_bit[normalize_time(slot)] & 1]
+
+# Bitmaps by clinic schedule, so edited clinic data gets a fresh one, least recently
+# used first; schedules replaced by edits age out instead of piling up
+_bitmaps: "OrderedDict[Tuple, SlotBitmap]" = OrderedDict()
+_bitmaps_lock = threading.Lock()
+
+def get_slot_bitmap(clinic_data) -> SlotBitmap:
+    key = tuple((doctor.id, doctor.specialization, tuple(doctor.slots)) for doctor in clinic_data.doctors)
+    with _bitmaps_lock:
+        bitmap = _bitmaps.get(key)
+        if bitmap is not None:
+            _bitmaps.move_to_end(key)
+            return bitmap
+    bitmap = SlotBitmap(clinic_data.doctors)
+    with _bitmaps_lock:
+        bitmap = _bitmaps.setdefault(key, bitmap)
+        _bitmaps.move_to_end(key)
+        while len(_bitmaps) > SLOT_BITMAP_CACHE_SIZE:
+            _bitmaps.popitem(last=False)
+    return bitmap
+
+def slot_taken_result(appointment, clinic_data, booked_grid: Callable[[List[str], List[str]], Dict[Tuple[str, str], Set[str]]],
+                      days: int = ALTERNATIVE_SEARCH_DAYS) -> Dict:
+    """
+    The failed booking result for a taken slot: free slots with the same doctor that
+    day, plus the nearest openings with this doctor or others of the same
+    specialization over the next `days` days. booked_grid(doctor_ids, dates) gives
+    the booked normalized times per (doctor_id, date).
+    """
+    bitmap = get_slot_bitmap(clinic_data)
+    doctor = next((doc for doc in clinic_data.doctors if doc.id == appointment.doctor_id), None)
+    if doctor is None:
+        return {
+            "success": False,
+            "message": f"This time slot is already booked. Dr. {appointment.doctor_name} has no available slots on {appointment.date}."
+        }
+
+    doctors = bitmap.candidates(doctor)
+    try:
+        end_date = datetime.strptime(appointment.date, "%Y-%m-%d") + timedelta(days=days - 1)
+        dates = date_range(appointment.date, end_date.strftime("%Y-%m-%d"))
+    except ValueError:
+        # A date normalize_date couldn't make sense of, e.g. "31 feb 2026": only that day is looked up
+        dates = [appointment.date]
+    occupied = bitmap.occupancy([doc.id for doc in doctors], dates, booked_grid([doc.id for doc in doctors], dates))
+    available_slots = bitmap.free_labels(doctor, int(occupied[0, 0]))
+    alternatives = bitmap.nearest_free(doctors, dates, occupied, appointment.time)
+
+    if available_slots:
+        message = f"This time slot is already booked. Available slots for Dr. {appointment.doctor_name} on {appointment.date}: {', '.join(available_slots)}"
+    else:
+        message = f"This time slot is already booked. Dr. {appointment.doctor_name} has no available slots on {appointment.date}."
+    if alternatives:
+        message += " Nearest openings: " + "; ".join(
+            f"{alternative['doctor_name']} on {alternative['date']} at {alternative['time']}" for alternative in alternatives
+        ) + "."
+    return {
+        "success": False,
+        "message": message,
+        "alternatives": alternatives
+    }
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .id_allocator import IdAllocator
+from .utils import normalize_time
+
+# A lookup reads rows appended since the last refresh once the index is older than this
+SLOT_INDEX_MAX_AGE = float(os.getenv("SLOT_INDEX_MAX_AGE", "5"))
+# Rebuild from a full snapshot this often, to pick up edits to existing rows (e.g. cancellations)
+SLOT_INDEX_REBUILD_SECONDS = float(os.getenv("SLOT_INDEX_REBUILD_SECONDS", "900"))
+
+class _Read:
+    """An incremental sheet read in flight, which later requests can wait on instead of reading again"""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.done = threading.Event()
+        self.ok = False
+
+class BookedSlotIndex:
+    """
+    (doctor_id, date) -> booked normalized times, built from one snapshot of the
+    sheet. Later refreshes only read the rows appended since the last known row
+    count; our own bookings are added as they are written. Appointment IDs in
+    the rows read raise the ID allocator's counters. With id_prefix, rows whose
+    appointment ID does not start with it (another clinic's) are skipped.
+
+    Incremental reads hold no lock while they wait on the sheet, so bookings for
+    different slots never queue behind each other's reads. Reads that overlap
+    apply only the rows the index has not counted yet.
+    """
+
+    def __init__(self, read_all: Callable[[], List[List[str]]],
+                 read_from: Callable[[int], List[List[str]]], id_allocator: IdAllocator,
+                 max_age: float = SLOT_INDEX_MAX_AGE, rebuild_seconds: float = SLOT_INDEX_REBUILD_SECONDS,
+                 id_prefix: str = ""):
+        # read_all returns every row including the header; read_from(n) the rows after row n
+        self.read_all = read_all
+        self.read_from = read_from
+        self.id_allocator = id_allocator
+        self.max_age = max_age
+        self.rebuild_seconds = rebuild_seconds
+        self.id_prefix = id_prefix
+        self._lock = threading.Lock()
+        # Held while rebuilding from a full snapshot, so only one runs at a time
+        self._refresh_lock = threading.Lock()
+        # The latest incremental read still in flight
+        self._read: Optional[_Read] = None
+        self._booked: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._columns: Dict[str, int] = {}
+        # (doctor_id, date, normalized time) claimed by a booking whose row is not written yet
+        self._reserved: Set[Tuple[str, str, str]] = set()
+        self._row_count = 0
+        self._refreshed_at = 0.0
+        self._built_at: Optional[float] = None
+
+    def _index_rows(self, rows: List[List[str]]):
+        id_col = self._columns.get("appointment_id", 0)
+        if self.id_prefix:
+            rows = [row for row in rows if id_col < len(row) and row[id_col].startswith(self.id_prefix)]
+        self.id_allocator.observe_ids(row[id_col] for row in rows if id_col < len(row) and row[id_col])
+        doctor_col = self._columns.get("doctor_id")
+        date_col = self._columns.get("date")
+        time_col = self._columns.get("time")
+        status_col = self._columns.get("status")
+        if doctor_col is None or date_col is None or time_col is None:
+            return
+        for row in rows:
+            if len(row) <= max(doctor_col, date_col, time_col):
+                continue
+            status = row[status_col] if status_col is not None and status_col < len(row) else ""
+            if status == "cancelled":
+                continue
+            self._booked[(row[doctor_col], row[date_col])].add(normalize_time(row[time_col]))
+
+    def rebuild(self):
+        with self._refresh_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        rows = self.read_all()
+        with self._lock:
+            self._booked = defaultdict(set)
+            self._columns = {name: i for i, name in enumerate(rows[0])} if rows else {}
+            self._index_rows(rows[1:])
+            self._row_count = len(rows)
+            self._refreshed_at = self._built_at = time.monotonic()
+
+    def refresh(self, max_age: Optional[float] = None):
+        """Bring the index up to date if it is older than max_age seconds"""
+        max_age = self.max_age if max_age is None else max_age
+        requested_at = time.monotonic()
+        if self._built_at is not None and requested_at - self._refreshed_at <= max_age:
+            return
+        if self._built_at is None or requested_at - self._built_at > self.rebuild_seconds:
+            with self._refresh_lock:
+                built_at = self._built_at
+                if built_at is None or time.monotonic() - built_at > self.rebuild_seconds:
+                    self._rebuild()
+                    return
+
+        with self._lock:
+            in_flight = self._read
+            if in_flight is not None and in_flight.started_at >= requested_at - max_age:
+                read = None
+            else:
+                read = self._read = _Read(time.monotonic())
+                start = self._row_count
+        if read is None:
+            # A read that started after this request (e.g. by a concurrent booking) will do
+            in_flight.done.wait()
+            if in_flight.ok:
+                return
+            read = _Read(time.monotonic())
+            with self._lock:
+                start = self._row_count
+
+        try:
+            rows = self.read_from(start)
+            with self._lock:
+                # Another read may have counted some of these rows meanwhile
+                counted = self._row_count - start
+                if counted < len(rows):
+                    self._index_rows(rows[max(counted, 0):])
+                    self._row_count = start + len(rows)
+                self._refreshed_at = max(self._refreshed_at, read.started_at)
+            read.ok = True
+        finally:
+            read.done.set()
+            with self._lock:
+                if self._read is read:
+                    self._read = None
+
+    def booked_slots(self, doctor_id: str, date: str, max_age: Optional[float] = None) -> Set[str]:
+        self.refresh(max_age)
+        with self._lock:
+            return set(self._booked.get((doctor_id, date), ()))
+
+    def booked_grid(self, doctor_ids: List[str], dates: List[str]) -> Dict[Tuple[str, str], Set[str]]:
+        """Booked times for every doctor and date asked for, from one refresh"""
+        self.refresh()
+        with self._lock:
+            return {(doctor_id, date): set(self._booked[(doctor_id, date)])
+                    for doctor_id in doctor_ids for date in dates if (doctor_id, date) in self._booked}
+
+    def is_booked(self, doctor_id: str, date: str, time_slot: str, max_age: Optional[float] = None) -> bool:
+        return normalize_time(time_slot) in self.booked_slots(doctor_id, date, max_age)
+
+    def _taken(self, doctor_id: str, date: str) -> Set[str]:
+        taken = set(self._booked.get((doctor_id, date), ()))
+        taken.update(t for d, dt, t in self._reserved if d == doctor_id and dt == date)
+        return taken
+
+    def reserve(self, doctor_id: str, date: str, time_slot: str, id_prefix: str) -> Tuple[Optional[int], Set[str]]:
+        """
+        Claim the slot, then check it against one fresh read of the sheet and take
+        the next sequence number for id_prefix. Returns (sequence number, taken
+        times); the sequence number is None when the slot is booked or reserved
+        by another booking. A successful reservation must be followed by commit()
+        or release().
+        """
+        if not self.id_allocator.knows(id_prefix):
+            # Rebuild so IDs already in the sheet for this prefix are counted
+            self.id_allocator.register(id_prefix)
+            self.invalidate()
+        slot = (doctor_id, date, normalize_time(time_slot))
+        # Claimed before the read, so a concurrent booking of this slot backs off
+        # without anything shared with other slots being held during the read
+        with self._lock:
+            taken = self._taken(doctor_id, date)
+            if slot[2] in taken:
+                return None, taken
+            self._reserved.add(slot)
+        try:
+            self.refresh(max_age=0)
+        except Exception:
+            self.release(doctor_id, date, time_slot)
+            raise
+        with self._lock:
+            if slot[2] in self._booked.get((doctor_id, date), ()):
+                self._reserved.discard(slot)
+                return None, self._taken(doctor_id, date)
+            taken = self._taken(doctor_id, date) - {slot[2]}
+        return self.id_allocator.next_sequence(id_prefix), taken
+
+    def commit(self, doctor_id: str, date: str, time_slot: str):
+        """Turn a reservation into a booking once its row is written"""
+        slot = (doctor_id, date, normalize_time(time_slot))
+        with self._lock:
+            self._reserved.discard(slot)
+            self._booked[(doctor_id, date)].add(slot[2])
+
+    def release(self, doctor_id: str, date: str, time_slot: str):
+        """Give up a reservation whose row could not be written"""
+        with self._lock:
+            self._reserved.discard((doctor_id, date, normalize_time(time_slot)))
+
+    def add(self, doctor_id: str, date: str, time_slot: str):
+        """Record a booking we just wrote; the row itself is counted on the next refresh"""
+        with self._lock:
+            self._booked[(doctor_id, date)].add(normalize_time(time_slot))
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
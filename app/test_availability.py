@@ -0,0 +1,53 @@
+import httpx
+import pytest
+
+from app import main
+from app.ledger import AppointmentLedger
+from app.models import Appointment
+
+async def get_availability(**params):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/availability", params=params)
+
+@pytest.fixture(params=["sheet", "ledger"])
+def backend(request, worksheet, clinic_data, monkeypatch, tmp_path):
+    ledger = None
+    if request.param == "ledger":
+        ledger = AppointmentLedger(str(tmp_path / "appointments.db"))
+        ledger.book(Appointment(patient_name="Ali", patient_age=30, doctor_id="MR", doctor_name="Dr. Muhammad Raza",
+                                date="2026-11-02", time="9:00 AM"), "CH", clinic_data)
+    monkeypatch.setattr(main, "appointment_ledger", ledger)
+    return request.param
+
+@pytest.mark.anyio
+async def test_week_grid_for_all_doctors(backend, clinic_data):
+    response = await get_availability(start_date="2026-11-01", end_date="2026-11-07")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["start_date"], body["end_date"]) == ("2026-11-01", "2026-11-07")
+    assert [doctor["doctor_id"] for doctor in body["doctors"]] == [doctor.id for doctor in clinic_data.doctors]
+    raza = body["doctors"][0]["availability"]
+    assert len(raza) == 7
+    assert raza["2026-11-02"] == ["10:00 AM", "11:00 AM", "3:00 PM"]
+    assert raza["2026-11-01"] == ["9:00 AM", "10:00 AM", "11:00 AM", "3:00 PM"]
+
+@pytest.mark.anyio
+async def test_filters_and_default_range(backend):
+    response = await get_availability(specialization="cardiologist")
+    doctors = response.json()["doctors"]
+    assert [doctor["specialization"] for doctor in doctors] == ["Cardiologist"] * len(doctors)
+    assert all(len(doctor["availability"]) == 7 for doctor in doctors)
+
+    response = await get_availability(doctor_id="AA", start_date="2026-11-01", end_date="2026-11-01")
+    assert [doctor["doctor_id"] for doctor in response.json()["doctors"]] == ["AA"]
+
+@pytest.mark.anyio
+async def test_rejects_oversized_or_reversed_ranges(backend):
+    assert (await get_availability(start_date="2026-01-01", end_date="2026-12-31")).status_code == 400
+    assert (await get_availability(start_date="2026-11-07", end_date="2026-11-01")).status_code == 400
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,39 @@
+import json
+
+import httpx
+import pytest
+
+from app import main
+from app.benchmarks import CHAIN_MESSAGE
+from app.semantic_cache import SemanticCache, hashing_encoder
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+@pytest.mark.anyio
+async def test_llm_failure_mid_stream_ends_with_error_event(monkeypatch):
+    async def fail_mid_reply(chain, inputs):
+        yield "Sure, "
+        yield "which "
+        raise ConnectionError("connection reset by provider")
+    monkeypatch.setattr(main, "get_chat_chain", lambda clinic_data: None)
+    monkeypatch.setattr(main, "astream_chain", fail_mid_reply)
+    monkeypatch.setattr(main, "semantic_cache", SemanticCache(encoder=hashing_encoder()))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json={"message": CHAIN_MESSAGE, "session_id": "stream-error"})
+
+    assert response.status_code == 200
+    events = parse_events(response.text)
+    assert events[:2] == [("token", {"token": "Sure, "}), ("token", {"token": "which "})]
+    assert events[-1][0] == "error" and events[-1][1]["status"] == "error"
+    assert events[-1][1]["session_id"] == "stream-error"
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from app import main
+from app.clinic_store import ClinicDataProvider, ClinicRegistry
+
+@pytest.fixture
+def anyio_backend():
+    # The watcher is an asyncio task, as under uvicorn
+    return "asyncio"
+
+@pytest.fixture
+def clinic_file(tmp_path):
+    path = tmp_path / "clinic_data.json"
+    with open("app/data/clinic_data.json") as f:
+        path.write_text(f.read())
+    return path
+
+def edit(path, change):
+    data = json.loads(path.read_text())
+    change(data)
+    path.write_text(json.dumps(data))
+    # Make sure the change is visible even on coarse mtime clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_reload_swaps_in_new_snapshot(clinic_file):
+    provider = ClinicDataProvider(str(clinic_file))
+    before = provider.current
+    assert not provider.reload()
+
+    edit(clinic_file, lambda data: data["doctors"][0].update(slots=["8:00 AM", "9:00 AM"]))
+    assert provider.reload()
+
+    after = provider.current
+    assert after.version != before.version
+    assert after.doctor_slots["MR"] == [("8:00 AM", "08:00"), ("9:00 AM", "09:00")]
+    assert "Available at 8:00 AM, 9:00 AM" in after.doctors_list
+    # The old snapshot is left as it was for requests still using it
+    assert before.doctors_by_id["MR"].slots == ["9:00 AM", "10:00 AM", "11:00 AM", "3:00 PM"]
+
+def test_invalid_file_keeps_current_snapshot(clinic_file):
+    provider = ClinicDataProvider(str(clinic_file))
+    before = provider.current
+
+    edit(clinic_file, lambda data: data["doctors"][0].pop("slots"))
+    assert not provider.reload()
+    assert provider.current is before and provider.errors == 1
+
+def test_unchanged_content_keeps_version(clinic_file):
+    provider = ClinicDataProvider(str(clinic_file))
+    before = provider.current
+    edit(clinic_file, lambda data: None)
+    assert not provider.reload()
+    assert provider.current is before
+
+@pytest.mark.anyio
+async def test_watcher_updates_endpoints(clinic_file, worksheet, monkeypatch):
+    registry = ClinicRegistry([str(clinic_file)])
+    provider = registry.default
+    monkeypatch.setattr(main, "clinic_registry", registry)
+    monkeypatch.setattr(main, "appointment_ledger", None)
+    registry.start_watcher(interval=0.01)
+    try:
+        edit(clinic_file, lambda data: data["doctors"].append(
+            {"id": "ZK", "name": "Dr. Zara Khan", "specialization": "Dermatologist", "slots": ["10:00 AM"]}))
+        for _ in range(200):
+            if "ZK" in provider.current.doctors_by_id:
+                break
+            await asyncio.sleep(0.01)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            doctors = (await client.get("/doctors")).json()
+            availability = (await client.get("/availability/ZK/2026-11-02")).json()
+    finally:
+        registry.stop_watcher()
+
+    assert doctors["doctors"][-1]["name"] == "Dr. Zara Khan"
+    assert doctors["version"] == provider.current.version
+    assert availability["available_slots"] == ["10:00 AM"]
+    assert provider.current.doctor_index.find("zara").id == "ZK"
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app import main, sheets
+from app.ledger import AppointmentLedger
+from app.models import Appointment, ConversationState
+
+CONFIRMS = 300
+
+def pending_sessions(clinic_data):
+    """CONFIRMS sessions, each waiting to confirm one of a few popular slots"""
+    doctors = clinic_data.doctors[:3]
+    sessions = {}
+    for i in range(CONFIRMS):
+        doctor = doctors[i % len(doctors)]
+        sessions[f"stress-{i}"] = Appointment(
+            patient_name=f"Patient {i}", patient_age=30, doctor_id=doctor.id, doctor_name=doctor.name,
+            date=f"2026-12-0{i % 2 + 1}", time=doctor.slots[i // 7 % len(doctor.slots)]
+        )
+    return sessions
+
+async def confirm_all(session_ids):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post(f"/confirm/{session_id}") for session_id in session_ids))
+
+@pytest.mark.parametrize("backend", ["sheet", "ledger"])
+def test_parallel_confirms_never_double_book(backend, worksheet, clinic_data, monkeypatch, tmp_path):
+    ledger = AppointmentLedger(str(tmp_path / "appointments.db")) if backend == "ledger" else None
+    monkeypatch.setattr(main, "appointment_ledger", ledger)
+    # Widen the window between the conflict check and the write
+    worksheet.latency = 0.002
+
+    sessions = pending_sessions(clinic_data)
+    for session_id, appointment in sessions.items():
+        main.conversation_states.save(session_id, ConversationState(current_step="confirmation", appointment=appointment))
+
+    responses = asyncio.run(confirm_all(list(sessions)))
+
+    booked = [sessions[session_id] for session_id, response in zip(sessions, responses) if response.status_code == 200]
+    requested_slots = {(a.doctor_id, a.date, a.time) for a in sessions.values()}
+    booked_slots = Counter((a.doctor_id, a.date, a.time) for a in booked)
+    assert all(count == 1 for count in booked_slots.values())
+    assert set(booked_slots) == requested_slots
+
+    appointment_ids = [response.json()["appointment_id"] for response in responses if response.status_code == 200]
+    assert len(set(appointment_ids)) == len(appointment_ids)
+    assert all(response.status_code in (200, 400) for response in responses)
+
+    if backend == "sheet":
+        rows = worksheet.values[1:]
+        assert len({(row[3], row[5], row[6]) for row in rows}) == len(rows)
+
+def test_bookings_for_different_doctors_read_side_by_side(worksheet, clinic_data):
+    sheets.default_sheet.warm_up("CH", clinic_data)
+    worksheet.latency = 0.5
+    index = sheets.default_sheet.slot_index
+
+    def reserve(doctor):
+        start = time.perf_counter()
+        seq_num, _ = index.reserve(doctor.id, "2026-12-01", doctor.slots[0], f"CH{doctor.id}")
+        return seq_num, time.perf_counter() - start
+
+    with ThreadPoolExecutor(len(clinic_data.doctors)) as pool:
+        results = list(pool.map(reserve, clinic_data.doctors))
+
+    assert all(seq_num is not None for seq_num, _ in results)
+    # Each waits on one sheet read, not on the others' reads as well
+    assert max(elapsed for _, elapsed in results) < 0.8
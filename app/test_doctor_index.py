@@ -0,0 +1,53 @@
+import pytest
+
+from app import main
+from app.doctor_index import DoctorIndex
+from app.memory_utils import create_memory
+from app.models import ConversationState, Doctor
+from app.utils import find_doctor_by_name
+
+@pytest.fixture
+def index(clinic_data):
+    return DoctorIndex(clinic_data.doctors)
+
+@pytest.mark.parametrize("name, expected", [
+    ("Dr. Muhammad Raza", ["MR"]),
+    ("raza", ["MR"]),
+    ("Muhammad", ["MR"]),
+    ("dr ayesha", ["AA"]),
+    ("Ali Kamran", ["KA"]),
+    ("mr", ["MR"]),
+    ("Dr. Razza", ["MR"]),
+    ("Ayesa Ali", ["AA"]),
+    ("Ali", ["AA", "KA"]),
+    ("Dr. Zubair", []),
+    ("", []),
+])
+def test_match(index, name, expected):
+    assert [doctor.id for doctor in index.match(name)] == expected
+
+def test_ambiguous_name_is_not_resolved(clinic_data):
+    assert find_doctor_by_name(clinic_data.doctors, "ali") is None
+    assert find_doctor_by_name(clinic_data.doctors, "ayesha ali").id == "AA"
+
+def test_mentioned(index):
+    assert [doctor.id for doctor in index.mentioned("is the cardiologist free on monday?")] == ["MR"]
+    assert [doctor.id for doctor in index.mentioned("when do Dr. Ali and dermatologists work")] == ["AA", "KA"]
+
+def test_hundreds_of_doctors():
+    doctors = [Doctor(id=f"D{i}", name=f"Dr. Given{i} Family{i % 50}", specialization="GP", slots=["9:00 AM"])
+               for i in range(500)]
+    index = DoctorIndex(doctors)
+    assert [doctor.id for doctor in index.match("given123")] == ["D123"]
+    assert len(index.match("Family7")) == 10
+    assert [doctor.id for doctor in index.match("Dr Given123 Family23")] == ["D123"]
+
+@pytest.mark.anyio
+async def test_chat_asks_which_doctor(clinic_data):
+    state = ConversationState(memory=create_memory())
+    state.collected_data = {"name": "Sana", "age": "30", "doctor": "Ali", "date": "2026-11-02", "time": "11:00 AM"}
+
+    response = await main.complete_turn("doctor-test", state, "yes book it", "", clinic_data)
+
+    assert "Ayesha Ali or Dr. Kamran Ali" in response.response
+    assert "doctor" not in state.collected_data and state.appointment is None
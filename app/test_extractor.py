@@ -0,0 +1,37 @@
+import re
+
+import pytest
+
+from app.benchmarks import EXTRACTION_MESSAGES
+from app.extractor import FIELD_PATTERNS, extract_appointment_info
+
+def per_field_search(text):
+    extracted = {}
+    for key, pattern in FIELD_PATTERNS.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            extracted[key] = match.group(1).strip()
+    return extracted
+
+@pytest.mark.parametrize("message", EXTRACTION_MESSAGES)
+def test_extraction_matches_per_field_search(message):
+    expected = per_field_search(message)
+    extracted = extract_appointment_info(message)
+    # Post-processing (relative dates, o'clock, "and" in names) is applied on top
+    for field, value in expected.items():
+        if field == "date" and re.search(r"tomorrow|next week", message, re.IGNORECASE):
+            continue
+        if field == "time" and "o'clock" in value.lower():
+            continue
+        if field == "name" and " and " in value:
+            value = value.split(" and ")[0].strip()
+        assert extracted[field] == value
+    assert set(extracted) - set(expected) <= {"date"}
+
+def test_only_missing_skips_filled_fields():
+    state = {"name": "Fatima", "age": "23", "time": "empty"}
+    extracted = extract_appointment_info("I'm 45, call me Omar, at 3pm", state, only_missing=True)
+    assert (extracted["name"], extracted["age"], extracted["time"]) == ("Fatima", "23", "3pm")
+
+    extracted = extract_appointment_info("I'm 45, call me Omar, at 3pm", state)
+    assert (extracted["name"], extracted["age"]) == ("Omar", "45")
@@ -0,0 +1,39 @@
+from app.id_allocator import IdAllocator, sequence_number
+from app.ledger import AppointmentLedger
+from app.models import Appointment
+
+def test_sequence_number_keeps_id_format():
+    assert sequence_number("CHMR12", "CHMR") == 12
+    assert sequence_number("CHAA3", "CHMR") == 0
+    assert sequence_number("CHMRX", "CHM") == 0
+
+def test_counters_persist_and_follow_observed_ids(tmp_path):
+    path = str(tmp_path / "id_counters.db")
+    allocator = IdAllocator(path)
+    allocator.register("CHMR")
+    allocator.observe_ids(["CHMR7", "CHMR12", "CHAA40", "CHMR3"])
+    assert allocator.next_sequence("CHMR") == 13
+    assert allocator.next_sequence("CHAA") == 1
+
+    # A restarted process continues from the persisted counters
+    restarted = IdAllocator(path)
+    assert restarted.knows("CHMR")
+    assert restarted.next_sequence("CHMR") == 14
+    restarted.observe_ids(["CHMR5"])
+    assert restarted.next_sequence("CHMR") == 15
+
+def test_ledger_counters_continue_from_seeded_rows(tmp_path, clinic_data):
+    ledger = AppointmentLedger(str(tmp_path / "appointments.db"))
+    ledger.seed_from_records([
+        {"appointment_id": "CHMR41", "doctor_id": "MR", "date": "2026-11-02", "time": "9:00 AM"},
+    ], "CH")
+    result = ledger.book(Appointment(patient_name="Fatima", patient_age=23, doctor_id="MR",
+                                     doctor_name="Dr. Muhammad Raza", date="2026-11-02", time="10:00 AM"),
+                         "CH", clinic_data)
+    assert result["appointment_id"] == "CHMR42"
+
+    reopened = AppointmentLedger(ledger.path)
+    result = reopened.book(Appointment(patient_name="Ali", patient_age=30, doctor_id="MR",
+                                       doctor_name="Dr. Muhammad Raza", date="2026-11-02", time="11:00 AM"),
+                           "CH", clinic_data)
+    assert result["appointment_id"] == "CHMR43"
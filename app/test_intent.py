@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from app import intent, main
+from app.intent import IntentClassifier, KeywordIntentClassifier, get_intent_classifier, load_corpus
+from app.extractor import has_booking_intent
+from app.memory_utils import create_memory
+from app.models import Appointment, ConversationState
+
+def test_direct_scoring_matches_pipeline():
+    classifier = get_intent_classifier()
+    assert isinstance(classifier, IntentClassifier)
+    texts, _ = load_corpus()
+    texts = texts[::7] + ["please tell me your address", "unseen wordz only", ""]
+    assert np.allclose([classifier.probabilities(text) for text in texts], classifier.pipeline.predict_proba(texts))
+
+# Held out from the training corpus, see test_booking_examples_are_held_out
+BOOKING_EXAMPLES = [
+    ("please tell me your address", False),
+    ("I'm looking at your facebook page", False),
+    ("thanks, goodbye", False),
+    ("what time do you close on friday?", False),
+    ("my name is Danish", False),
+    ("I'm 33 and my name is Hira", False),
+    ("don't book dr raza at 3pm", False),
+    ("yes, go ahead", True),
+    ("okay, sounds good", True),
+    ("I'd like to book with Dr. Raza tomorrow", True),
+    ("book dr hina 5 oct 11am name amna age 33", True),
+    ("I am Hassan, 40 years old, book Dr. Sara for tomorrow 3pm", True),
+    ("schedule dr hamza friday 2pm, name bilal, age 52", True),
+    # The classifier reads these as "other"; asking to book with details overrules it
+    ("My name is Fatima, I'm 23, book Dr. Raza on 20 nov at 10am", True),
+    ("Fatima, 23, Dr. Raza, 20 nov, 10am, book it", True),
+]
+
+@pytest.mark.parametrize("message, booking", BOOKING_EXAMPLES)
+def test_booking_intent(message, booking):
+    assert has_booking_intent(message) is booking
+
+def test_booking_examples_are_held_out():
+    corpus = {text.lower() for text in load_corpus()[0]}
+    assert not [message for message, _ in BOOKING_EXAMPLES if message.lower() in corpus]
+
+@pytest.mark.anyio
+async def test_all_in_one_booking_goes_to_confirmation(clinic_data, monkeypatch):
+    async def confirm(chain, inputs):
+        return "Shall I book it?"
+    monkeypatch.setattr(main, "get_confirmation_chain", lambda: None)
+    monkeypatch.setattr(main, "arun_chain", confirm)
+    state = ConversationState(memory=create_memory())
+
+    reply = ("Extracted:\nname: Fatima\nage: 23\ndoctor: Dr. Muhammad Raza\ndate: 2026-11-20\ntime: 10:00\n"
+             "missing: none\n\nLet me confirm those details.")
+
+    response = await main.complete_turn("all-in-one", state, "My name is Fatima, I'm 23, book Dr. Raza on 20 nov at 10am",
+                                        reply, clinic_data)
+    assert response.status == "confirmation"
+    assert response.appointment["doctor_id"] == "MR" and response.appointment["time"] == "10:00"
+
+class UnsureClassifier:
+    def classify(self, text):
+        return "other", 0.3
+
+def test_unsure_booking_keyword_counts_as_booking(monkeypatch):
+    monkeypatch.setattr(intent, "get_intent_classifier", UnsureClassifier)
+    intent.classify_intent.cache_clear()
+    try:
+        assert intent.classify_intent("appointment dr raza") == "booking"
+        assert intent.classify_intent("hmm dr raza") == "other"
+    finally:
+        intent.classify_intent.cache_clear()
+
+def test_keyword_fallback_matches_whole_words():
+    classifier = KeywordIntentClassifier()
+    assert classifier.classify("I'm looking at your facebook page")[0] == "other"
+    assert classifier.classify("ok, book it")[0] == "confirm"
+    assert classifier.classify("no, cancel")[0] == "deny"
+
+@pytest.fixture
+def pending_confirmation():
+    state = ConversationState(memory=create_memory())
+    state.collected_data = {"name": "Ali", "age": "30", "doctor": "Raza", "date": "2026-11-02", "time": "10:00"}
+    state.appointment = Appointment(patient_name="Ali", patient_age=30, doctor_id="MR", doctor_name="Dr. Muhammad Raza",
+                                    date="2026-11-02", time="10:00")
+    state.current_step = "confirmation"
+    main.conversation_states.save("intent-test", state)
+    yield state
+    main.conversation_states.clear()
+
+@pytest.mark.anyio
+async def test_declined_confirmation_skips_llm(pending_confirmation, clinic_data):
+    response = await main.handle_confirmation_reply("intent-test", pending_confirmation, "no, don't book it", clinic_data)
+
+    assert response.status == "chat"
+    state = main.conversation_states.load("intent-test")
+    assert state.appointment is None and state.current_step == "greeting"
+    assert state.collected_data["doctor"] == "Raza"
+
+@pytest.mark.anyio
+async def test_decline_with_new_details_goes_to_chatbot(pending_confirmation, clinic_data):
+    assert await main.handle_confirmation_reply("intent-test", pending_confirmation, "no, make it at 4pm", clinic_data) is None
+
+def test_greeting_answered_locally(clinic_data):
+    state = ConversationState(memory=create_memory())
+    response = main.handle_info_question("greeting-test", state, "hello there", clinic_data)
+    assert response is not None and clinic_data.clinic.name in response.response
+
+    state.collected_data = {"name": "Ali"}
+    assert main.handle_info_question("greeting-test", state, "hello there", clinic_data) is None
+
+@pytest.mark.parametrize("message", [
+    "what about dr ayesha at 4pm tomorrow?",
+    # Sara is the patient here, not Dr. Sara Ahmad
+    "my name is Sara, is the dermatologist in?",
+])
+def test_questions_with_booking_details_go_to_chatbot(message, clinic_data):
+    state = ConversationState(memory=create_memory())
+    assert main.handle_info_question("info-test", state, message, clinic_data) is None
+
+@pytest.mark.parametrize("message", [
+    "how do I reach you by bus?",
+    "is there parking near your location?",
+    "what is the number of doctors at the clinic?",
+    "what does a dermatologist treat?",
+    "does dr raza speak urdu?",
+    # A greeting followed by a question the templates cannot answer
+    "hello, is dr raza a good doctor?",
+])
+def test_questions_beyond_the_templates_go_to_chatbot(message, clinic_data):
+    state = ConversationState(memory=create_memory())
+    assert main.handle_info_question("info-test", state, message, clinic_data) is None
+
+@pytest.mark.parametrize("message, expected", [
+    ("Where is the clinic located and what is the contact number?", ["123 Main Street", "+92-123-456789"]),
+    ("When is Dr. Raza available?", ["Dr. Muhammad Raza"]),
+    ("who is the cardiologist?", ["Dr. Muhammad Raza"]),
+])
+def test_info_questions_answered_locally(message, expected, clinic_data):
+    state = ConversationState(memory=create_memory())
+    response = main.handle_info_question("info-test", state, message, clinic_data)
+    assert response is not None and all(text in response.response for text in expected)
+
+def test_info_questions_mid_booking_go_to_chatbot(clinic_data):
+    state = ConversationState(memory=create_memory())
+    assert main.handle_info_question("info-test", state, "what are your hours?", clinic_data) is not None
+
+    state.collected_data = {"doctor": "Ayesha"}
+    assert main.handle_info_question("info-test", state, "what are your hours?", clinic_data) is None
@@ -0,0 +1,20 @@
+from app.memory_utils import CHARS_PER_TOKEN, SummarizingMemory
+
+def memory_with_summary(token_budget: int, summary_chars: int) -> SummarizingMemory:
+    memory = SummarizingMemory(token_budget=token_budget)
+    memory.summary = "s" * summary_chars
+    # One 95-character turn
+    memory.save_turn("When is Dr. Raza in?", "Dr. Raza sees patients at 9 AM, 10 AM, 11 AM and 3 PM.")
+    return memory
+
+def test_large_summary_stays_within_a_tight_budget():
+    memory = memory_with_summary(token_budget=25, summary_chars=5000)
+    history = memory.render()
+    assert len(history) <= 25 * CHARS_PER_TOKEN
+    assert history == memory.turns.text
+
+def test_summary_tail_fills_the_room_left():
+    memory = memory_with_summary(token_budget=50, summary_chars=5000)
+    history = memory.render()
+    assert len(history) == 50 * CHARS_PER_TOKEN
+    assert history.startswith("Summary of earlier conversation: sss") and history.endswith(memory.turns.text)
@@ -0,0 +1,178 @@
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+import pytest
+
+from app import main, semantic_cache, sheets
+from app.clinic_store import ClinicRegistry
+from app.id_allocator import IdAllocator
+from app.ledger import AppointmentLedger, SheetReplicator
+from app.models import Appointment, ConversationState
+from app.semantic_cache import SemanticCache
+
+NORTH = {
+    "clinic": {"name": "North Family Clinic", "code": "NF", "address": "9 Hill Road", "hours": "Mon-Sat 8AM - 2PM",
+               "contact": "+92-000-111222", "sheet_key": "north-sheet"},
+    # Same doctor ID as Care Health's Dr. Muhammad Raza
+    "doctors": [{"id": "MR", "name": "Dr. Maryam Rashid", "specialization": "Pediatrician", "slots": ["9:00 AM", "10:00 AM"]}]
+}
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    with open("app/data/clinic_data.json") as f:
+        (tmp_path / "care_health.json").write_text(f.read())
+    (tmp_path / "north.json").write_text(json.dumps(NORTH))
+    registry = ClinicRegistry(directory=str(tmp_path))
+    monkeypatch.setattr(main, "clinic_registry", registry)
+    return registry
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = AppointmentLedger(str(tmp_path / "appointments.db"))
+    monkeypatch.setattr(main, "appointment_ledger", ledger)
+    return ledger
+
+async def request(method, url, **kwargs):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, url, **kwargs)
+
+def raza_appointment(time="9:00 AM"):
+    return Appointment(patient_name="Ali", patient_age=30, doctor_id="MR", doctor_name="Dr. Muhammad Raza",
+                       date="2026-11-02", time=time)
+
+def test_registry_loads_directory(registry, tmp_path):
+    assert registry.default_code == "CH" and len(registry) == 2
+    assert registry.get("NF").current.doctor_index.find("maryam").name == "Dr. Maryam Rashid"
+    # The sheet a clinic books into is not published
+    assert "sheet_key" not in registry.get("NF").current.as_dict["clinic"]
+
+    (tmp_path / "broken.json").write_text("{")
+    south = dict(NORTH, clinic=dict(NORTH["clinic"], code="SO", name="South Clinic"))
+    (tmp_path / "south.json").write_text(json.dumps(south))
+    assert registry.reload() == 1
+    assert registry.get("SO").current.clinic.name == "South Clinic"
+    assert registry.errors == 1 and registry.reload() == 0
+
+@pytest.mark.anyio
+async def test_requests_routed_by_path_or_header(registry, ledger):
+    default = (await request("GET", "/doctors")).json()
+    by_path = (await request("GET", "/clinics/NF/doctors")).json()
+    by_header = (await request("GET", "/doctors", headers={"X-Clinic-Code": "NF"})).json()
+
+    assert default["clinic"]["code"] == "CH"
+    assert by_path == by_header and by_path["doctors"][0]["name"] == "Dr. Maryam Rashid"
+    assert (await request("GET", "/clinics/XX/doctors")).status_code == 404
+
+    availability = await request("GET", "/clinics/NF/availability/MR/2026-11-02")
+    assert availability.json()["available_slots"] == ["9:00 AM", "10:00 AM"]
+    clinics = (await request("GET", "/clinics")).json()
+    assert [clinic["code"] for clinic in clinics["clinics"]] == ["CH", "NF"]
+
+@pytest.mark.anyio
+async def test_slots_and_sessions_are_per_clinic(registry, ledger):
+    care, north = registry.get("CH").current, registry.get("NF").current
+    for clinic_data in (care, north):
+        state = ConversationState(current_step="confirmation", appointment=raza_appointment())
+        main.conversation_states.save(main.session_key("same-session", clinic_data), state)
+
+    try:
+        care_confirm = await request("POST", "/confirm/same-session")
+        north_confirm = await request("POST", "/clinics/NF/confirm/same-session")
+    finally:
+        main.conversation_states.clear()
+
+    # The same doctor ID, date and time is a different slot at each clinic
+    assert care_confirm.json()["appointment_id"] == "CHMR1"
+    assert north_confirm.json()["appointment_id"] == "NFMR1"
+    assert ledger.booked_slots("MR", "2026-11-02", "NF") == ["09:00"]
+    availability = await request("GET", "/availability", params={"doctor_id": "MR", "start_date": "2026-11-02",
+                                                                 "end_date": "2026-11-02"}, headers={"X-Clinic-Code": "NF"})
+    assert availability.json()["doctors"][0]["availability"]["2026-11-02"] == ["10:00 AM"]
+
+def test_replicator_pushes_each_clinic_to_its_sheet(registry, ledger):
+    care, north = registry.get("CH").current, registry.get("NF").current
+    ledger.book(raza_appointment(), "CH", care)
+    ledger.book(raza_appointment(), "NF", north)
+    ledger.book(raza_appointment("10:00 AM"), "NF", north)
+
+    pushed = {}
+    def push_rows(clinic_code, rows, check_existing_ids):
+        if clinic_code == "CH":
+            raise ConnectionError("quota")
+        pushed.setdefault(clinic_code, []).extend(row[0] for row in rows)
+
+    assert SheetReplicator(ledger, push_rows).replicate_once() == 2
+    assert pushed == {"NF": ["NFMR1", "NFMR2"]}
+    # Care Health's row waits for its own retry
+    assert ledger.outbox_size() == 1
+
+def test_clinics_sharing_a_sheet_index_only_their_rows(worksheet, registry):
+    worksheet.values.append(["NFMR1", "Omar", "8", "MR", "Dr. Maryam Rashid", "2026-11-02", "10:00 AM", "pending", ""])
+    north = registry.get("NF").current
+    north_sheet = sheets.get_clinic_sheet(north.clinic)
+    care_sheet = sheets.get_clinic_sheet(registry.get("CH").current.clinic)
+
+    assert north_sheet is not care_sheet and north_sheet.handle is not care_sheet.handle
+    assert north_sheet.available_slots("MR", "2026-11-02", north) == ["9:00 AM"]
+    assert care_sheet.slot_index.booked_slots("MR", "2026-11-02") == {"09:00"}
+    # Clinics without a sheet of their own share the default handle
+    assert care_sheet.handle is sheets.sheet_handle
+
+def test_semantic_cache_namespaces():
+    cache = SemanticCache(encoder=lambda texts: np.ones((len(texts), 4)) / 2)
+    cache.check_version("v1", "CH")
+    cache.check_version("v1", "NF")
+    cache.store("what are your hours?", "9 to 6", "CH")
+    cache.store("what are your hours?", "8 to 2", "NF")
+
+    assert cache.lookup("what are your hours?", "NF") == "8 to 2"
+    cache.check_version("v2", "NF")
+    assert cache.lookup("what are your hours?", "NF") is None
+    assert cache.lookup("what are your hours?", "CH") == "9 to 6"
+
+def test_semantic_cache_encoder_loads_once(monkeypatch):
+    loads = []
+    def slow_encoder():
+        loads.append(1)
+        time.sleep(0.2)
+        return lambda texts: np.ones((len(texts), 4)) / 2
+    monkeypatch.setattr(semantic_cache, "default_encoder", slow_encoder)
+    cache = SemanticCache()
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(cache.lookup, ["what are your hours?"] * 8)) == [None] * 8
+    assert len(loads) == 1
+
+def test_ledger_migrates_single_clinic_schema(tmp_path, clinic_data):
+    path = str(tmp_path / "appointments.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE appointments (appointment_id TEXT PRIMARY KEY, id_prefix TEXT NOT NULL, seq INTEGER NOT NULL,
+            patient_name TEXT, patient_age INTEGER, doctor_id TEXT NOT NULL, doctor_name TEXT, date TEXT NOT NULL,
+            time TEXT NOT NULL, slot_time TEXT NOT NULL, status TEXT NOT NULL, created_at TEXT);
+        CREATE UNIQUE INDEX appointments_slot ON appointments (doctor_id, date, slot_time) WHERE status != 'cancelled';
+        INSERT INTO appointments VALUES ('CHMR3', 'CHMR', 3, 'Ali', 30, 'MR', 'Dr. Muhammad Raza', '2026-11-02',
+            '9:00 AM', '09:00', 'pending', '');
+    """)
+    conn.close()
+
+    ledger = AppointmentLedger(path)
+    assert ledger.booked_slots("MR", "2026-11-02", "CH") == ["09:00"]
+    assert ledger.book(raza_appointment(), "CH", clinic_data)["success"] is False
+    assert ledger.book(raza_appointment(), "NF", clinic_data)["appointment_id"] == "NFMR1"
+
+def test_observe_ids_with_many_prefixes(tmp_path):
+    allocator = IdAllocator(str(tmp_path / "id_counters.db"))
+    for prefix in ["CHD1", "CHD11", "NFD1"]:
+        allocator.register(prefix)
+    allocator.observe_ids(["CHD115", "NFD17", "XXD19", "CHD1X"])
+    assert [allocator.last_sequence(prefix) for prefix in ["CHD1", "CHD11", "NFD1"]] == [15, 5, 7]
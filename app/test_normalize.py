@@ -0,0 +1,51 @@
+import itertools
+from datetime import datetime
+
+from app.utils import _parse_date, _parse_time, normalize_date, normalize_time
+
+# Shapes seen in clinic data, sheet rows, LLM "Extracted:" blocks and patient messages
+TIME_CORPUS = [
+    f"{hour}{sep}{minute}{space}{suffix}"
+    for hour, sep, minute, space, suffix in itertools.product(
+        ["0", "00", "1", "01", "9", "09", "11", "12", "13", "23", "24"],
+        [":"], ["00", "05", "30", "59", "60", "5"], ["", " "], ["", "AM", "PM", "am", "pm", "a.m.", "P.M."]
+    )
+] + [
+    "9am", "9 AM", "12pm", "12 am", "0am", "13pm", "9", "930", "9.30", "9:00:00", " 9:00 AM ", "9:00 AM\n",
+    "noon", "empty", "10 o'clock", "3 in the afternoon", "", "ampm", "9:00 amp", "٩:٠٠ AM",
+]
+
+DATE_CORPUS = [
+    f"{day}{sep}{month}{year}"
+    for day, sep, month, year in itertools.product(
+        ["1", "01", "9", "22", "29", "30", "31", "32", "0", "00"],
+        [" ", "  ", "\t"], ["sep", "Sep", "SEPT", "september", "feb", "February", "may", "MAY", "xyz"],
+        ["", " 2024", " 2025", " 2026", " 0999", " 26"]
+    )
+] + [
+    f"{year}-{month}-{day}"
+    for year, month, day in itertools.product(["2024", "2025", "2026", "0000", "10000"], ["01", "02", "1", "00", "13"], ["01", "29", "30", "1", "00", "32"])
+] + [
+    " 22 sep", "22 sep ", " 22 sep 2026", "22 sep 2026 ", "22/09/2026", "22.09.2026", "22-Sep-2026", "22-september-2025",
+    "22/09", "22 09", "tomorrow", "next monday", "Monday", "sep 22", "September 22, 2026", "2026/11/02", "", "empty",
+]
+
+def test_normalize_time_matches_parser():
+    # Second round is served from the cache
+    for _ in range(2):
+        assert [(t, normalize_time(t)) for t in TIME_CORPUS] == [(t, _parse_time(t)) for t in TIME_CORPUS]
+
+def test_normalize_date_matches_parser():
+    for _ in range(2):
+        assert [(d, normalize_date(d)) for d in DATE_CORPUS] == [(d, _parse_date(d)) for d in DATE_CORPUS]
+
+def test_golden_values():
+    year = datetime.now().year
+    assert [normalize_time(t) for t in ["9:00 AM", "12:00 PM", "12:30 am", "3pm", "14:30", "0:30am"]] == \
+        ["09:00", "12:00", "00:30", "15:00", "14:30", "0:30 AM"]
+    assert [normalize_date(d) for d in ["2026-11-02", "22 sep", "22 September 2024", "2025-03-01", "31 feb"]] == \
+        ["2026-11-02", f"{year}-09-22", "2024-09-22", f"{year}-03-01", f"31 feb {year}"]
+
+def test_non_strings_pass_through():
+    assert normalize_time(None) is None
+    assert normalize_date(["22 sep"]) == ["22 sep"]
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from app import ledger as ledger_module, main, sheets
+from app.clinic_store import ClinicRegistry
+from app.conftest import FakeWorksheet
+from app.ledger import REPLICATION_LEASE_SECONDS, AppointmentLedger, SheetReplicator
+from app.models import Appointment
+
+class Clock:
+    """Stands in for the time module in the ledger, so backoff and leases can be stepped through"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ledger_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def ledger(tmp_path, worksheet):
+    ledger = AppointmentLedger(str(tmp_path / "appointments.db"))
+    # As at startup: IDs carry on from the sheet's CHMR1 and CHMR4
+    ledger.seed_from_records(worksheet.get_all_records(), "CH")
+    return ledger
+
+def push_to_default_sheet(calls):
+    def push_rows(clinic_code, rows, check_existing_ids):
+        calls.append(check_existing_ids)
+        sheets.default_sheet.append_rows(rows, check_existing_ids)
+    return push_rows
+
+def appointment(time, doctor_id="MR", doctor_name="Dr. Muhammad Raza"):
+    return Appointment(patient_name="Ali", patient_age=30, doctor_id=doctor_id, doctor_name=doctor_name,
+                       date="2026-11-05", time=time)
+
+def sheet_ids(worksheet):
+    return [row[0] for row in worksheet.values[1:]]
+
+def test_failed_push_is_retried_with_backoff(worksheet, ledger, clinic_data, clock):
+    worksheet.failing_appends = 2
+    ledger.book(appointment("9:00 AM"), "CH", clinic_data)
+    replicator = SheetReplicator(ledger, push_to_default_sheet([]))
+
+    assert replicator.replicate_once() == 0
+    assert ledger._execute("SELECT attempts, last_error FROM outbox") == [(1, "Sheets API timed out")]
+    # First backoff is 2s, give or take 20%
+    clock.advance(1.5)
+    assert replicator.replicate_once() == 0 and worksheet.writes == 1
+
+    clock.advance(1.0)
+    assert replicator.replicate_once() == 0 and worksheet.writes == 2
+    # The second is 4s
+    clock.advance(3.0)
+    assert replicator.replicate_once() == 0 and worksheet.writes == 2
+    clock.advance(2.0)
+    assert replicator.replicate_once() == 1
+    assert ledger.outbox_size() == 0 and sheet_ids(worksheet)[-1] == "CHMR5"
+
+def test_retry_skips_rows_that_landed(worksheet, ledger, clinic_data, clock):
+    worksheet.failing_appends = 1
+    worksheet.land_failed_appends = True
+    ledger.book(appointment("9:00 AM"), "CH", clinic_data)
+    ledger.book(appointment("10:00 AM"), "CH", clinic_data)
+    checks = []
+    replicator = SheetReplicator(ledger, push_to_default_sheet(checks))
+
+    assert replicator.replicate_once() == 0
+    clock.advance(3.0)
+    assert replicator.replicate_once() == 2
+    # Only the retry looks for IDs already in the sheet
+    assert checks == [False, True]
+    assert sheet_ids(worksheet) == ["CHMR1", "CHMR4", "CHMR5", "CHMR6"]
+
+def test_lease_expires_for_rows_a_dead_worker_claimed(worksheet, ledger, clinic_data, clock):
+    ledger.book(appointment("9:00 AM"), "CH", clinic_data)
+    # Another worker claims the row and dies before pushing it
+    assert len(ledger.claim_outbox()) == 1
+    checks = []
+    replicator = SheetReplicator(ledger, push_to_default_sheet(checks))
+
+    assert replicator.replicate_once() == 0 and checks == []
+    clock.advance(REPLICATION_LEASE_SECONDS + 1)
+    assert replicator.replicate_once() == 1
+    # The dead worker's append may have landed
+    assert checks == [True] and ledger.outbox_size() == 0
+
+def test_outbox_survives_reopening_the_ledger(worksheet, ledger, clinic_data, tmp_path):
+    worksheet.failing_appends = 1
+    ledger.book(appointment("9:00 AM"), "CH", clinic_data)
+    SheetReplicator(ledger, push_to_default_sheet([])).replicate_once()
+
+    # Restarted process; the row is due again once its backoff has passed
+    reopened = AppointmentLedger(str(tmp_path / "appointments.db"))
+    assert reopened.outbox_size() == 1
+    reopened._execute("UPDATE outbox SET next_attempt_at = 0")
+    assert reopened.book(appointment("10:00 AM"), "CH", clinic_data)["appointment_id"] == "CHMR6"
+
+    assert SheetReplicator(reopened, push_to_default_sheet([])).replicate_once() == 2
+    assert sheet_ids(worksheet) == ["CHMR1", "CHMR4", "CHMR5", "CHMR6"]
+
+def test_rows_go_to_their_clinics_sheet(worksheet, ledger, clinic_data, tmp_path, monkeypatch):
+    with open("app/data/clinic_data.json") as f:
+        care = json.load(f)
+    north = {
+        "clinic": dict(care["clinic"], code="NF", name="North Family Clinic", sheet_key="north-sheet"),
+        "doctors": care["doctors"],
+    }
+    (tmp_path / "care.json").write_text(json.dumps(care))
+    (tmp_path / "north.json").write_text(json.dumps(north))
+    registry = ClinicRegistry(directory=str(tmp_path))
+    monkeypatch.setattr(main, "clinic_registry", registry)
+    north_worksheet = FakeWorksheet([])
+    monkeypatch.setattr(sheets.SheetHandle, "worksheet",
+                        lambda self: north_worksheet if self._sheet_key == "north-sheet" else worksheet)
+    monkeypatch.setattr(sheets, "_handles", {(None, None): sheets.sheet_handle})
+
+    ledger.book(appointment("9:00 AM"), "CH", clinic_data)
+    ledger.book(appointment("9:00 AM"), "NF", registry.get("NF").current)
+    ledger.book(appointment("9:00 AM"), "XX", clinic_data)
+
+    assert SheetReplicator(ledger, main.push_clinic_rows).replicate_once() == 2
+    assert sheet_ids(worksheet)[-1] == "CHMR5"
+    assert sheet_ids(north_worksheet) == ["NFMR1"]
+    # A clinic that is no longer loaded keeps its rows queued
+    assert ledger._execute("SELECT last_error FROM outbox") == [("Clinic XX is not loaded",)]
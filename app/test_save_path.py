@@ -0,0 +1,44 @@
+from app import sheets
+from app.models import Appointment
+
+def make_appointment(date, time):
+    return Appointment(patient_name="Fatima", patient_age=23, doctor_id="MR",
+                       doctor_name="Dr. Muhammad Raza", date=date, time=time)
+
+def test_save_reads_once_and_writes_once(worksheet, clinic_data):
+    result = sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "10:00 AM"), "CH", clinic_data)
+
+    assert result == {
+        "success": True,
+        "message": "Appointment confirmed! Your appointment ID is: CHMR5",
+        "appointment_id": "CHMR5"
+    }
+    assert (worksheet.reads, worksheet.writes) == (1, 1)
+    assert worksheet.values[-1][0] == "CHMR5"
+
+    # A second booking reads only the rows appended since the first
+    result = sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "11:00 AM"), "CH", clinic_data)
+    assert result["appointment_id"] == "CHMR6"
+    assert (worksheet.reads, worksheet.writes) == (2, 2)
+
+def test_conflict_reads_once_and_does_not_write(worksheet, clinic_data):
+    result = sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "9:00 am"), "CH", clinic_data)
+
+    assert result["success"] is False
+    assert result["message"].startswith(
+        "This time slot is already booked. Available slots for Dr. Dr. Muhammad Raza on 2026-11-02: 10:00 AM, 11:00 AM, 3:00 PM"
+    )
+    assert result["alternatives"][0] == {
+        "doctor_id": "MR", "doctor_name": "Dr. Muhammad Raza", "date": "2026-11-02", "time": "10:00 AM"
+    }
+    assert (worksheet.reads, worksheet.writes) == (1, 0)
+
+def test_save_sees_rows_appended_elsewhere(worksheet, clinic_data):
+    sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "10:00 AM"), "CH", clinic_data)
+    worksheet.values.append(["CHMR9", "Omar", "40", "MR", "Dr. Muhammad Raza", "2026-11-02", "3:00 PM", "pending", ""])
+
+    result = sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "3:00 PM"), "CH", clinic_data)
+    assert result["success"] is False
+
+    result = sheets.save_appointment_to_sheet(make_appointment("2026-11-02", "11:00 AM"), "CH", clinic_data)
+    assert result["appointment_id"] == "CHMR10"
@@ -0,0 +1,126 @@
+import pytest
+
+from app import session_store
+from app.memory_utils import SummarizingMemory
+from app.models import ConversationState
+from app.session_store import SessionStore, SQLiteSessionStore
+
+class Clock:
+    """Stands in for the time module in session_store; both clocks move together"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+def state(name: str) -> ConversationState:
+    return ConversationState(collected_data={"name": name})
+
+def test_idle_sessions_expire(clock):
+    store = SessionStore(ttl_seconds=60, max_sessions=10)
+    store.save("a", state("Ali"))
+
+    clock.advance(50)
+    # Reading a session counts as activity
+    assert store.load("a").collected_data == {"name": "Ali"}
+    clock.advance(50)
+    assert "a" in store
+    clock.advance(61)
+    assert "a" not in store and store.load("a") is None
+    assert store.expired == 1 and len(store) == 0
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(ttl_seconds=60, max_sessions=2)
+    store.save("a", state("Ali"))
+    store.save("b", state("Sara"))
+    store.load("a")
+    store.save("c", state("Omar"))
+
+    assert list(store) == ["a", "c"]
+    assert store.evicted == 1 and store.expired == 0
+
+def test_sweep_drops_only_idle_sessions(clock):
+    store = SessionStore(ttl_seconds=60, max_sessions=10)
+    store.save("a", state("Ali"))
+    clock.advance(30)
+    store.save("b", state("Sara"))
+    clock.advance(40)
+
+    assert store.sweep() == 1
+    assert list(store) == ["b"] and store.expired == 1
+    assert store.sweep() == 0
+
+def test_sqlite_sessions_shared_between_connections(clock, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    saved = state("Ali")
+    saved.memory = SummarizingMemory()
+    saved.memory.save_turn("hi", "Hello! How can I help?")
+    worker_a.save("a", saved)
+
+    loaded = worker_b.load("a")
+    assert loaded.collected_data == {"name": "Ali"}
+    assert list(loaded.memory.turns) == [("hi", "Hello! How can I help?")]
+    loaded.collected_data["age"] = "30"
+    worker_b.save("a", loaded)
+    assert worker_a.load("a").collected_data == {"name": "Ali", "age": "30"}
+
+    clock.advance(session_store.SESSION_TTL_SECONDS + 1)
+    assert worker_a.load("a") is None and "a" not in worker_b
+
+def test_sqlite_sweep_expires_then_caps(clock, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=50, max_sessions=2)
+    for session_id in ["a", "b", "c", "d"]:
+        store.save(session_id, state(session_id))
+        clock.advance(15)
+
+    # "a" is 60s idle; of the rest, "b" is the least recently used
+    assert store.sweep() == 2
+    assert store.expired == 1 and store.evicted == 1
+    assert [session_id for session_id in "abcd" if session_id in store] == ["c", "d"]
+
+def summarizing_state(pending):
+    saved = state("Ali")
+    saved.memory = SummarizingMemory()
+    for turn in pending:
+        saved.memory.pending.append(*turn)
+    return saved
+
+def test_sqlite_background_summary_is_persisted(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    batch = [("hi", "Hello!"), ("hours?", "9 to 6")]
+    saved = summarizing_state(batch + [("thanks", "Welcome")])
+    store.save("a", saved)
+
+    saved.memory.on_summarized(batch, "Ali asked about hours.")
+    loaded = store.load("a")
+    assert loaded.memory.summary == "Ali asked about hours."
+    assert list(loaded.memory.pending) == [("thanks", "Welcome")]
+
+def test_sqlite_stale_summary_is_skipped(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    batch = [("hi", "Hello!")]
+    stale = summarizing_state(batch)
+    store.save("a", stale)
+    # Another worker saved the session after summarizing those turns itself
+    newer = summarizing_state([("book dr raza", "Sure")])
+    newer.memory.summary = "Ali said hello."
+    store.save("a", newer)
+
+    stale.memory.on_summarized(batch, "An older summary.")
+    loaded = store.load("a")
+    assert loaded.memory.summary == "Ali said hello."
+    assert list(loaded.memory.pending) == [("book dr raza", "Sure")]
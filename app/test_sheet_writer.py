@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from app import sheet_writer, sheets
+from app.sheet_writer import AppendCoalescer
+
+def make_row(i):
+    return [f"CHMR{i}", "Patient", "30", "MR", "Dr. Muhammad Raza", "2026-12-01", f"{i % 12 + 1}:00 PM", "pending", ""]
+
+def submit_all(writer, rows):
+    errors = []
+    def submit(row):
+        try:
+            writer.submit(row)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=submit, args=(row,)) for row in rows]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def test_concurrent_rows_share_appends(worksheet):
+    writer = AppendCoalescer(sheets.append_appointment_rows, window=0.2, max_batch=50)
+    rows = [make_row(i) for i in range(120)]
+
+    assert submit_all(writer, rows) == []
+    assert worksheet.writes == 3
+    assert sorted(row[0] for row in worksheet.values[3:]) == sorted(row[0] for row in rows)
+
+def test_retry_does_not_duplicate_rows_that_landed(worksheet, monkeypatch):
+    append_rows = worksheet.append_rows
+    failures = []
+    def land_then_time_out(rows):
+        append_rows(rows)
+        if not failures:
+            failures.append(rows)
+            raise TimeoutError("response lost")
+    monkeypatch.setattr(worksheet, "append_rows", land_then_time_out)
+    writer = AppendCoalescer(sheets.append_appointment_rows, window=0.05)
+
+    assert submit_all(writer, [make_row(i) for i in range(5)]) == []
+    ids = [row[0] for row in worksheet.values[3:]]
+    assert len(ids) == len(set(ids)) == 5
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(sheet_writer.time, "sleep", sleeps.append)
+    return sleeps
+
+def test_rows_fail_after_max_attempts(worksheet, monkeypatch, sleeps):
+    monkeypatch.setattr(worksheet, "append_rows", lambda rows: (_ for _ in ()).throw(ConnectionError("quota")))
+    writer = AppendCoalescer(sheets.append_appointment_rows, window=0.0, max_attempts=2,
+                             existing_ids=sheets.default_sheet.existing_ids)
+
+    with pytest.raises(ConnectionError):
+        writer.submit(make_row(100))
+    # Backoff between attempts only, not after the last one
+    assert sleeps == [0.5]
+
+def test_rows_that_landed_on_the_last_attempt_are_written(worksheet, monkeypatch, sleeps):
+    append_rows = worksheet.append_rows
+    attempts = []
+    def fail_then_land_and_time_out(rows):
+        attempts.append(rows)
+        if len(attempts) == 2:
+            append_rows(rows)
+            raise TimeoutError("response lost")
+        raise ConnectionError("quota")
+    monkeypatch.setattr(worksheet, "append_rows", fail_then_land_and_time_out)
+    writer = AppendCoalescer(sheets.append_appointment_rows, window=0.0, max_attempts=2,
+                             existing_ids=sheets.default_sheet.existing_ids)
+
+    writer.submit(make_row(100))
+    assert len(attempts) == 2 and worksheet.values[-1] == make_row(100)
+
+def test_stop_flushes_queued_rows():
+    written = []
+    writer = AppendCoalescer(lambda rows, check_existing_ids: written.extend(rows), window=60.0)
+    thread = threading.Thread(target=writer.submit, args=(make_row(1),))
+    thread.start()
+    while not writer._pending:
+        pass
+    writer.stop()
+    thread.join(1.0)
+
+    assert written == [make_row(1)]
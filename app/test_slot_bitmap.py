@@ -0,0 +1,80 @@
+import pytest
+
+from app import sheets, slot_bitmap
+from app.ledger import AppointmentLedger
+from app.models import Appointment, ClinicData, Doctor
+from app.slot_bitmap import SlotBitmap, get_slot_bitmap, slot_taken_result
+from app.utils import date_range
+
+DOCTORS = [
+    Doctor(id="MR", name="Dr. Muhammad Raza", specialization="Cardiologist", slots=["9:00 AM", "10:00 AM", "3:00 PM"]),
+    Doctor(id="AK", name="Dr. Ayesha Khan", specialization="Cardiologist", slots=["10:00 AM", "11:00 AM"]),
+    Doctor(id="HS", name="Dr. Hina Shah", specialization="Dermatologist", slots=["10:00 AM"]),
+]
+
+def test_nearest_free_ranks_by_time_distance_and_doctor():
+    bitmap = SlotBitmap(DOCTORS)
+    dates = date_range("2026-11-02", "2026-11-04")
+    doctors = bitmap.candidates(DOCTORS[0])
+    assert [doctor.id for doctor in doctors] == ["MR", "AK"]
+
+    booked = {("MR", "2026-11-02"): {"09:00", "10:00"}, ("AK", "2026-11-02"): {"10:00"}}
+    occupied = bitmap.occupancy(["MR", "AK"], dates, booked)
+    alternatives = bitmap.nearest_free(doctors, dates, occupied, "10:00 AM", limit=4)
+
+    assert [(a["doctor_id"], a["date"], a["time"]) for a in alternatives] == [
+        ("AK", "2026-11-02", "11:00 AM"),
+        ("MR", "2026-11-02", "3:00 PM"),
+        ("MR", "2026-11-03", "10:00 AM"),
+        ("MR", "2026-11-03", "9:00 AM"),
+    ]
+
+def test_bitmaps_for_edited_schedules_are_evicted(clinic_data, monkeypatch):
+    monkeypatch.setattr(slot_bitmap, "_bitmaps", slot_bitmap.OrderedDict())
+    monkeypatch.setattr(slot_bitmap, "SLOT_BITMAP_CACHE_SIZE", 2)
+    # Each edit of Dr. Raza's slots is a new schedule
+    edits = [ClinicData(clinic=clinic_data.clinic, doctors=[DOCTORS[0].model_copy(update={"slots": [f"{hour}:00 AM"]})])
+             for hour in (8, 9, 10)]
+    first = get_slot_bitmap(edits[0])
+    get_slot_bitmap(edits[1])
+    assert get_slot_bitmap(edits[0]) is first
+    get_slot_bitmap(edits[2])
+
+    assert len(slot_bitmap._bitmaps) == 2
+    # The least recently used schedule went, not the first one cached
+    assert get_slot_bitmap(edits[0]) is first
+
+def test_slot_taken_result_lists_same_day_and_nearest_openings(clinic_data):
+    appointment = Appointment(patient_name="Fatima", patient_age=23, doctor_id="MR",
+                              doctor_name="Dr. Muhammad Raza", date="2026-11-02", time="09:00")
+    full_day = {("MR", "2026-11-02"): {"09:00", "10:00", "11:00", "15:00"}}
+    result = slot_taken_result(appointment, clinic_data, lambda doctor_ids, dates: full_day)
+
+    assert result["success"] is False
+    assert result["message"].startswith("This time slot is already booked. Dr. Dr. Muhammad Raza has no available slots on 2026-11-02.")
+    assert result["alternatives"][0] == {
+        "doctor_id": "MR", "doctor_name": "Dr. Muhammad Raza", "date": "2026-11-03", "time": "9:00 AM"
+    }
+    assert "Nearest openings: Dr. Muhammad Raza on 2026-11-03 at 9:00 AM" in result["message"]
+
+@pytest.mark.parametrize("backend", ["sheet", "ledger"])
+def test_second_booking_of_unparsed_date_and_time_is_a_conflict(backend, worksheet, clinic_data, tmp_path):
+    # normalize_date and normalize_time hand these back unchanged
+    if backend == "ledger":
+        book = AppointmentLedger(str(tmp_path / "appointments.db")).book
+    else:
+        book = sheets.default_sheet.save_appointment
+    def appointment(time):
+        return Appointment(patient_name="Fatima", patient_age=23, doctor_id="MR",
+                           doctor_name="Dr. Muhammad Raza", date="31 feb 2026", time=time)
+
+    assert book(appointment("noon"), "CH", clinic_data)["success"] is True
+    result = book(appointment("noon"), "CH", clinic_data)
+    assert result["success"] is False and result["alternatives"] == []
+    assert result["message"] == ("This time slot is already booked. Available slots for Dr. Dr. Muhammad Raza on "
+                                 "31 feb 2026: 9:00 AM, 10:00 AM, 11:00 AM, 3:00 PM")
+
+    book(appointment("9:00 AM"), "CH", clinic_data)
+    result = book(appointment("9:00 AM"), "CH", clinic_data)
+    # The time still ranks that day's openings
+    assert result["alternatives"][0]["time"] == "10:00 AM"
@@ -0,0 +1,66 @@
+"""
+Train the intent classifier on the bundled corpus and report its accuracy and
+latency. With --output, the fitted pipeline is pickled for INTENT_MODEL_PATH.
+
+Usage: python -m app.train_intent [--corpus PATH] [--output PATH]
+"""
+import argparse
+import pickle
+import time
+
+from .intent import INTENT_CORPUS_PATH, IntentClassifier, build_pipeline, load_corpus
+
+# The substring rules has_booking_intent used before the classifier
+LEGACY_BOOKING_KEYWORDS = [
+    'book', 'appointment', 'schedule', 'reserve',
+    'see a doctor', 'meet with', 'visit doctor', 'confirm',
+    'yes', 'yeah', 'sure', 'ok', 'okay', 'please'
+]
+
+def per_message_us(classify, texts, rounds: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            classify(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=INTENT_CORPUS_PATH)
+    parser.add_argument("--output")
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    texts, labels = load_corpus(args.corpus)
+    print(f"{len(texts)} labeled messages")
+
+    folds = StratifiedKFold(args.folds, shuffle=True, random_state=0)
+    predicted = list(cross_val_predict(build_pipeline(), texts, labels, cv=folds))
+    accuracy = sum(p == l for p, l in zip(predicted, labels)) / len(labels)
+    print(f"{args.folds}-fold cross-validated accuracy: {accuracy:.1%}")
+    print(classification_report(labels, predicted, digits=3))
+
+    # Booking-vs-not, the decision the confirmation step and the cache gate make
+    wants_booking = [label in ("booking", "confirm") for label in labels]
+    predicted_booking = [label in ("booking", "confirm") for label in predicted]
+    legacy_booking = [any(keyword in text.lower() for keyword in LEGACY_BOOKING_KEYWORDS) for text in texts]
+    for name, guesses in (("substring keywords", legacy_booking), ("classifier (cross-validated)", predicted_booking)):
+        correct = sum(g == w for g, w in zip(guesses, wants_booking)) / len(texts)
+        false_positives = sum(g and not w for g, w in zip(guesses, wants_booking))
+        print(f"booking intent, {name:<29} accuracy {correct:.1%}, {false_positives} false positives")
+
+    classifier = IntentClassifier.train(texts, labels)
+    fast = per_message_us(classifier.classify, texts)
+    pipeline = per_message_us(lambda text: classifier.pipeline.predict_proba([text]), texts)
+    print(f"latency per message: {fast:.0f} us (direct scoring), {pipeline:.0f} us (sklearn predict_proba)")
+
+    if args.output:
+        with open(args.output, "wb") as f:
+            pickle.dump(classifier.pipeline, f)
+        print(f"Saved model to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
+import os
 import re
 import json
-from datetime import datetime
-from typing import Dict, Any, List
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Set, Tuple
 from dateutil import parser
 import calendar
 from .models import ClinicData, Doctor, Appointment
+from .doctor_index import get_doctor_index
 
 def load_clinic_data(file_path: str) -> ClinicData:
     with open(file_path, 'r') as f:
@@ -14,34 +17,11 @@ def load_clinic_data(file_path: str) -> ClinicData:
 
 def find_doctor_by_name(doctors: List[Doctor], name: str) -> Doctor:
     """
-    Find a doctor by name (case-insensitive partial match)
-    Improved to handle first names and last names better
+    Find a doctor by full name, first name, surname, ID or a close spelling.
+    Returns None when the name matches no doctor or more than one; use
+    DoctorIndex.match to tell those apart.
     """
-    if not name:
-        return None
-        
-    name_lower = name.lower().strip()
-    
-    # Remove titles like "dr.", "doctor", etc.
-    name_lower = re.sub(r'(dr\.|doctor|dr)\s*', '', name_lower)
-    
-    # Try exact match first
-    for doctor in doctors:
-        if name_lower == doctor.name.lower():
-            return doctor
-    
-    # Try partial match with first name
-    for doctor in doctors:
-        doctor_name_lower = doctor.name.lower()
-        # Check if the provided name matches the first part of the doctor's name
-        if doctor_name_lower.startswith(name_lower):
-            return doctor
-        
-        # Check if any part of the doctor's name contains the provided name
-        if name_lower in doctor_name_lower:
-            return doctor
-    
-    return None
+    return get_doctor_index(doctors).find(name)
 
 def find_doctor_by_id(doctors: List[Doctor], id: str) -> Doctor:
     for doctor in doctors:
@@ -49,7 +29,87 @@ def find_doctor_by_id(doctors: List[Doctor], id: str) -> Doctor:
             return doctor
     return None
 
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """Every YYYY-MM-DD date from start_date to end_date, inclusive"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    days = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
+def normalized_doctor_slots(doctors: List[Doctor]) -> Dict[str, List[Tuple[str, str]]]:
+    """Each doctor's slots paired with their normalized times, so lookups skip normalize_time"""
+    return {doctor.id: [(slot, normalize_time(slot)) for slot in doctor.slots] for doctor in doctors}
+
+def availability_grid(doctors: List[Doctor], dates: List[str], booked: Dict[Tuple[str, str], Set[str]],
+                      doctor_slots: Dict[str, List[Tuple[str, str]]]) -> List[Dict[str, Any]]:
+    """Free slots per doctor per date, given the booked normalized times per (doctor_id, date)"""
+    grid = []
+    for doctor in doctors:
+        slots = doctor_slots[doctor.id]
+        availability = {}
+        for date in dates:
+            taken = booked.get((doctor.id, date))
+            availability[date] = [slot for slot, slot_time in slots if slot_time not in taken] if taken else [slot for slot, _ in slots]
+        grid.append({
+            "doctor_id": doctor.id,
+            "doctor_name": doctor.name,
+            "specialization": doctor.specialization,
+            "availability": availability
+        })
+    return grid
+
+# Dates and times are memoized; the same few strings recur on every sheet row
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", "4096"))
+
+# Month names as strptime's %b and %B read them
+MONTHS = {name.lower(): month for month in range(1, 13)
+          for name in (calendar.month_abbr[month], calendar.month_name[month])}
+ISO_DATE_PATTERN = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+DAY_PATTERN = re.compile(r"[0-9]{1,2}")
+YEAR_PATTERN = re.compile(r"[0-9]{4}")
+TIME_12H_PATTERN = re.compile(r"([0-9]{1,2})(?::([0-9]{2}))?(am|pm)")
+TIME_24H_PATTERN = re.compile(r"([0-9]{1,2}):([0-9]{2})")
+
+def _fast_date(date_str: str, today: date) -> str:
+    """
+    "22 sep", "22 September 2026" and ISO dates without strptime, with the same
+    results as _parse_date (including its 2025 -> current year rule). Returns
+    None for anything else, or anything it is unsure about.
+    """
+    match = ISO_DATE_PATTERN.fullmatch(date_str)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+    else:
+        parts = date_str.split()
+        if date_str != date_str.strip() and len(parts) != 2:
+            return None
+        if len(parts) == 2:
+            parts.append(str(today.year))
+        if len(parts) != 3 or not DAY_PATTERN.fullmatch(parts[0]) or not YEAR_PATTERN.fullmatch(parts[2]):
+            return None
+        month = MONTHS.get(parts[1].lower())
+        if month is None:
+            return None
+        day, year = int(parts[0]), int(parts[2])
+    try:
+        return date(today.year if year == 2025 else year, month, day).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_date(date_str: str, today: date) -> str:
+    # today is part of the key: "22 sep" and dateutil's defaults depend on it
+    return _fast_date(date_str, today) or _parse_date(date_str)
+
 def normalize_date(date_str: str) -> str:
+    """
+    Convert various date formats to YYYY-MM-DD
+    Handles dates like "22 sep", "22 september", "22/09", etc.
+    """
+    if not isinstance(date_str, str):
+        return _parse_date(date_str)
+    return _normalize_date(date_str, datetime.now().date())
+
+def _parse_date(date_str: str) -> str:
     """
     Convert various date formats to YYYY-MM-DD
     Handles dates like "22 sep", "22 september", "22/09", etc.
@@ -81,7 +141,39 @@ def normalize_date(date_str: str) -> str:
     except:
         return date_str
 
+def _fast_time(time_str: str) -> str:
+    """
+    "9:00 AM", "9am" and "14:30" without strptime, with the same results as
+    _parse_time. Returns None for anything else.
+    """
+    match = TIME_12H_PATTERN.fullmatch(time_str)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        # %I takes 1-12
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        return f"{hour % 12 + (12 if match.group(3) == 'pm' else 0):02d}:{minute:02d}"
+    match = TIME_24H_PATTERN.fullmatch(time_str)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour > 23 or minute > 59:
+            return None
+        return f"{hour:02d}:{minute:02d}"
+    return None
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_time(time_str: str) -> str:
+    return _fast_time(time_str.lower().replace(".", "").replace(" ", "")) or _parse_time(time_str)
+
 def normalize_time(time_str: str) -> str:
+    """
+    Convert various time formats to HH:MM in 24-hour format
+    """
+    if not isinstance(time_str, str):
+        return _parse_time(time_str)
+    return _normalize_time(time_str)
+
+def _parse_time(time_str: str) -> str:
     """
     Convert various time formats to HH:MM in 24-hour format
     """